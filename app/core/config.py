@@ -1,5 +1,7 @@
+import os
+import tempfile
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "MWHWR AI Service"
@@ -7,12 +9,132 @@ class Settings(BaseSettings):
     
     # AI Keys
     OPENAI_API_KEY: str
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    # Alternative OpenAI-compatible endpoint (proxy, benchmarks/stub_openai.py); None = api.openai.com
+    OPENAI_BASE_URL: Optional[str] = None
     UNSTRUCTURED_API_KEY: Optional[str] = None
     UNSTRUCTURED_API_URL: str = "https://api.unstructured.io"
+    UNSTRUCTURED_TIMEOUT_SECONDS: float = 60.0
+    # PDFs longer than this are split into page batches posted concurrently (0 = never split)
+    UNSTRUCTURED_BATCH_PAGES: int = 10
+    UNSTRUCTURED_BATCH_CONCURRENCY: int = 4
+    UNSTRUCTURED_BATCH_RETRIES: int = 2
     
     # Security (Basic protection for the microservice)
     SERVICE_API_KEY: str = "change_this_to_secure_key"
 
+    # Chat: number of guidelines.md sections sent with each question
+    CHAT_GUIDELINE_SECTIONS: int = 4
+    # How often chat-data.json / guidelines.md are checked for changes (hot reload)
+    CHAT_DATA_RELOAD_SECONDS: float = 2.0
+    # Answer cache for LLM replies, keyed by normalized question + knowledge-base version
+    CHAT_CACHE_MAX_ENTRIES: int = 1024
+    CHAT_CACHE_TTL_SECONDS: float = 6 * 3600
+    CHAT_CACHE_WITH_HISTORY: bool = False
+
+    # Application (thread) context: kept THREAD_CONTEXT_TTL_SECONDS after the last update.
+    # MAX_THREADS caps live applications (least recently used dropped first; 0 = no cap).
+    THREAD_CONTEXT_TTL_SECONDS: float = 2 * 3600
+    THREAD_CONTEXT_MAX_THREADS: int = 0
+    THREAD_CONTEXT_MAX_DOCUMENTS: int = 50
+    # "memory" (per process), "sqlite" (shared by the workers on one host) or "redis" (shared across hosts)
+    THREAD_CONTEXT_BACKEND: str = "memory"
+    THREAD_CONTEXT_SQLITE_PATH: str = os.path.join(tempfile.gettempdir(), "mwhr-thread-context.sqlite3")
+    THREAD_CONTEXT_REDIS_URL: str = "redis://localhost:6379/0"
+    THREAD_CONTEXT_REDIS_PREFIX: str = "mwhr:thread:"
+
+    # Admission control: concurrent operations per stage (0 = unlimited). Beyond
+    # ADMISSION_MAX_WAITING callers waiting on a stage, requests get 429 with Retry-After.
+    ADMISSION_DOWNLOAD_CONCURRENCY: int = 16
+    ADMISSION_OCR_CONCURRENCY: int = 4
+    ADMISSION_UNSTRUCTURED_CONCURRENCY: int = 8
+    ADMISSION_EMBEDDINGS_CONCURRENCY: int = 4
+    ADMISSION_LLM_CONCURRENCY: int = 8
+    ADMISSION_MAX_WAITING: int = 32
+    ADMISSION_RETRY_AFTER_SECONDS: int = 10
+
+    # Load the LLM stack and start the page workers in the background at startup (False = on first use)
+    WARMUP_ON_STARTUP: bool = True
+
+    # Page extraction process pool (PyMuPDF / Tesseract). None = one worker per CPU; 0 = run in a thread.
+    PAGE_EXECUTOR_WORKERS: Optional[int] = None
+    PAGE_EXECUTOR_MAX_QUEUED_PAGES: int = 4
+    PAGE_EXECUTOR_PAGE_TIMEOUT_SECONDS: float = 60.0
+    # Local OCR: a page is OCR'd when its text layer is shorter than MIN_TEXT_CHARS or less than
+    # MIN_TEXT_QUALITY of it is word-like. When images cover less than REGION_MAX_COVERAGE of
+    # the page only those regions are OCR'd. The render DPI aims at TARGET_FONT_PIXELS per font
+    # em (DEFAULT_DPI when the size is unknown), at most the image's own DPI, within MIN/MAX_DPI
+    # and MAX_MEGAPIXELS.
+    OCR_MIN_TEXT_CHARS: int = 50
+    OCR_MIN_TEXT_QUALITY: float = 0.6
+    OCR_REGION_MAX_COVERAGE: float = 0.6
+    OCR_TARGET_FONT_PIXELS: int = 28
+    OCR_DEFAULT_DPI: int = 200
+    OCR_MIN_DPI: int = 120
+    OCR_MAX_DPI: int = 300
+    OCR_MAX_MEGAPIXELS: float = 4.0
+
+    # Document downloads: streamed into memory, rejected early when too large or not a PDF
+    DOWNLOAD_MAX_BYTES: int = 50 * 1024 * 1024
+    DOWNLOAD_ALLOWED_CONTENT_TYPES: List[str] = [
+        "application/pdf",
+        "application/x-pdf",
+        "application/octet-stream",
+        "binary/octet-stream",
+    ]
+
+    # Extraction hedging: "off" = Unstructured then local fallback; "parallel" = race both;
+    # "delayed" = local first, Unstructured after EXTRACTION_HEDGE_DELAY_SECONDS if local is not good enough
+    EXTRACTION_HEDGE_MODE: str = "off"
+    EXTRACTION_HEDGE_DELAY_SECONDS: float = 2.0
+    EXTRACTION_MIN_CHARS_PER_PAGE: int = 200
+    EXTRACTION_REQUIRE_TABLES: bool = False
+
+    # Analysis planner: documents up to STUFF tokens go to the LLM whole, up to RETRIEVAL tokens
+    # use embeddings + top-k retrieval, larger ones are map-reduced over every chunk
+    ANALYSIS_STUFF_MAX_TOKENS: int = 6000
+    ANALYSIS_RETRIEVAL_MAX_TOKENS: int = 20000
+    ANALYSIS_MAP_CHUNK_CHARS: int = 12000
+    ANALYSIS_MAP_CONCURRENCY: int = 8
+    # Send the LLM the rule-extracted fields (registration numbers, dates, directors ...) plus only
+    # the text they did not resolve, instead of the whole document
+    ANALYSIS_CONDENSE_WITH_FIELDS: bool = True
+    # Local company-name check before the LLM: similarity at/above MATCH is the same company, below
+    # MISMATCH (with a word of the name absent from the document) a different one. A confident
+    # mismatch skips the LLM analysis unless COMPANY_MISMATCH_SHORT_CIRCUIT is off.
+    COMPANY_MATCH_THRESHOLD: float = 0.85
+    COMPANY_MISMATCH_THRESHOLD: float = 0.5
+    COMPANY_MISMATCH_SHORT_CIRCUIT: bool = True
+    # /analyze/batch: documents per request, and how many LLM analyses of one batch run at once
+    ANALYSIS_BATCH_MAX_DOCUMENTS: int = 25
+    ANALYSIS_BATCH_CONCURRENCY: int = 4
+
+    # Embedding cache shared by all workers on the host (empty path disables it)
+    EMBEDDING_CACHE_PATH: Optional[str] = os.path.join(tempfile.gettempdir(), "mwhr-embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+
+    # Finished /analyze results keyed by document sha256, type, company and prompt/model version
+    # (empty path disables the store). Oldest entries expire after the TTL; least recently used
+    # ones are dropped beyond MAX_BYTES (compressed size).
+    ANALYSIS_RESULTS_PATH: Optional[str] = os.path.join(tempfile.gettempdir(), "mwhr-analysis-results.sqlite3")
+    ANALYSIS_RESULTS_MAX_BYTES: int = 1024 * 1024 * 1024
+    ANALYSIS_RESULTS_TTL_SECONDS: float = 30 * 24 * 3600
+
+    # Download cache shared by /extract and /analyze (empty dir or 0 bytes disables it)
+    DOWNLOAD_CACHE_DIR: Optional[str] = os.path.join(tempfile.gettempdir(), "mwhr-download-cache")
+    DOWNLOAD_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    DOWNLOAD_CACHE_FRESH_SECONDS: float = 300.0
+
+    # Asynchronous /analyze/jobs: in-process workers, queue limit (429 beyond it) and the job store
+    ANALYSIS_JOBS_CONCURRENCY: int = 2
+    ANALYSIS_JOBS_MAX_QUEUED: int = 100
+    ANALYSIS_JOBS_DB_PATH: str = os.path.join(tempfile.gettempdir(), "mwhr-analysis-jobs.sqlite3")
+    ANALYSIS_JOBS_RETENTION_SECONDS: float = 7 * 24 * 3600
+    ANALYSIS_JOBS_WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    ANALYSIS_JOBS_WEBHOOK_RETRIES: int = 3
+    # Times a job waits out a 429 from admission control before it is marked failed
+    ANALYSIS_JOBS_BUSY_RETRIES: int = 5
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -1,12 +1,22 @@
-from fastapi import FastAPI, HTTPException, Header, Depends
+import json
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional, Any, Dict
 from app.services.pdf_analysis_service import pdf_analysis_service
-from app.services.pdf_extract_local import extract_text_from_pdf_url
+from app.services.analysis_jobs import JobQueueFull, analysis_jobs
+from app.services.admission import AdmissionRejected, admission
+from app.services.pdf_extract_local import extract_flights, extract_text_from_pdf_url
 from app.services.chat_service import chat_service
+from app.services.document_fetcher import DocumentDownloadError, document_fetcher
+from app.services.page_executor import page_executor
+from app.services.thread_context import thread_context_store
+from app.services.warmup import warmup
+from app.services import metrics
 from app.core.config import settings
 
 app = FastAPI(title=settings.PROJECT_NAME)
+app.add_middleware(metrics.ServerTimingMiddleware)
 
 class AnalyzeDocumentRequest(BaseModel):
     document_url: HttpUrl
@@ -18,10 +28,31 @@ class AnalyzeDocumentRequest(BaseModel):
     languages: Optional[List[str]] = ["eng"]
     application_company_name: Optional[str] = None
     thread_id: Optional[str] = None
+    # Re-run the analysis even if an identical document was analyzed before (stored result)
+    force_refresh: Optional[bool] = False
+
+class BatchDocument(BaseModel):
+    document_url: HttpUrl
+    document_type: str
+    strategy: Optional[str] = "hi_res"
+    use_ocr: Optional[bool] = True
+    extract_tables: Optional[bool] = True
+    extract_forms: Optional[bool] = False
+    languages: Optional[List[str]] = ["eng"]
+    force_refresh: Optional[bool] = False
+
+class AnalyzeBatchRequest(BaseModel):
+    documents: List[BatchDocument]
+    application_company_name: Optional[str] = None
+    thread_id: Optional[str] = None
+
+class AnalyzeJobRequest(AnalyzeDocumentRequest):
+    webhook_url: Optional[HttpUrl] = None
 
 class ExtractDocumentRequest(BaseModel):
     document_url: HttpUrl
     use_ocr: Optional[bool] = True
+    languages: Optional[List[str]] = ["eng"]
 
 class ChatRequest(BaseModel):
     message: str
@@ -32,10 +63,66 @@ async def verify_api_key(x_api_key: str = Header(...)):
         raise HTTPException(status_code=403, detail="Invalid API Key")
     return x_api_key
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "stage": exc.stage},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.on_event("startup")
+async def start_warmup():
+    if settings.WARMUP_ON_STARTUP:
+        warmup.start()
+
+@app.on_event("startup")
+async def start_analysis_jobs():
+    await analysis_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    page_executor.shutdown()
+    await document_fetcher.aclose()
+    await analysis_jobs.shutdown()
+    thread_context_store.close()
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+def readiness_check():
+    # Unlike /health, only 200 once extraction and the LLM stack are loaded (see WARMUP_ON_STARTUP).
+    ready = warmup.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "warming_up", "subsystems": warmup.status()},
+    )
+
+@app.get("/metrics")
+def prometheus_metrics():
+    if not metrics.prometheus_client:
+        raise HTTPException(status_code=404, detail="prometheus_client is not installed")
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/stats", dependencies=[Depends(verify_api_key)])
+def service_stats():
+    return {
+        "download_cache": document_fetcher.stats(),
+        "embeddings": pdf_analysis_service.embedding_stats(),
+        "analysis_results": pdf_analysis_service.result_store_stats(),
+        "chat": chat_service.stats(),
+        "thread_context": thread_context_store.stats(),
+        "analysis_jobs": analysis_jobs.stats(),
+        "admission": admission.stats(),
+        "coalescing": {
+            "analyze": pdf_analysis_service.coalescing_stats(),
+            "extract": extract_flights.stats(),
+        },
+    }
+
 @app.post("/analyze", dependencies=[Depends(verify_api_key)])
 async def analyze_document(request: AnalyzeDocumentRequest):
     try:
@@ -49,19 +136,65 @@ async def analyze_document(request: AnalyzeDocumentRequest):
             languages=request.languages,
             application_company_name=request.application_company_name,
             thread_id=request.thread_id,
+            force_refresh=request.force_refresh,
         )
         return result
+    except DocumentDownloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/analyze/batch", dependencies=[Depends(verify_api_key)])
+async def analyze_batch(request: AnalyzeBatchRequest):
+    if not request.documents or len(request.documents) > settings.ANALYSIS_BATCH_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A batch needs between 1 and {settings.ANALYSIS_BATCH_MAX_DOCUMENTS} documents",
+        )
+    try:
+        return await pdf_analysis_service.analyze_batch(
+            documents=[d.model_dump(mode="json") for d in request.documents],
+            application_company_name=request.application_company_name,
+            thread_id=request.thread_id,
+        )
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze/jobs", status_code=202, dependencies=[Depends(verify_api_key)])
+async def submit_analysis_job(request: AnalyzeJobRequest):
+    params = request.model_dump(mode="json", exclude={"webhook_url"})
+    try:
+        job = await analysis_jobs.submit(
+            params, webhook_url=str(request.webhook_url) if request.webhook_url else None
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return {"job_id": job["job_id"], "status": job["status"], "status_url": f"/analyze/jobs/{job['job_id']}"}
+
+@app.get("/analyze/jobs/{job_id}", dependencies=[Depends(verify_api_key)])
+async def get_analysis_job(job_id: str):
+    job = await analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/extract", dependencies=[Depends(verify_api_key)])
 async def extract_document(request: ExtractDocumentRequest):
     try:
         text = await extract_text_from_pdf_url(
             document_url=str(request.document_url),
-            use_ocr=request.use_ocr
+            use_ocr=request.use_ocr,
+            languages=request.languages,
         )
         return {"extracted_text": text, "success": bool(text)}
+    except DocumentDownloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -70,5 +203,30 @@ async def chat(request: ChatRequest):
     try:
         response = await chat_service.generate_response(request.message, request.history)
         return {"response": response}
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/chat/stream", dependencies=[Depends(verify_api_key)])
+async def chat_stream(request: ChatRequest, http_request: Request):
+    async def event_stream():
+        events = chat_service.stream_response(request.message, request.history)
+        try:
+            async for event in events:
+                if await http_request.is_disconnected():
+                    break
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except AdmissionRejected as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e), 'retry_after': e.retry_after})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            # Stops the upstream model stream when the client has gone away.
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,103 @@
+"""
+Per-stage admission control. Each expensive stage (downloads, local OCR, the Unstructured API,
+embeddings, LLM calls) has a concurrency limit; callers beyond it wait in line, and once more
+than ADMISSION_MAX_WAITING are waiting new callers are rejected immediately with
+AdmissionRejected (HTTP 429 + Retry-After) instead of piling up until they time out.
+"""
+import asyncio
+import contextlib
+import math
+import time
+from typing import Any, AsyncIterator, Dict
+
+from app.core.config import settings
+
+
+class AdmissionRejected(Exception):
+    """A stage is saturated; retry after `retry_after` seconds."""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"Service busy: too many requests waiting for {stage}, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    def __init__(self, name: str, concurrency: int, max_waiting: int):
+        self.name = name
+        self.concurrency = concurrency  # 0 = unlimited
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Moving average of how long a slot is held, for the Retry-After estimate.
+        self._avg_hold_seconds = 0.0
+
+    def retry_after(self) -> int:
+        if not self._avg_hold_seconds:
+            return settings.ADMISSION_RETRY_AFTER_SECONDS
+        backlog = (self.waiting + 1) / max(self.concurrency, 1)
+        return max(1, math.ceil(self._avg_hold_seconds * backlog))
+
+    def check(self) -> None:
+        """Raise AdmissionRejected if a new caller would be over the waiting limit right now."""
+        if self.concurrency > 0 and self.active >= self.concurrency and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, self.retry_after())
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self.concurrency <= 0:
+            yield
+            return
+        self.check()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            self._avg_hold_seconds = held if not self._avg_hold_seconds else 0.8 * self._avg_hold_seconds + 0.2 * held
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "concurrency": self.concurrency,
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionControl:
+    def __init__(self, limits: Dict[str, int], max_waiting: int):
+        self.stages = {name: StageLimiter(name, limit, max_waiting) for name, limit in limits.items()}
+
+    def stage(self, name: str) -> StageLimiter:
+        return self.stages[name]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limiter.stats() for name, limiter in self.stages.items()}
+
+
+admission = AdmissionControl(
+    {
+        "download": settings.ADMISSION_DOWNLOAD_CONCURRENCY,
+        "ocr": settings.ADMISSION_OCR_CONCURRENCY,
+        "unstructured": settings.ADMISSION_UNSTRUCTURED_CONCURRENCY,
+        "embeddings": settings.ADMISSION_EMBEDDINGS_CONCURRENCY,
+        "llm": settings.ADMISSION_LLM_CONCURRENCY,
+    },
+    max_waiting=settings.ADMISSION_MAX_WAITING,
+)
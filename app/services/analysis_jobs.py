@@ -0,0 +1,329 @@
+"""
+Asynchronous document analysis: POST /analyze/jobs queues the request and returns a job id,
+GET /analyze/jobs/{id} polls it, and an optional webhook is called when the job finishes.
+Jobs run on ANALYSIS_JOBS_CONCURRENCY in-process workers; beyond ANALYSIS_JOBS_MAX_QUEUED
+waiting jobs new submissions are refused. Job state and results live in an SQLite (WAL)
+database, so finished results survive a restart and any uvicorn worker on the host can
+answer a poll. The store is opened at startup by the process that runs the jobs; jobs whose
+owning process on this host is gone (crash, restart) are marked failed then, and the jobs a
+process still holds when it shuts down are marked failed by that process.
+"""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.services.admission import AdmissionRejected
+from app.services.document_fetcher import DocumentDownloadError
+from app.services.metrics import detach_request
+from app.services.pdf_analysis_service import pdf_analysis_service
+
+
+_SHUTDOWN_ERROR = "Interrupted: the service shut down before the job finished"
+
+
+class JobQueueFull(Exception):
+    """More jobs are waiting than ANALYSIS_JOBS_MAX_QUEUED."""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    Blocking SQLite store for job state; rows are returned as API-ready dicts. The event loop
+    calls it through asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, retention_seconds: float):
+        self.path = path
+        self.retention_seconds = retention_seconds
+        self.owner: Optional[str] = None
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self) -> int:
+        """
+        Open the database as the current process and fail the orphaned jobs; returns how many.
+        The owner is taken here rather than at import so a server that imports the app before
+        forking its workers does not record every job under the parent's pid.
+        """
+        with self._lock:
+            if self._conn is not None:
+                return 0
+            self.owner = f"{socket.gethostname()}:{os.getpid()}"
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            with self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL,
+                        request TEXT NOT NULL,
+                        webhook_url TEXT,
+                        result TEXT,
+                        error TEXT,
+                        owner TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        started_at REAL,
+                        finished_at REAL
+                    )"""
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+        orphaned = self.fail_orphaned()
+        self.prune()
+        return orphaned
+
+    def fail_orphaned(self) -> int:
+        """
+        Mark queued/running jobs as failed when they were owned by a process on this host that
+        is gone, or by an earlier process with this one's pid. Other hosts' jobs are left alone.
+        """
+        host = self.owner.rsplit(":", 1)[0]
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN ('queued', 'running') AND owner LIKE ?",
+                (f"{host}:%",),
+            ).fetchall()
+            orphaned = []
+            for job_id, owner in rows:
+                owner_host, _, pid = owner.rpartition(":")
+                if owner_host == host and (owner == self.owner or not _pid_alive(int(pid))):
+                    orphaned.append(job_id)
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                [("Interrupted: the service restarted before the job finished", time.time(), j) for j in orphaned],
+            )
+        return len(orphaned)
+
+    def fail_owned(self, error: str) -> int:
+        """Mark this process's queued/running jobs as failed (at shutdown); returns how many."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE owner = ? AND status IN ('queued', 'running')",
+                (error, time.time(), self.owner),
+            ).rowcount
+
+    def prune(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.retention_seconds,),
+            )
+
+    def create(self, request: Dict[str, Any], webhook_url: Optional[str]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, request, webhook_url, owner, created_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(request), webhook_url, self.owner, time.time()),
+            )
+        return self.get(job_id)
+
+    def mark_running(self, job_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def finish(self, job_id: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (
+                    "failed" if error is not None else "completed",
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row[0],
+            "status": row[1],
+            "created_at": row[4],
+            "started_at": row[5],
+            "finished_at": row[6],
+        }
+        if row[2] is not None:
+            job["result"] = json.loads(row[2])
+        if row[3] is not None:
+            job["error"] = row[3]
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            if self._conn is None:
+                return {}
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class AnalysisJobQueue:
+    def __init__(
+        self,
+        store: JobStore,
+        runner: Callable[..., Awaitable[Dict[str, Any]]],
+        concurrency: int,
+        max_queued: int,
+    ):
+        self.store = store
+        self.runner = runner
+        self.concurrency = max(concurrency, 1)
+        self.max_queued = max_queued
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._webhook_tasks: set = set()
+        self._opened = False
+        self.running = 0
+
+    async def start(self) -> None:
+        """Open the job store in this process (at startup; submit/get open it if startup did not)."""
+        if not self._opened:
+            orphaned = await asyncio.to_thread(self.store.open)
+            self._opened = True
+            if orphaned:
+                print(f"Marked {orphaned} interrupted analysis jobs as failed")
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"analysis-job-worker-{n}")
+                for n in range(self.concurrency)
+            ]
+
+    async def submit(self, request: Dict[str, Any], webhook_url: Optional[str] = None) -> Dict[str, Any]:
+        await self.start()
+        self._ensure_workers()
+        if self._queue.qsize() >= self.max_queued:
+            raise JobQueueFull(f"{self._queue.qsize()} analysis jobs are already waiting")
+        job = await asyncio.to_thread(self.store.create, request, webhook_url)
+        self._queue.put_nowait((job["job_id"], request, webhook_url))
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        await self.start()
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self) -> None:
+        # Workers are started from the first submitting request; don't time into its header.
+        detach_request()
+        while True:
+            job_id, request, webhook_url = await self._queue.get()
+            self.running += 1
+            try:
+                await asyncio.to_thread(self.store.mark_running, job_id)
+                try:
+                    result = await self._run(request)
+                except asyncio.CancelledError:
+                    await asyncio.to_thread(self.store.finish, job_id, error=_SHUTDOWN_ERROR)
+                    raise
+                except DocumentDownloadError as e:
+                    # What /analyze answers with 422: the document itself was refused.
+                    result = {"success": False, "status_code": 422, "error": str(e)}
+                    await asyncio.to_thread(self.store.finish, job_id, result=result, error=str(e))
+                except Exception as e:
+                    await asyncio.to_thread(self.store.finish, job_id, error=str(e))
+                else:
+                    # An analysis that ran but could not produce a result is a failed job.
+                    error = None if result.get("success", True) else str(result.get("error") or "Analysis failed")
+                    await asyncio.to_thread(self.store.finish, job_id, result=result, error=error)
+                if webhook_url:
+                    job = await asyncio.to_thread(self.store.get, job_id)
+                    task = asyncio.create_task(self._notify(webhook_url, job))
+                    self._webhook_tasks.add(task)
+                    task.add_done_callback(self._webhook_tasks.discard)
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    async def _run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        # A saturated stage is not a reason to fail a queued job: wait as told and try again.
+        for attempt in range(settings.ANALYSIS_JOBS_BUSY_RETRIES + 1):
+            try:
+                return await self.runner(**request)
+            except AdmissionRejected as e:
+                if attempt == settings.ANALYSIS_JOBS_BUSY_RETRIES:
+                    raise
+                await asyncio.sleep(e.retry_after)
+
+    async def _notify(self, webhook_url: str, job: Dict[str, Any]) -> None:
+        body = json.dumps(job, default=str)
+        retries = settings.ANALYSIS_JOBS_WEBHOOK_RETRIES
+        async with httpx.AsyncClient(timeout=settings.ANALYSIS_JOBS_WEBHOOK_TIMEOUT_SECONDS) as client:
+            for attempt in range(retries + 1):
+                try:
+                    response = await client.post(
+                        webhook_url, content=body, headers={"Content-Type": "application/json"}
+                    )
+                    if response.status_code < 500:
+                        return
+                except httpx.HTTPError:
+                    pass
+                if attempt < retries:
+                    await asyncio.sleep(2 ** attempt)
+        print(f"Webhook for analysis job {job['job_id']} failed after {retries + 1} attempts: {webhook_url}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "max_queued": self.max_queued,
+            "stored": self.store.counts(),
+        }
+
+    async def shutdown(self) -> None:
+        for task in [*self._workers, *self._webhook_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._webhook_tasks, return_exceptions=True)
+        # The queue belongs to this event loop; a later startup (new loop) needs a new one.
+        # Whatever is left in it is failed by fail_owned below.
+        self._workers = []
+        self._queue = None
+        if self._opened:
+            # Jobs still waiting in this process's queue will never run.
+            await asyncio.to_thread(self.store.fail_owned, _SHUTDOWN_ERROR)
+        await asyncio.to_thread(self.store.close)
+        self._opened = False
+
+
+analysis_jobs = AnalysisJobQueue(
+    JobStore(settings.ANALYSIS_JOBS_DB_PATH, settings.ANALYSIS_JOBS_RETENTION_SECONDS),
+    runner=pdf_analysis_service.analyze_document,
+    concurrency=settings.ANALYSIS_JOBS_CONCURRENCY,
+    max_queued=settings.ANALYSIS_JOBS_MAX_QUEUED,
+)
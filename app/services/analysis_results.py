@@ -0,0 +1,108 @@
+"""
+Persistent store of finished /analyze results.
+Contractors resubmit the same certificates across renewals and reviewers reopen applications,
+so a successful analysis is kept in SQLite (WAL, shared by every worker on the host) under a
+key built from the sha256 of the downloaded bytes, the document type, the application company,
+the extraction options and the prompt/model version. A later request for the same content is
+answered from the store without extraction or any OpenAI call. Results are zlib-compressed
+JSON; entries older than the TTL are dropped, and least recently used ones go first once the
+store is over its byte budget.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+
+class AnalysisResultStore:
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._writes_since_prune = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+
+    @staticmethod
+    def key(**parts: Any) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]], float]]:
+        """(result, thread context update, created_at) or None if missing/expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM results WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if not row:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        stored = json.loads(zlib.decompress(row[0]))
+        return stored["result"], stored["context_update"], row[1]
+
+    def put(self, key: str, result: Dict[str, Any], context_update: Optional[Dict[str, Any]]) -> None:
+        payload = zlib.compress(json.dumps({"result": result, "context_update": context_update}).encode("utf-8"))
+        if len(payload) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, payload, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now),
+                )
+            self.writes += 1
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 50:
+                self._writes_since_prune = 0
+                self._prune()
+
+    def _prune(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM results WHERE created_at <= ?", (time.time() - self.ttl_seconds,))
+            # Keep the most recently used rows whose running size fits the budget.
+            self._conn.execute(
+                """DELETE FROM results WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS running
+                        FROM results
+                    ) WHERE running > ?
+                )""",
+                (self.max_bytes,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -0,0 +1,70 @@
+"""
+Answer cache for /chat. Questions are normalized (lowercased, punctuation and stopwords
+stripped, tokens sorted) so "How much is the renewal fee?" and "the renewal fee, how much"
+share an entry. Keys also carry the knowledge-base version, so editing guidelines.md or
+chat-data.json makes old answers unreachable.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+# Interrogatives and negations are kept: they change what is being asked.
+_STOPWORDS = frozenset(
+    "a an the is are was were be been am do does did i me my we our us you your please pls "
+    "can could would will should shall may might tell kindly hi hello hey dear to of for in "
+    "on at about and or it its this that these those there just also so".split()
+)
+
+
+def normalize_question(message: str) -> str:
+    tokens = {w for w in _WORD_RE.findall(message.lower()) if w not in _STOPWORDS}
+    return " ".join(sorted(tokens))
+
+
+class TTLCache:
+    """Bounded LRU with a per-entry time to live. Thread-safe."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
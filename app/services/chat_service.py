@@ -1,10 +1,19 @@
+import hashlib
 import json
 import os
-from typing import List, Dict, Any, Optional
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from difflib import get_close_matches
+import time
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Any, Optional, Tuple
 from app.core.config import settings
+from app.services.admission import admission
+from app.services.answer_cache import TTLCache, normalize_question
+from app.services.guidelines_index import GuidelinesIndex
+from app.services.metrics import observe_ttft, timed
+from app.services.pattern_matcher import PatternMatcher
+from app.services.warmup import warmup
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+    from langchain_openai import ChatOpenAI
 
 class ChatService:
     def __init__(self):
@@ -12,8 +21,65 @@ class ChatService:
         self.data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
         self.chat_data_path = os.path.join(self.data_dir, "chat-data.json")
         self.knowledge_base_path = os.path.join(self.data_dir, "guidelines.md")
+        self._chat_model: Optional["ChatOpenAI"] = None
+        self.answer_cache = TTLCache(settings.CHAT_CACHE_MAX_ENTRIES, settings.CHAT_CACHE_TTL_SECONDS)
+        self._data_mtimes = None
+        self._next_reload_check = 0.0
+        self._load_data()
+
+    def _load_data(self) -> None:
+        """(Re)load chat-data.json and guidelines.md and rebuild everything compiled from them."""
+        self._data_mtimes = self._stat_data_files()
         self.pattern_guide = self._load_pattern_guide()
         self.knowledge_base = self._load_knowledge_base()
+        self.pattern_matcher = PatternMatcher(self.pattern_guide.get("intents", []))
+        self.guidelines_index = GuidelinesIndex(self.knowledge_base)
+        self._static_prompt = self._build_static_prompt()
+        self.knowledge_version = self._hash_data_files()
+        # Entries for the old version can no longer be hit; drop them instead of waiting for LRU.
+        self.answer_cache.clear()
+
+    def _hash_data_files(self) -> str:
+        digest = hashlib.sha256()
+        for path in (self.chat_data_path, self.knowledge_base_path):
+            try:
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+            except OSError:
+                pass
+            digest.update(b"\x00")
+        return digest.hexdigest()[:16]
+
+    def _cache_key(self, message: str, history: List[Dict[str, str]]) -> Optional[Tuple[str, str]]:
+        if history and not settings.CHAT_CACHE_WITH_HISTORY:
+            return None
+        normalized = normalize_question(message)
+        if not normalized:
+            return None
+        if history:
+            # Answers to follow-ups depend on the conversation, so it becomes part of the key.
+            normalized += "\x00" + hashlib.sha256(
+                json.dumps(history[-5:], sort_keys=True).encode("utf-8")
+            ).hexdigest()
+        return self.knowledge_version, normalized
+
+    def _stat_data_files(self):
+        mtimes = []
+        for path in (self.chat_data_path, self.knowledge_base_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _maybe_reload(self) -> None:
+        # Hot reload: stat the data files at most every CHAT_DATA_RELOAD_SECONDS.
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + settings.CHAT_DATA_RELOAD_SECONDS
+        if self._stat_data_files() != self._data_mtimes:
+            self._load_data()
         
     def _load_pattern_guide(self) -> Dict[str, Any]:
         try:
@@ -40,25 +106,7 @@ class ChatService:
             
         is_likely_greeting = any(word in user_message_lower for word in ["hi", "hello", "hey", "good morning", "good afternoon", "greetings"])
         
-        all_patterns = []
-        pattern_map = {}
-        
-        for intent in self.pattern_guide.get("intents", []):
-            if intent["id"] == "greeting" and not is_likely_greeting:
-                continue
-                
-            for pattern in intent["patterns"]:
-                pattern_lower = pattern.lower()
-                all_patterns.append(pattern_lower)
-                pattern_map[pattern_lower] = intent["response"]
-        
-        # Fuzzy matching using difflib
-        matches = get_close_matches(user_message_lower, all_patterns, n=1, cutoff=0.65)
-        
-        if matches:
-            return pattern_map[matches[0]]
-            
-        return None
+        return self.pattern_matcher.match(user_message_lower, include_greeting=is_likely_greeting)
 
     _OFF_TOPIC_RESPONSE = (
         "I can only assist with questions about the Ministry of Works, Housing & Water Resources "
@@ -84,37 +132,128 @@ class ChatService:
             return True
         return False
 
-    async def generate_response(self, message: str, history: List[Dict[str, str]]) -> str:
+    def _immediate_response(self, message: str) -> Optional[Tuple[str, str]]:
+        """(source, text) when the message can be answered without the LLM, else None."""
         # Step 1: Pattern Matching
         pattern_response = self._try_pattern_match(message)
         if pattern_response:
-            return pattern_response
+            return "pattern", pattern_response
 
         # Step 2: Reject off-topic / code
         if self._is_off_topic_or_code(message):
-            return self._OFF_TOPIC_RESPONSE
+            return "off_topic", self._OFF_TOPIC_RESPONSE
             
         # Step 3: AI Generation
         if not self.openai_api_key:
-            return self.pattern_guide.get("default_response", "") + " (AI service unavailable)"
-            
-        chat_model = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.7,
-            openai_api_key=self.openai_api_key
-        )
-        
+            return "unavailable", self.pattern_guide.get("default_response", "") + " (AI service unavailable)"
+        return None
+
+    async def generate_response(self, message: str, history: List[Dict[str, str]]) -> str:
+        self._maybe_reload()
+        with timed("pattern_match"):
+            immediate = self._immediate_response(message)
+        if immediate:
+            return immediate[1]
+
+        cache_key = self._cache_key(message, history)
+        if cache_key:
+            cached = self.answer_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        await warmup.require("llm")
+        async with admission.stage("llm").slot():
+            with timed("llm"):
+                response = await self._get_chat_model().ainvoke(self._build_messages(message, history))
+        answer = str(response.content)
+        if cache_key and answer:
+            self.answer_cache.set(cache_key, answer)
+        return answer
+
+    async def stream_response(
+        self, message: str, history: List[Dict[str, str]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield chat events: a single "message" event for pattern/off-topic answers, otherwise
+        "token" events as the model streams, then "done". Closing the generator (client
+        disconnect) cancels the upstream model call.
+        """
+        self._maybe_reload()
+        with timed("pattern_match"):
+            immediate = self._immediate_response(message)
+        if immediate:
+            source, text = immediate
+            yield {"event": "message", "data": {"content": text, "source": source}}
+            yield {"event": "done", "data": {"source": source}}
+            return
+
+        cache_key = self._cache_key(message, history)
+        if cache_key:
+            cached = self.answer_cache.get(cache_key)
+            if cached is not None:
+                yield {"event": "message", "data": {"content": cached, "source": "cache"}}
+                yield {"event": "done", "data": {"source": "cache"}}
+                return
+
+        started = time.perf_counter()
+        parts: List[str] = []
+        await warmup.require("llm")
+        async with admission.stage("llm").slot():
+            with timed("llm"):
+                async for chunk in self._get_chat_model().astream(self._build_messages(message, history)):
+                    if not chunk.content:
+                        continue
+                    if not parts:
+                        observe_ttft(time.perf_counter() - started)
+                    parts.append(chunk.content)
+                    yield {"event": "token", "data": {"content": chunk.content}}
+        # Only completed streams are cached; a disconnect closes the generator before this line.
+        if cache_key and parts:
+            self.answer_cache.set(cache_key, "".join(parts))
+        yield {"event": "done", "data": {"source": "llm"}}
+
+    def stats(self) -> Dict[str, Any]:
+        # Time to first token is on /metrics (mwhr_chat_time_to_first_token_seconds).
+        return {
+            "patterns": len(self.pattern_matcher),
+            "knowledge_version": self.knowledge_version,
+            "answer_cache": self.answer_cache.stats(),
+        }
+
+    def warm_up(self) -> None:
+        """Warm-up loader for the "llm" subsystem: imports langchain_openai and builds the chat model."""
+        import langchain_core.messages  # noqa: F401
+        import langchain_openai  # noqa: F401
+        if self.openai_api_key:
+            self._get_chat_model()
+
+    def _get_chat_model(self) -> "ChatOpenAI":
+        if self._chat_model is None:
+            from langchain_openai import ChatOpenAI
+            self._chat_model = ChatOpenAI(
+                model_name="gpt-3.5-turbo",
+                temperature=0.7,
+                openai_api_key=self.openai_api_key,
+                openai_api_base=settings.OPENAI_BASE_URL,
+            )
+        return self._chat_model
+
+    def _build_static_prompt(self) -> str:
+        """
+        System prompt prefix that does not depend on the question. Built once and sent
+        byte-identical on every call so the provider's prompt-prefix caching can apply.
+        """
         fee_responses = "\n\n".join([
-            i["response"] for i in self.pattern_guide.get("intents", []) 
+            i["response"] for i in self.pattern_guide.get("intents", [])
             if i["id"].startswith("fees_")
         ])
-        
-        system_prompt = f"""You are Mavis, a helpful assistant for the Ministry of Works, Housing & Water Resources (MWHWR) in Ghana. 
+
+        return f"""You are Mavis, a helpful assistant for the Ministry of Works, Housing & Water Resources (MWHWR) in Ghana. 
 Your role is to provide accurate information about contractor classification and certification processes.
 
 CRITICAL INSTRUCTIONS:
 1. You have access to TWO information sources:
-   - KNOWLEDGE BASE: Contains detailed guidelines, procedures, and general information
+   - KNOWLEDGE BASE: Contains detailed guidelines, procedures, and general information. The sections relevant to the user's question are provided in the next system message.
    - PATTERN GUIDE: Contains specific data like fees, contact info, and quick reference responses
    
 2. ALWAYS use BOTH sources to answer questions:
@@ -137,9 +276,6 @@ CRITICAL INSTRUCTIONS:
 
 6. If the user's message is primarily code, or clearly unrelated to certification/ministry (e.g. general coding help, math, other topics), respond with exactly: "I can only assist with questions about the Ministry of Works, Housing & Water Resources certification and application process. For code or other topics, please try another platform."
 
-KNOWLEDGE BASE (Guidelines and Procedures):
-{self.knowledge_base}
-
 PATTERN GUIDE (Specific Data - Fees, Contact Info, Quick References):
 {json.dumps(self.pattern_guide.get('intents', []), indent=2)}
 
@@ -148,7 +284,22 @@ SPECIFIC FEE INFORMATION (for quick reference):
 
 Remember: You are representing an official government ministry. Use ALL available information sources to provide complete, accurate answers."""
 
-        messages = [SystemMessage(content=system_prompt)]
+    def _knowledge_base_excerpt(self, message: str, history: List[Dict[str, str]]) -> str:
+        # Include the previous user turn so follow-ups ("and for renewal?") still find their sections.
+        previous = [m.get("content", "") for m in history[-5:] if m.get("role") == "user"]
+        query = " ".join(previous[-1:] + [message])
+        sections = self.guidelines_index.search(query, k=settings.CHAT_GUIDELINE_SECTIONS)
+        if not sections:
+            sections = self.guidelines_index.sections[: settings.CHAT_GUIDELINE_SECTIONS]
+        return "KNOWLEDGE BASE (relevant sections of the Guidelines and Procedures):\n" + self.guidelines_index.render(sections)
+
+    def _build_messages(self, message: str, history: List[Dict[str, str]]) -> List["BaseMessage"]:
+        from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+        messages: List["BaseMessage"] = [
+            SystemMessage(content=self._static_prompt),
+            SystemMessage(content=self._knowledge_base_excerpt(message, history)),
+        ]
         
         # Add history (limit to last 5 interactions)
         for msg in history[-5:]:
@@ -158,8 +309,7 @@ Remember: You are representing an official government ministry. Use ALL availabl
                 messages.append(AIMessage(content=msg.get("content", "")))
                 
         messages.append(HumanMessage(content=message))
-        
-        response = await chat_model.ainvoke(messages)
-        return str(response.content)
+        return messages
 
 chat_service = ChatService()
+warmup.register("llm", chat_service.warm_up)
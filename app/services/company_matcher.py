@@ -0,0 +1,168 @@
+"""
+Deterministic company-name check for /analyze, run on the extracted text before the LLM.
+Company names are pulled from the text (labelled fields such as "Company Name: ..." and
+capitalised names ending in a legal suffix), normalized (case, punctuation, "&", trailing
+Ltd / Limited / Co. / PLC ...) and compared with the application company by token-level fuzzy
+matching (difflib). The verdict is "match", "mismatch" or "uncertain". A mismatch is only
+reported when some word of the application name occurs nowhere in the document (not even with
+a typo), which is what makes it safe to skip the LLM on.
+"""
+import re
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+_LEGAL_SUFFIXES = {
+    "limited", "ltd", "plc", "llc", "llp", "inc", "incorporated", "co", "company",
+    "corp", "corporation", "gte", "lbg",
+}
+# Words that precede a name in running text ("Certificate of Incorporation ACME LIMITED").
+_LEADING_NOISE = {
+    "the", "certificate", "incorporation", "registration", "registrar", "commencement", "business",
+    "certify", "certifies", "that", "this", "is", "to", "name", "company", "applicant", "of", "and",
+    "dear", "sir", "madam", "re", "messrs", "m/s",
+}
+
+_LABELLED = re.compile(
+    r"(?im)^[ \t]*(?:name\s+of\s+(?:the\s+)?(?:company|applicant|contractor|firm)|company(?:'s)?\s+name"
+    r"|registered\s+name|company|applicant|contractor)[ \t]*[:\-][ \t]*([^\n]{2,120})$"
+)
+_WORD = r"[A-Z0-9&][A-Za-z0-9&'’.\-]*"
+# Capitalised words (plus "and"/"of" inside the name) ending in a legal suffix.
+_SUFFIXED = re.compile(
+    rf"\b({_WORD}[ \t]+(?:(?:{_WORD}|and|of)[ \t]+){{0,6}}(?:(?i:company|co\.?)[ \t]+)?"
+    r"(?i:limited|ltd\.?|plc|llc|llp|inc\.?|incorporated|corporation|ltd/gte))(?![A-Za-z])"
+)
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_company_name(name: str) -> Tuple[str, ...]:
+    """'ACME Construction Co. Ltd.' -> ('acme', 'construction')."""
+    text = _PUNCTUATION.sub(" ", name.casefold().replace("&", " and "))
+    tokens = text.split()
+    while tokens and tokens[-1] in _LEGAL_SUFFIXES:
+        tokens.pop()
+    if tokens and tokens[0] == "the":
+        tokens = tokens[1:]
+    return tuple(tokens)
+
+
+def extract_company_names(text: str, limit: int = 20) -> List[str]:
+    """Candidate company names in document order, de-duplicated by normalized form."""
+    found: List[str] = []
+    seen = set()
+    candidates = [(m.start(), m.group(1)) for m in _LABELLED.finditer(text)]
+    for m in _SUFFIXED.finditer(text):
+        words = m.group(1).split()
+        while len(words) > 1 and words[0].casefold() in _LEADING_NOISE:
+            words.pop(0)
+        candidates.append((m.start(), " ".join(words)))
+    for _, name in sorted(candidates):
+        name = name.strip(" \t.,;:-")
+        key = normalize_company_name(name)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        found.append(name)
+        if len(found) >= limit:
+            break
+    return found
+
+
+def name_similarity(a: Tuple[str, ...], b: Tuple[str, ...]) -> float:
+    """Max of the whole-string ratio and a token Dice score where tokens match fuzzily (typos, OCR)."""
+    if not a or not b:
+        return 0.0
+    whole = SequenceMatcher(None, " ".join(a), " ".join(b)).ratio()
+    matched = 0.0
+    remaining = list(b)
+    for token in a:
+        best, best_index = 0.0, -1
+        for i, other in enumerate(remaining):
+            score = 1.0 if token == other else SequenceMatcher(None, token, other).ratio()
+            if score > best:
+                best, best_index = score, i
+        if best >= 0.85:
+            matched += best
+            remaining.pop(best_index)
+    tokens = 2 * matched / (len(a) + len(b))
+    return max(whole, tokens)
+
+
+def _tokens_occur(target: Tuple[str, ...], vocabulary: set) -> bool:
+    """True if every token of the name appears in the text, allowing OCR-style typos."""
+    matcher = SequenceMatcher()
+    for token in target:
+        if token in vocabulary:
+            continue
+        matcher.set_seq2(token)
+        for word in vocabulary:
+            if abs(len(word) - len(token)) > 2:
+                continue
+            matcher.set_seq1(word)
+            if matcher.real_quick_ratio() >= 0.85 and matcher.quick_ratio() >= 0.85 and matcher.ratio() >= 0.85:
+                break
+        else:
+            return False
+    return True
+
+
+@dataclass
+class CompanyCheck:
+    verdict: str  # "match" | "mismatch" | "uncertain"
+    score: float
+    best_candidate: Optional[str] = None
+    candidates: List[str] = field(default_factory=list)
+    name_in_text: bool = False
+
+    def as_dict(self) -> dict:
+        return {
+            "verdict": self.verdict,
+            "score": round(self.score, 3),
+            "best_candidate": self.best_candidate,
+            "candidates": self.candidates,
+            "name_in_text": self.name_in_text,
+        }
+
+    def hint(self, application_company_name: str) -> str:
+        """One paragraph for the analysis prompt; the LLM still makes the final call."""
+        if not self.candidates:
+            names = "no clearly labelled company names"
+        else:
+            names = "; ".join(f'"{c}"' for c in self.candidates[:5])
+        return (
+            f"Automated pre-check (string matching, may be wrong): the document mentions {names}. "
+            f'Closest to "{application_company_name}": '
+            + (f'"{self.best_candidate}" (similarity {self.score:.2f}). ' if self.best_candidate else "none. ")
+            + {
+                "match": "This looks like the same company.",
+                "mismatch": "This looks like a different company.",
+                "uncertain": "The pre-check could not decide.",
+            }[self.verdict]
+        )
+
+
+def check_company(
+    application_company_name: str,
+    text: str,
+    match_threshold: float = 0.85,
+    mismatch_threshold: float = 0.5,
+) -> CompanyCheck:
+    target = normalize_company_name(application_company_name)
+    if not target:
+        return CompanyCheck("uncertain", 0.0)
+    # Whole-name occurrence anywhere in the text (any case, punctuation and suffix dropped).
+    words = _PUNCTUATION.sub(" ", text.casefold().replace("&", " and ")).split()
+    name_in_text = f" {' '.join(target)} " in f" {' '.join(words)} "
+    candidates = extract_company_names(text)
+    best_score, best_candidate = 0.0, None
+    for candidate in candidates:
+        score = name_similarity(target, normalize_company_name(candidate))
+        if score > best_score:
+            best_score, best_candidate = score, candidate
+    if best_score >= match_threshold or (name_in_text and not candidates):
+        return CompanyCheck("match", best_score if candidates else 1.0, best_candidate, candidates, name_in_text)
+    # Names the extractor missed (no suffix, OCR noise) must not turn into a confident mismatch.
+    if candidates and best_score < mismatch_threshold and not _tokens_occur(target, set(words)):
+        return CompanyCheck("mismatch", best_score, best_candidate, candidates, name_in_text)
+    return CompanyCheck("uncertain", best_score, best_candidate, candidates, name_in_text)
@@ -0,0 +1,293 @@
+"""
+Download layer shared by /extract and /analyze.
+Responses are streamed into one buffer (no temp file) with an early size and content-type check.
+Downloaded files are stored on disk by content hash (sha256) and an SQLite index maps each URL
+to its blob plus the ETag/Last-Modified validators. Within DOWNLOAD_CACHE_FRESH_SECONDS a cached
+file is served as-is; after that it is revalidated with a conditional GET. The cache is an LRU
+bounded by DOWNLOAD_CACHE_MAX_BYTES.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+
+from app.core.config import settings
+from app.services.admission import admission
+from app.services.metrics import count_download
+
+
+_PDF_SNIFF_BYTES = 1024
+
+
+class DocumentDownloadError(ValueError):
+    """The document could not be accepted (too large, wrong content type, not a PDF)."""
+
+
+@dataclass
+class FetchedDocument:
+    url: str
+    content: Union[bytes, bytearray]
+    sha256: str
+    content_type: str
+    from_cache: bool = False
+
+
+class DownloadCache:
+    """Content-addressed blob store with an SQLite url -> blob index. Methods are blocking."""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "blobs"), exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False, timeout=30
+        )
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    content_type TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    validated_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", sha256[:2], sha256)
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, size, content_type, etag, last_modified, validated_at FROM entries WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        keys = ("sha256", "size", "content_type", "etag", "last_modified", "validated_at")
+        return dict(zip(keys, row))
+
+    def read(self, url: str, sha256: str, revalidated: bool = False) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(sha256), "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        now = time.time()
+        with self._lock, self._conn:
+            if revalidated:
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ?, validated_at = ? WHERE url = ?", (now, now, url)
+                )
+            else:
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE url = ?", (now, url))
+        return content
+
+    def store(
+        self,
+        url: str,
+        content: bytes,
+        sha256: str,
+        content_type: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ) -> None:
+        if len(content) > self.max_bytes:
+            return
+        path = self._blob_path(sha256)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, sha256, len(content), content_type, etag, last_modified, now, now),
+            )
+        self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used blobs (and every URL pointing at them) until under max_bytes."""
+        with self._lock:
+            blobs = self._conn.execute(
+                "SELECT sha256, MAX(size), MAX(last_access) FROM entries GROUP BY sha256 ORDER BY MAX(last_access)"
+            ).fetchall()
+            total = sum(size for _, size, _ in blobs)
+            for sha256, size, _ in blobs:
+                if total <= self.max_bytes:
+                    break
+                with self._conn:
+                    self._conn.execute("DELETE FROM entries WHERE sha256 = ?", (sha256,))
+                try:
+                    os.unlink(self._blob_path(sha256))
+                except OSError:
+                    pass
+                total -= size
+
+    def usage(self) -> Dict[str, int]:
+        with self._lock:
+            entries, = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            blobs, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT sha256, MAX(size) AS size FROM entries GROUP BY sha256)"
+            ).fetchone()
+        return {"entries": entries, "blobs": blobs, "bytes": size}
+
+
+class DocumentFetcher:
+    def __init__(
+        self,
+        cache_dir: Optional[str],
+        max_cache_bytes: int,
+        fresh_seconds: float,
+        max_bytes: int,
+        allowed_content_types: List[str],
+        timeout: float = 60.0,
+    ):
+        self.cache = DownloadCache(cache_dir, max_cache_bytes) if cache_dir and max_cache_bytes > 0 else None
+        self.fresh_seconds = fresh_seconds
+        self.max_bytes = max_bytes
+        self.allowed_content_types = {t.lower() for t in allowed_content_types}
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str) -> FetchedDocument:
+        entry = await asyncio.to_thread(self.cache.lookup, url) if self.cache else None
+        if entry and time.time() - entry["validated_at"] < self.fresh_seconds:
+            content = await asyncio.to_thread(self.cache.read, url, entry["sha256"])
+            if content is not None:
+                self.hits += 1
+                count_download(len(content), "cache")
+                return FetchedDocument(url, content, entry["sha256"], entry["content_type"] or "", True)
+
+        async with admission.stage("download").slot():
+            return await self._fetch_remote(url, entry)
+
+    async def _fetch_remote(self, url: str, entry: Optional[Dict[str, Any]]) -> FetchedDocument:
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        client = self._get_client()
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code != 304 or not entry:
+                return await self._download(url, response)
+            content = await asyncio.to_thread(self.cache.read, url, entry["sha256"], True)
+            if content is not None:
+                self.hits += 1
+                self.revalidations += 1
+                count_download(len(content), "cache")
+                return FetchedDocument(url, content, entry["sha256"], entry["content_type"] or "", True)
+        # Blob was evicted under us: fall back to an unconditional download.
+        async with client.stream("GET", url) as response:
+            return await self._download(url, response)
+
+    async def _download(self, url: str, response: httpx.Response) -> FetchedDocument:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in self.allowed_content_types:
+            raise DocumentDownloadError(f"Unsupported document content type: {content_type}")
+        content = await self._read_body(response)
+
+        self.misses += 1
+        count_download(len(content), "network")
+        sha256 = hashlib.sha256(content).hexdigest()
+        if self.cache and content and "no-store" not in response.headers.get("cache-control", ""):
+            await asyncio.to_thread(
+                self.cache.store,
+                url,
+                content,
+                sha256,
+                content_type,
+                response.headers.get("etag"),
+                response.headers.get("last-modified"),
+            )
+        return FetchedDocument(url, content, sha256, content_type, False)
+
+    async def _read_body(self, response: httpx.Response) -> bytearray:
+        """
+        Stream the body into a single buffer, preallocated from Content-Length when the body is
+        not content-encoded. Oversized and non-PDF bodies are rejected as soon as that is known.
+        """
+        declared = response.headers.get("content-length", "")
+        expected = int(declared) if declared.isdigit() else None
+        encoded = response.headers.get("content-encoding", "identity").lower() != "identity"
+        if expected is not None and not encoded and expected > self.max_bytes:
+            raise DocumentDownloadError(f"Document is {expected} bytes; the limit is {self.max_bytes}")
+
+        buf = bytearray(expected) if expected is not None and not encoded else bytearray()
+        received = 0
+        sniffed = False
+        async for chunk in response.aiter_bytes():
+            end = received + len(chunk)
+            if end > self.max_bytes:
+                raise DocumentDownloadError(f"Document exceeds the {self.max_bytes} byte limit")
+            if end <= len(buf):
+                buf[received:end] = chunk
+            else:
+                del buf[received:]
+                buf += chunk
+            received = end
+            if not sniffed and received >= _PDF_SNIFF_BYTES:
+                self._check_pdf_header(buf)
+                sniffed = True
+        del buf[received:]
+        if not sniffed and buf:
+            self._check_pdf_header(buf)
+        return buf
+
+    @staticmethod
+    def _check_pdf_header(buf: bytearray) -> None:
+        # PDF readers accept the header anywhere in the first 1024 bytes.
+        if buf.find(b"%PDF-", 0, _PDF_SNIFF_BYTES) == -1:
+            raise DocumentDownloadError("Downloaded file is not a PDF")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats: Dict[str, Any] = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "enabled": self.cache is not None,
+        }
+        if self.cache:
+            stats.update(self.cache.usage())
+        return stats
+
+
+document_fetcher = DocumentFetcher(
+    cache_dir=settings.DOWNLOAD_CACHE_DIR,
+    max_cache_bytes=settings.DOWNLOAD_CACHE_MAX_BYTES,
+    fresh_seconds=settings.DOWNLOAD_CACHE_FRESH_SECONDS,
+    max_bytes=settings.DOWNLOAD_MAX_BYTES,
+    allowed_content_types=settings.DOWNLOAD_ALLOWED_CONTENT_TYPES,
+)
@@ -0,0 +1,152 @@
+"""
+Persistent embedding cache for document analysis.
+Vectors are keyed by sha256(model + chunk text) and stored as float32 blobs in an SQLite (WAL)
+database, so every uvicorn worker on the host shares them and boilerplate chunks (certificate
+footers, standard form text) are only embedded once.
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.services.metrics import timed
+
+
+def _as_float32(vector: List[float]) -> List[float]:
+    # Round fresh vectors the same way stored ones are, so a hit and a miss return identical values.
+    return array("f", vector).tolist()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._writes_since_prune = 0
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(time.time(), key) for key in found],
+                    )
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                    [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+                )
+            self._writes_since_prune += len(items)
+            if self._writes_since_prune >= 1000:
+                self._writes_since_prune = 0
+                self._prune()
+
+    def _prune(self) -> None:
+        with self._conn:
+            self._conn.execute(
+                """DELETE FROM embeddings WHERE key IN (
+                    SELECT key FROM embeddings ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings client; only texts missing from the cache are sent upstream."""
+
+    def __init__(self, underlying: Embeddings, model: str, cache: Optional[EmbeddingCache]):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, texts: List[str]):
+        keys = [EmbeddingCache.key(self.model, text) for text in texts]
+        found = self.cache.get_many(list(set(keys)))
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return keys, found, missing
+
+    # Chroma's aadd_documents runs the sync add_texts -> embed_documents in an executor, so the
+    # sync path is timed as "embed" too (the executor copies the request's context).
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not self.cache or not texts:
+            with timed("embed"):
+                return self.underlying.embed_documents(texts)
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            with timed("embed"):
+                vectors = self.underlying.embed_documents([texts[i] for i in missing])
+            new = {keys[i]: _as_float32(vector) for i, vector in zip(missing, vectors)}
+            self.cache.put_many(new)
+            found.update(new)
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not self.cache or not texts:
+            with timed("embed"):
+                return await self.underlying.aembed_documents(texts)
+        keys, found, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            with timed("embed"):
+                vectors = await self.underlying.aembed_documents([texts[i] for i in missing])
+            new = {keys[i]: _as_float32(vector) for i, vector in zip(missing, vectors)}
+            await asyncio.to_thread(self.cache.put_many, new)
+            found.update(new)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.cache is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": self.cache.size() if self.cache else 0,
+        }
@@ -0,0 +1,244 @@
+"""
+Rule-based pre-extraction of the structured fields the analysis prompt asks for (registration
+and certificate numbers, issue / incorporation / expiry dates, directors, TIN, contractor
+class). Each document type maps to a profile, a list of fields; each field is a set of
+label-anchored regexes compiled once, and dates are parsed day-first into ISO format.
+
+Besides the fields, `extract_fields` returns the text that is still unresolved: lines a field
+value was taken from (with little else on them) and boilerplate repeated on three or more pages
+are dropped. The LLM then gets the fields plus that remainder instead of the whole document.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.company_matcher import extract_company_names
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_DATE = (
+    r"(?:\d{4}-\d{1,2}-\d{1,2}"
+    r"|\d{1,2}[/.\-]\d{1,2}[/.\-]\d{2,4}"
+    rf"|\d{{1,2}}(?:st|nd|rd|th)?(?:\s+day)?(?:\s+of)?[\s\-]+{_MONTH}\.?,?[\s\-]+\d{{4}}"
+    rf"|{_MONTH}\.?\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}})"
+)
+_SEP = r"\s*[:.\-]?\s*"
+
+
+def parse_date(raw: str) -> Optional[str]:
+    """ISO date for the formats _DATE matches (numeric dates are day first), or None."""
+    text = raw.strip().lower().replace(",", " ")
+    try:
+        m = re.fullmatch(r"(\d{4})-(\d{1,2})-(\d{1,2})", text)
+        if m:
+            return date(int(m.group(1)), int(m.group(2)), int(m.group(3))).isoformat()
+        m = re.fullmatch(r"(\d{1,2})[/.\-](\d{1,2})[/.\-](\d{2,4})", text)
+        if m:
+            year = int(m.group(3))
+            if year < 100:
+                year += 2000 if year < 70 else 1900
+            return date(year, int(m.group(2)), int(m.group(1))).isoformat()
+        m = re.search(r"(\d{1,2})(?:st|nd|rd|th)?\D+?([a-z]{3})[a-z]*\.?[\s\-]+(\d{4})", text)
+        if m and m.group(2) in _MONTHS:
+            return date(int(m.group(3)), _MONTHS[m.group(2)], int(m.group(1))).isoformat()
+        m = re.search(r"([a-z]{3})[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?\s+(\d{4})", text)
+        if m and m.group(1) in _MONTHS:
+            return date(int(m.group(3)), _MONTHS[m.group(1)], int(m.group(2))).isoformat()
+    except ValueError:
+        pass
+    return None
+
+
+def _date_field(*labels: str) -> List[str]:
+    return [rf"\b(?:{label}){_SEP}(?:the\s+)?({_DATE})" for label in labels]
+
+
+# field name -> regexes; group 1 is the value. Tried in order, first match in the document wins.
+# Labels start at a word boundary ("dated" is not the end of "updated"). Matching ignores case,
+# so letter parts of identifiers are made case-sensitive with (?-i:...) or "No. is 123" would
+# read as the number "is 123".
+_FIELD_PATTERNS: Dict[str, List[str]] = {
+    "registration_number": [
+        r"\b(?:registration|reg\.?|company|entity|incorporation)\s*(?:no\.?|number|#)" + _SEP
+        + r"((?:(?-i:[A-Z]{1,4})[\-/ ]?)?\d{3,}[\w/\-]*)",
+        r"\b(CS\d{6,})\b",
+    ],
+    "certificate_number": [
+        r"\b(?:certificate|clearance|cert\.?)\s*(?:no\.?|number|#)" + _SEP + r"((?-i:[A-Z0-9][A-Z0-9/\-]{3,}))",
+    ],
+    "tin": [
+        r"\b(?:TIN|tax\s*payer\s+identification\s+number)\s*(?:no\.?|number)?" + _SEP + r"((?-i:[A-Z]\d{10}|GHA-\d{9}-\d))",
+    ],
+    "vat_number": [
+        r"\bVAT\s*(?:registration\s*)?(?:no\.?|number)" + _SEP + r"((?-i:[A-Z0-9][A-Z0-9\-]{5,}))",
+    ],
+    "employer_number": [
+        r"\bemployer(?:'s)?\s*(?:no\.?|number)" + _SEP + r"((?-i:[A-Z0-9][A-Z0-9/\-]{3,}))",
+    ],
+    "issue_date": _date_field(
+        r"date\s+of\s+(?:issue|issuance)", r"issue\s+date", r"date\s+issued", r"issued\s+on", r"dated",
+    ),
+    "incorporation_date": _date_field(
+        r"date\s+of\s+incorporation", r"incorporated\s+on", r"incorporated\s+(?:on\s+)?this",
+    ),
+    "registration_date": _date_field(r"date\s+of\s+registration", r"registration\s+date", r"registered\s+on"),
+    "commencement_date": _date_field(
+        r"date\s+of\s+commencement", r"commencement\s+date", r"(?:entitled\s+to\s+)?commence\s+business\s+on",
+    ),
+    "expiry_date": _date_field(
+        r"expiry\s+date", r"date\s+of\s+expiry", r"expires?\s+on", r"expiring\s+on",
+        r"valid\s+(?:until|till|through|up\s+to)", r"validity\s+period[^\n]{0,40}?\bto",
+    ),
+    "contractor_class": [
+        r"\bclass(?:ification)?\s*(?:/\s*grade|\s+grade)?" + _SEP + r"((?:[DKEG]\d)(?:\s*/?\s*[DKEG]\d)?)\b",
+    ],
+    "category": [
+        r"\bcategory" + _SEP + r"([A-Za-z][A-Za-z &/]{2,40}?)\s*(?:$|\n|,|;|class)",
+    ],
+    "directors": [
+        r"\bdirectors?(?:\s*\(s\))?\s*[:\-]\s*([^\n]{3,200})",
+    ],
+}
+_COMPILED = {
+    name: [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in patterns]
+    for name, patterns in _FIELD_PATTERNS.items()
+}
+
+# profile -> the fields it looks for
+PROFILES: Dict[str, List[str]] = {
+    "certificate_of_incorporation": ["registration_number", "incorporation_date", "issue_date", "directors"],
+    "certificate_to_commence_business": ["registration_number", "commencement_date", "issue_date"],
+    "tax_clearance": ["certificate_number", "tin", "issue_date", "expiry_date"],
+    "ssnit_clearance": ["certificate_number", "employer_number", "issue_date", "expiry_date"],
+    "vat_registration": ["vat_number", "tin", "registration_date"],
+    "classification_certificate": ["certificate_number", "contractor_class", "category", "issue_date", "expiry_date"],
+    "generic": ["registration_number", "certificate_number", "issue_date", "expiry_date"],
+}
+# document_type keyword -> profile; the first keyword contained in the normalized type wins.
+_PROFILE_KEYWORDS = [
+    ("incorporation", "certificate_of_incorporation"),
+    ("commence", "certificate_to_commence_business"),
+    ("ssnit", "ssnit_clearance"),
+    ("social_security", "ssnit_clearance"),
+    ("tax", "tax_clearance"),
+    ("vat", "vat_registration"),
+    ("classification", "classification_certificate"),
+    ("contractor_certificate", "classification_certificate"),
+    ("registration", "certificate_of_incorporation"),
+]
+_DATE_FIELDS = {"issue_date", "incorporation_date", "registration_date", "commencement_date", "expiry_date"}
+
+
+def profile_for(document_type: str) -> str:
+    normalized = re.sub(r"[^a-z0-9]+", "_", (document_type or "").lower())
+    for keyword, profile in _PROFILE_KEYWORDS:
+        if keyword in normalized:
+            return profile
+    return "generic"
+
+
+@dataclass
+class FieldExtraction:
+    profile: str
+    values: Dict[str, Any] = field(default_factory=dict)
+    sources: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)
+    # Per input segment: its text without resolved lines and repeated boilerplate.
+    unresolved: List[str] = field(default_factory=list)
+
+    def prompt_block(self) -> str:
+        lines = ["PRE-EXTRACTED FIELDS (found by pattern matching; verify them against the text below):"]
+        for name, value in self.values.items():
+            source = self.sources[name]
+            shown = ", ".join(value) if isinstance(value, list) else value
+            where = [f"page {source['page']}"] if source.get("page") else []
+            if source.get("raw") and source["raw"] != shown:
+                where.append(f'written "{source["raw"]}"')
+            lines.append(f"- {name}: {shown}" + (f" ({', '.join(where)})" if where else ""))
+        for name in self.missing:
+            lines.append(f"- {name}: NOT FOUND by pattern matching; look for it in the text")
+        return "\n".join(lines)
+
+    def metadata(self) -> Dict[str, Any]:
+        return {"profile": self.profile, "missing": self.missing, "sources": self.sources}
+
+
+def _split_names(raw: str) -> List[str]:
+    names = [n.strip(" .;:-") for n in re.split(r",|;|\band\b|&", raw)]
+    return [n for n in names if len(n) > 2 and not any(ch.isdigit() for ch in n)][:20]
+
+
+def extract_fields(document_type: str, segments: List[Tuple[Optional[int], str]]) -> FieldExtraction:
+    """`segments` are (page number, text) in document order: one per page or per element."""
+    profile = profile_for(document_type)
+    result = FieldExtraction(profile=profile)
+    # (segment index, line index) of every line a value was taken from
+    resolved_lines = set()
+    segment_lines = [text.split("\n") for _, text in segments]
+
+    for name in PROFILES[profile]:
+        for pattern in _COMPILED[name]:
+            hit = None
+            for index, (page, text) in enumerate(segments):
+                m = pattern.search(text)
+                if m:
+                    hit = (index, page, text, m)
+                    break
+            if not hit:
+                continue
+            index, page, text, m = hit
+            raw = " ".join(m.group(1).split())
+            if name in _DATE_FIELDS:
+                value = parse_date(raw)
+                if value is None:
+                    continue
+            elif name == "directors":
+                value = _split_names(raw)
+                if not value:
+                    continue
+            else:
+                value = raw
+            result.values[name] = value
+            result.sources[name] = {"page": page, "raw": raw}
+            line_no = text.count("\n", 0, m.start())
+            line = segment_lines[index][line_no] if line_no < len(segment_lines[index]) else ""
+            # Only drop the line if the match is (nearly) all there is on it.
+            if len(line.strip()) - len(m.group(0).strip()) <= 15:
+                resolved_lines.add((index, line_no))
+            break
+        else:
+            result.missing.append(name)
+
+    names = extract_company_names("\n".join(text for _, text in segments), limit=5)
+    if names:
+        result.values["company_names"] = names
+        result.sources["company_names"] = {}
+
+    # Lines seen on three or more pages (headers, footers, stamps) are kept once.
+    pages_by_line: Dict[str, set] = {}
+    for (page, _), lines in zip(segments, segment_lines):
+        for line in lines:
+            key = " ".join(line.split()).lower()
+            if len(key) >= 4:
+                pages_by_line.setdefault(key, set()).add(page)
+    repeated = {key for key, pages in pages_by_line.items() if len(pages) >= 3}
+    seen_repeated = set()
+    for index, lines in enumerate(segment_lines):
+        kept = []
+        for line_no, line in enumerate(lines):
+            key = " ".join(line.split()).lower()
+            if (index, line_no) in resolved_lines:
+                # Its copies on later pages are resolved too.
+                seen_repeated.add(key)
+                continue
+            if key in repeated:
+                if key in seen_repeated:
+                    continue
+                seen_repeated.add(key)
+            kept.append(line)
+        result.unresolved.append("\n".join(kept).strip())
+    return result
@@ -0,0 +1,104 @@
+"""
+Heading-aware index over guidelines.md so the chat prompt only carries the sections that are
+relevant to the question (e.g. "5.3 Required Documents", "9.1 Certificate Fees ...") instead of
+the whole knowledge base. Sections are scored with BM25; heading words count double.
+"""
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*\S)\s*$")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it its me my of on or "
+    "our should the their this to was what when where which who will with you your".split()
+)
+
+
+_SUFFIXES = ("ations", "ation", "ings", "ing", "als", "al", "ed", "s")
+
+
+def _stem(word: str) -> str:
+    # Crude suffix stripping so "renew"/"renewal" and "fee"/"fees" hit the same sections.
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+
+
+@dataclass
+class Section:
+    title: str
+    path: str
+    text: str
+    terms: Counter = field(default_factory=Counter)
+    length: int = 0
+
+
+class GuidelinesIndex:
+    def __init__(self, markdown: str, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.sections = self._split(markdown)
+        for section in self.sections:
+            section.terms = Counter(tokenize(section.text)) + Counter(tokenize(section.title))
+            section.length = sum(section.terms.values())
+        self.avg_length = sum(s.length for s in self.sections) / max(len(self.sections), 1)
+        doc_freq = Counter(term for s in self.sections for term in s.terms)
+        n = len(self.sections)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+
+    @staticmethod
+    def _split(markdown: str) -> List[Section]:
+        sections: List[Section] = []
+        stack: List[tuple] = []  # (level, title) of the enclosing headings
+        lines: List[str] = []
+
+        def flush():
+            body = "\n".join(lines).strip()
+            if stack and body:
+                path = " > ".join(t for level, t in stack if level > 1) or stack[-1][1]
+                sections.append(Section(title=stack[-1][1], path=path, text=body))
+
+        for line in markdown.splitlines():
+            match = _HEADING_RE.match(line)
+            if match:
+                flush()
+                level = len(match.group(1))
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, match.group(2)))
+                lines = [line]
+            else:
+                lines.append(line)
+        flush()
+        return sections
+
+    def search(self, query: str, k: int = 4) -> List[Section]:
+        terms = set(tokenize(query))
+        scored = []
+        for position, section in enumerate(self.sections):
+            score = 0.0
+            for term in terms:
+                tf = section.terms.get(term)
+                if not tf:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * section.length / self.avg_length)
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scored.append((score, -position, section))
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        # Keep document order in the prompt so numbered sections read naturally.
+        top = sorted(scored[:k], key=lambda item: -item[1])
+        return [section for _, _, section in top]
+
+    def render(self, sections: List[Section]) -> str:
+        return "\n\n".join(f"[{s.path}]\n{s.text}" for s in sections)
@@ -0,0 +1,122 @@
+"""
+Stage timing for /analyze, /extract and /chat.
+`timed(stage)` records a stage's duration in a Prometheus histogram (served on /metrics) and in
+the current request's Server-Timing list, which the HTTP middleware in main.py turns into a
+`Server-Timing` response header. prometheus_client is optional: without it only the
+Server-Timing header is produced. Time to first token of streamed /chat answers is a histogram
+of its own (it ends mid-response, after the headers have gone out).
+"""
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Histogram
+except ImportError:
+    prometheus_client = None
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160)
+
+if prometheus_client:
+    STAGE_SECONDS = Histogram(
+        "mwhr_stage_seconds", "Time spent per processing stage", ["stage"], buckets=_BUCKETS
+    )
+    PAGE_SECONDS = Histogram(
+        "mwhr_page_seconds", "Time to extract one PDF page", ["method"], buckets=_BUCKETS
+    )
+    PAGES_TOTAL = Counter("mwhr_pages_extracted_total", "PDF pages extracted", ["method"])
+    DOWNLOAD_BYTES = Counter("mwhr_download_bytes_total", "Document bytes served", ["source"])
+    CHAT_TTFT_SECONDS = Histogram(
+        "mwhr_chat_time_to_first_token_seconds",
+        "Time to the first token of a streamed /chat answer, including the wait for an llm slot",
+        buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 20),
+    )
+
+# Per request: (stage, seconds) in completion order; None outside an HTTP request.
+_server_timing: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("server_timing", default=None)
+
+
+def start_request() -> List[Tuple[str, float]]:
+    timings: List[Tuple[str, float]] = []
+    _server_timing.set(timings)
+    return timings
+
+
+def detach_request() -> None:
+    """For long-lived tasks spawned from a request (job workers): stop adding to its header."""
+    _server_timing.set(None)
+
+
+def record(stage: str, seconds: float) -> None:
+    if prometheus_client:
+        STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _server_timing.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextlib.contextmanager
+def timed(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def observe_pages(pages: List[Dict]) -> None:
+    if not prometheus_client:
+        return
+    for page in pages:
+        method = "ocr" if page.get("ocr") else "text"
+        PAGES_TOTAL.labels(method).inc()
+        if "seconds" in page:
+            PAGE_SECONDS.labels(method).observe(page["seconds"])
+
+
+def observe_ttft(seconds: float) -> None:
+    if prometheus_client:
+        CHAT_TTFT_SECONDS.observe(seconds)
+
+
+def count_download(nbytes: int, source: str) -> None:
+    if prometheus_client:
+        DOWNLOAD_BYTES.labels(source).inc(nbytes)
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    # Repeated stages (map calls, retries) are summed into one entry per stage.
+    totals: Dict[str, float] = {}
+    for stage, seconds in timings:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+def render_latest() -> Tuple[bytes, str]:
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: collect the stages timed while handling a request into Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = start_request()
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                entries = timings + [("total", time.perf_counter() - started)]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing_header(entries).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
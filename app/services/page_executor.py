@@ -0,0 +1,307 @@
+"""
+Process-pool page extraction shared by /extract and /analyze.
+PyMuPDF text extraction, table/form detection and Tesseract OCR are CPU-bound and block the
+event loop, so the pages of one document are fanned out to worker processes and collected back
+in page order.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.metrics import observe_pages
+from app.services.page_layout import page_elements
+from app.services.page_ocr import classify_page, load_tesseract, ocr_page
+from app.services.warmup import warmup
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+
+def extract_page(
+    doc,
+    page_no: int,
+    use_ocr: bool = True,
+    extract_tables: bool = False,
+    extract_forms: bool = False,
+    languages: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Extract one page: text layer first, OCR (in `languages`) when the page has little, no or
+    garbled text (see page_ocr). With extract_tables / extract_forms, a text-layer page that has
+    tables or forms also gets "elements" (see page_layout.page_elements).
+    """
+    started = time.perf_counter()
+    page = doc[page_no]
+    text = (page.get_text() or "").strip()
+    ocr = False
+    result: Dict[str, Any] = {"page_number": page_no + 1}
+    if use_ocr:
+        plan = classify_page(page, text)
+        result["page_class"] = plan.kind
+        if plan.needs_ocr and load_tesseract():
+            ocr_text, result["ocr_dpi"] = ocr_page(page, plan, languages)
+            # Region OCR adds to the page's (short) text layer; page OCR replaces the text.
+            text = "\n\n".join(t for t in (text, ocr_text) if t) if plan.kind == "mixed" else ocr_text
+            ocr = True
+    result.update(text=text, ocr=ocr)
+    if (extract_tables or extract_forms) and text and not ocr:
+        elements = page_elements(page, extract_tables, extract_forms)
+        if any(element["type"] != "Text" for element in elements):
+            result["elements"] = elements
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def extract_all_pages(
+    pdf_bytes: bytes,
+    use_ocr: bool = True,
+    extract_tables: bool = False,
+    extract_forms: bool = False,
+    languages: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        pages = []
+        for page_no in range(len(doc)):
+            try:
+                pages.append(extract_page(doc, page_no, use_ocr, extract_tables, extract_forms, languages))
+            except Exception as e:
+                pages.append(_failed_page(page_no, e))
+        return pages
+    finally:
+        doc.close()
+
+
+def _failed_page(page_no: int, error: Exception) -> Dict[str, Any]:
+    # One bad page (corrupt object, OCR error) leaves that page empty, not the whole document.
+    print(f"Page {page_no + 1} extraction failed: {error!r}")
+    return {"page_number": page_no + 1, "text": "", "ocr": False, "failed": True}
+
+
+def count_pages(pdf_bytes: bytes) -> int:
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+# Worker side: each process keeps the last few documents open so that consecutive pages
+# of the same document are not re-parsed for every task.
+_WORKER_DOC_CACHE_SIZE = 2
+_worker_docs: "OrderedDict[str, Any]" = OrderedDict()
+
+
+def _worker_open(doc_key: str, shm_name: Optional[str], size: int, pdf_bytes: Optional[bytes]):
+    doc = _worker_docs.get(doc_key)
+    if doc is not None:
+        _worker_docs.move_to_end(doc_key)
+        return doc
+    if shm_name is not None:
+        # Spawned workers share the parent's resource tracker, so attaching here does not
+        # change who unlinks the block: the parent does, once all pages are done.
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            pdf_bytes = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    _worker_docs[doc_key] = doc
+    while len(_worker_docs) > _WORKER_DOC_CACHE_SIZE:
+        _, old = _worker_docs.popitem(last=False)
+        old.close()
+    return doc
+
+
+def _worker_ping() -> int:
+    # Unpickling this task imports the module (PyMuPDF) in the worker; load Tesseract too.
+    load_tesseract()
+    return os.getpid()
+
+
+def _extract_page_task(
+    doc_key: str,
+    shm_name: Optional[str],
+    size: int,
+    pdf_bytes: Optional[bytes],
+    page_no: int,
+    use_ocr: bool,
+    extract_tables: bool = False,
+    extract_forms: bool = False,
+    languages: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    doc = _worker_open(doc_key, shm_name, size, pdf_bytes)
+    return extract_page(doc, page_no, use_ocr, extract_tables, extract_forms, languages)
+
+
+class PageExecutor:
+    """
+    Runs page extraction in a process pool. At most `workers + max_queued_pages` pages are
+    submitted to the pool at once (across all documents); further pages wait on the event loop,
+    so a page's timeout only covers a short pool queue plus its own run time. A page that
+    exceeds `page_timeout` is returned with empty text and `timed_out` set, and the pool is
+    replaced when the page was still running (its worker terminated).
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queued_pages: int = 4,
+        page_timeout: float = 60.0,
+    ):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_queued_pages = max(0, max_queued_pages)
+        self.page_timeout = page_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max(1, self.workers + self.max_queued_pages))
+        self._doc_seq = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _reset_pool(self, terminate: bool = False) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            # Snapshot before shutdown: it drops the pool's reference to its processes.
+            processes = list((pool._processes or {}).values()) if terminate else []
+            pool.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                # The old pool notices, and fails its remaining futures with BrokenProcessPool,
+                # which releases their slots.
+                process.terminate()
+
+    def shutdown(self) -> None:
+        self._reset_pool()
+
+    async def warm_up(self) -> None:
+        """Warm-up loader for the "extraction" subsystem: start every worker process now."""
+        if not fitz or self.workers <= 0:
+            return
+        pool = self._get_pool()
+        # One task per worker at once makes the pool spawn all of them rather than reuse the first.
+        await asyncio.gather(*[asyncio.wrap_future(pool.submit(_worker_ping)) for _ in range(self.workers)])
+
+    async def extract_pages(
+        self,
+        pdf_bytes: bytes,
+        use_ocr: bool = True,
+        extract_tables: bool = False,
+        extract_forms: bool = False,
+        languages: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return one result dict per page, in page order: {page_number, text, ocr[, elements]}."""
+        if not fitz or not pdf_bytes:
+            return []
+        if self.workers <= 0:
+            pages = await asyncio.to_thread(
+                extract_all_pages, pdf_bytes, use_ocr, extract_tables, extract_forms, languages
+            )
+            observe_pages(pages)
+            return pages
+
+        page_count = await asyncio.to_thread(count_pages, pdf_bytes)
+        if page_count == 0:
+            return []
+
+        self._doc_seq += 1
+        doc_key = f"{os.getpid()}-{self._doc_seq}"
+        shm = None
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=len(pdf_bytes))
+            shm.buf[: len(pdf_bytes)] = pdf_bytes
+        except (OSError, ValueError):
+            # /dev/shm too small or unavailable: ship the bytes with each task instead.
+            shm = None
+        try:
+            pages = await asyncio.gather(*[
+                self._run_page(
+                    doc_key, shm, pdf_bytes, page_no, use_ocr, extract_tables, extract_forms, languages
+                )
+                for page_no in range(page_count)
+            ])
+            observe_pages(pages)
+            return pages
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def _release_slot(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            # Event loop already closed (shutdown); nothing is waiting on the slot.
+            pass
+
+    async def _run_page(
+        self,
+        doc_key,
+        shm,
+        pdf_bytes,
+        page_no: int,
+        use_ocr: bool,
+        extract_tables: bool,
+        extract_forms: bool,
+        languages: Optional[List[str]],
+    ) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        await self._slots.acquire()
+        try:
+            future = self._get_pool().submit(
+                _extract_page_task,
+                doc_key,
+                shm.name if shm is not None else None,
+                len(pdf_bytes),
+                None if shm is not None else pdf_bytes,
+                page_no,
+                use_ocr,
+                extract_tables,
+                extract_forms,
+                languages,
+            )
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_pool()
+            return {"page_number": page_no + 1, "text": "", "ocr": False, "failed": True}
+        except Exception:
+            self._slots.release()
+            raise
+        # Free the slot only when the worker is actually done with the page, so a timed-out
+        # page still counts against the pending limit while it occupies a process.
+        future.add_done_callback(lambda _: self._release_slot(loop))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.page_timeout)
+        except asyncio.TimeoutError:
+            if not future.cancel():
+                # Already running: a worker stuck in a page (hung tesseract) would keep its
+                # process and slot forever, so replace the pool. Pages of other documents
+                # running in it come back failed.
+                self._reset_pool(terminate=True)
+            return {"page_number": page_no + 1, "text": "", "ocr": False, "timed_out": True}
+        except BrokenProcessPool:
+            self._reset_pool()
+            return {"page_number": page_no + 1, "text": "", "ocr": False, "failed": True}
+        except Exception as e:
+            return _failed_page(page_no, e)
+
+
+page_executor = PageExecutor(
+    workers=settings.PAGE_EXECUTOR_WORKERS,
+    max_queued_pages=settings.PAGE_EXECUTOR_MAX_QUEUED_PAGES,
+    page_timeout=settings.PAGE_EXECUTOR_PAGE_TIMEOUT_SECONDS,
+)
+warmup.register("extraction", page_executor.warm_up)
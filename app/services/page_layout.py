@@ -0,0 +1,151 @@
+"""
+Local table and form detection on a PDF page's text layer, so /analyze can return tables and
+forms without Unstructured. Tables come from PyMuPDF's `find_tables` on pages that have ruling
+lines (borderless tables stay in the text); forms are the page's AcroForm widgets plus runs of
+"Label: value" lines. The page is returned as elements in reading order (text, tables and
+forms), with table/form text left out of the surrounding text so nothing is sent to the LLM
+twice.
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# "Registration No.: CS123456", "Date of Issue - 12/03/2020"; the label is short and starts with a letter.
+_KEY_VALUE = re.compile(r"^\s*([A-Za-z][A-Za-z0-9 .'/()&#-]{1,48}?)\s*[:\-]\s+(\S.{0,200}?)\s*$")
+# Consecutive key/value lines needed before they count as a form region.
+_MIN_FORM_FIELDS = 2
+# find_tables costs 10-150 ms per page even when it finds nothing, so it only runs on pages with
+# at least this many vector path items (ruling lines / cell rectangles).
+_MIN_TABLE_PATH_ITEMS = 4
+
+
+def _cell(value: Optional[str]) -> str:
+    return " ".join((value or "").split())
+
+
+def _table_html(header: Optional[List[str]], rows: List[List[str]]) -> str:
+    parts = ["<table>"]
+    if header:
+        parts.append("<thead><tr>" + "".join(f"<th>{html.escape(c)}</th>" for c in header) + "</tr></thead>")
+    parts.append("<tbody>")
+    for row in rows:
+        parts.append("<tr>" + "".join(f"<td>{html.escape(c)}</td>" for c in row) + "</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def _form_html(fields: List[Dict[str, str]]) -> str:
+    rows = "".join(
+        f"<tr><th>{html.escape(f['key'])}</th><td>{html.escape(f['value'])}</td></tr>" for f in fields
+    )
+    return f"<table>{rows}</table>"
+
+
+def _form_element(fields: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {
+        "type": "Form",
+        "text": "\n".join(f"{f['key']}: {f['value']}" for f in fields),
+        "html": _form_html(fields),
+    }
+
+
+def _find_tables(page) -> List[Tuple[Any, Dict[str, Any]]]:
+    """(bbox, Table element) for every table with at least two rows and two columns."""
+    found = []
+    if sum(len(path["items"]) for path in page.get_cdrawings()) < _MIN_TABLE_PATH_ITEMS:
+        return found
+    for table in page.find_tables().tables:
+        rows = [[_cell(c) for c in row] for row in table.extract()]
+        rows = [row for row in rows if any(row)]
+        if len(rows) < 2 or max(len(row) for row in rows) < 2:
+            continue
+        header = None
+        if table.header is not None and table.header.external:
+            # The header sits above the table's rows (not part of extract()).
+            header = [_cell(name) for name in table.header.names]
+        elif len(rows) > 2:
+            header, rows = rows[0], rows[1:]
+        text_rows = ([header] if header else []) + rows
+        found.append((fitz.Rect(table.bbox), {
+            "type": "Table",
+            "text": "\n".join("\t".join(c for c in row if c) for row in text_rows),
+            "html": _table_html(header, rows),
+        }))
+    return found
+
+
+def _widget_fields(page) -> Tuple[List[Any], List[Dict[str, str]]]:
+    """(widget rects, key/value pairs) of the page's form fields."""
+    rects, fields = [], []
+    for widget in page.widgets() or []:
+        key = _cell(widget.field_label or widget.field_name)
+        value = _cell(str(widget.field_value) if widget.field_value not in (None, "") else "")
+        if key:
+            rects.append(fitz.Rect(widget.rect))
+            fields.append({"key": key, "value": value})
+    return rects, fields
+
+
+def page_elements(page, extract_tables: bool = True, extract_forms: bool = False) -> List[Dict[str, Any]]:
+    """
+    The page as a list of {"type": "Text" | "Table" | "Form", "text", ...} elements in reading
+    order. Tables and forms also carry "html" (forms as a two-column key/value table).
+    Without any table or form on the page this is a single Text element.
+    """
+    tables = _find_tables(page) if extract_tables else []
+    widget_rects, widget_fields = _widget_fields(page) if extract_forms else ([], [])
+    elements: List[Dict[str, Any]] = []
+    text_lines: List[str] = []
+    form_run: List[Tuple[str, Dict[str, str]]] = []
+
+    def flush_form_run():
+        if len(form_run) >= _MIN_FORM_FIELDS:
+            flush_text()
+            elements.append(_form_element([f for _, f in form_run]))
+        else:
+            text_lines.extend(line for line, _ in form_run)
+        form_run.clear()
+
+    def flush_text():
+        text = "\n".join(text_lines).strip()
+        if text:
+            elements.append({"type": "Text", "text": text})
+        text_lines.clear()
+
+    emitted = set()
+    for block in page.get_text("blocks"):
+        if block[6] != 0:
+            continue  # image block
+        rect = fitz.Rect(block[:4])
+        center = (rect.tl + rect.br) / 2
+        inside = next((i for i, (bbox, _) in enumerate(tables) if center in bbox), None)
+        if inside is not None:
+            # The table replaces the text blocks it covers, at the position of the first one.
+            if inside not in emitted:
+                emitted.add(inside)
+                flush_form_run()
+                flush_text()
+                elements.append(tables[inside][1])
+            continue
+        if any(center in widget_rect for widget_rect in widget_rects):
+            continue  # a filled-in field's appearance text; reported with the widget below
+        for line in block[4].split("\n"):
+            match = _KEY_VALUE.match(line) if extract_forms else None
+            if match:
+                form_run.append((line, {"key": match.group(1).strip(), "value": match.group(2)}))
+            elif line.strip() or not form_run:
+                # Blank lines do not break a run of key/value lines.
+                flush_form_run()
+                text_lines.append(line)
+    flush_form_run()
+    flush_text()
+    elements.extend(element for i, (_, element) in enumerate(tables) if i not in emitted)
+
+    if widget_fields:
+        elements.append(_form_element(widget_fields))
+    return elements
@@ -0,0 +1,202 @@
+"""
+Adaptive OCR for pages whose text layer is missing or unusable.
+Each page is classified from its text layer (length and share of word-like text) and from how
+much of it is covered by images:
+
+- text:    a usable text layer; no OCR
+- blank:   no text, no images, no vector drawings; nothing to OCR
+- garbled: a text layer that is mostly junk (broken font encodings); the whole page is OCR'd
+- mixed:   little text, images on part of the page; only the image regions are OCR'd
+- scanned: little text and images over most of the page (or text drawn as paths); whole page
+
+Pages are rendered in grayscale at a DPI picked per region for OCR_TARGET_FONT_PIXELS per font
+em. The font size comes from the text layer when there is one, else from the line heights of a
+72 DPI thumbnail. The DPI never exceeds the embedded image's own resolution (that only
+interpolates) and stays within OCR_MIN_DPI..OCR_MAX_DPI and an OCR_MAX_MEGAPIXELS budget.
+"""
+import math
+import re
+import statistics
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# pytesseract (and the numpy it pulls in) is only needed where pages are OCR'd, which is
+# normally a worker process; imported on first use. False = not installed or no tesseract binary.
+_tesseract = None
+# Language packs the local tesseract has; None until first asked.
+_tesseract_languages: Optional[set] = None
+
+# Replacement, control and private-use characters: what broken font encodings produce.
+_JUNK = re.compile(r"[\ufffd\x00-\x08\x0b\x0c\x0e-\x1f\ue000-\uf8ff]")
+_LANGUAGE_CODE = re.compile(r"[A-Za-z_]{3,20}")
+# Images smaller than this (points, either side) are bullets, rules or logos; not worth OCR.
+_MIN_IMAGE_SIDE = 24
+# More image regions than this are OCR'd as one page render instead.
+_MAX_REGIONS = 6
+# bytes.translate table: 1 for dark (ink) grayscale values, 0 otherwise.
+_INK = bytes(1 if value < 128 else 0 for value in range(256))
+
+
+def load_tesseract():
+    global _tesseract
+    if _tesseract is None:
+        try:
+            import pytesseract
+            from PIL import Image
+            # The Python package is only a wrapper: check the tesseract binary runs too.
+            pytesseract.get_tesseract_version()
+            _tesseract = (pytesseract, Image)
+        except Exception:
+            _tesseract = False
+    return _tesseract
+
+
+def tesseract_lang(languages: Optional[Sequence[str]]) -> str:
+    """`languages` as a tesseract -l value, keeping only packs that are installed ("eng" if none)."""
+    global _tesseract_languages
+    if _tesseract_languages is None:
+        try:
+            _tesseract_languages = set(_tesseract[0].get_languages(config=""))
+        except Exception:
+            # Unknown packs: an uninstalled one would fail every page, so stick to the default.
+            _tesseract_languages = {"eng"}
+    wanted = [code for code in languages or [] if _LANGUAGE_CODE.fullmatch(code)]
+    wanted = [code for code in wanted if code in _tesseract_languages]
+    return "+".join(dict.fromkeys(wanted)) or "eng"
+
+
+def text_quality(text: str) -> float:
+    """Share (0..1) of the text's non-space characters that sit in word-like tokens."""
+    total = good = 0
+    for token in text.split():
+        total += len(token)
+        alnum = sum(ch.isalnum() for ch in token)
+        if not _JUNK.search(token) and alnum >= 0.6 * len(token):
+            good += len(token)
+    return good / total if total else 0.0
+
+
+def _font_size(page) -> Optional[float]:
+    """Median font size (points) of the page's text spans, if it has any."""
+    sizes = [
+        span["size"]
+        for block in page.get_text("dict")["blocks"]
+        for line in block.get("lines", [])
+        for span in line["spans"]
+        if span["text"].strip()
+    ]
+    return statistics.median(sizes) if sizes else None
+
+
+@dataclass
+class OcrPlan:
+    kind: str  # "text" | "blank" | "garbled" | "mixed" | "scanned"
+    text_quality: float
+    # Share of the page under images; not measured (None) for pages with a usable text layer.
+    image_coverage: Optional[float] = None
+    # (clip rect, native DPI of the image) per region to OCR; one full-page entry for page OCR.
+    regions: List[Tuple[Any, Optional[float]]] = field(default_factory=list)
+    font_size: Optional[float] = None
+
+    @property
+    def needs_ocr(self) -> bool:
+        return bool(self.regions)
+
+
+def classify_page(page, text: str) -> OcrPlan:
+    quality = text_quality(text)
+    usable = len(text) >= settings.OCR_MIN_TEXT_CHARS
+    if usable and quality >= settings.OCR_MIN_TEXT_QUALITY:
+        return OcrPlan("text", quality)
+    images = []
+    for info in page.get_image_info():
+        placed = fitz.Rect(info["bbox"])
+        visible = placed & page.rect
+        if visible.is_empty or min(visible.width, visible.height) < _MIN_IMAGE_SIDE:
+            continue
+        images.append((visible, info["width"] / (placed.width / 72) if placed.width else None))
+    page_area = abs(page.rect) or 1.0
+    coverage = min(1.0, sum(abs(rect) for rect, _ in images) / page_area)
+    plan = OcrPlan("blank", quality, coverage)
+    native_dpi = max((dpi for _, dpi in images if dpi), default=None)
+    if usable:
+        # Junk text layer: its font sizes are still a good guide to the rendered text size.
+        plan.kind, plan.font_size = "garbled", _font_size(page)
+        plan.regions = [(page.rect, native_dpi)]
+    elif images and coverage < settings.OCR_REGION_MAX_COVERAGE and len(images) <= _MAX_REGIONS:
+        plan.kind = "mixed"
+        plan.regions = sorted(images, key=lambda region: (region[0].y0, region[0].x0))
+    elif images or page.get_cdrawings():
+        plan.kind = "scanned"
+        plan.regions = [(page.rect, native_dpi)]
+    return plan
+
+
+def _estimate_font_size(page, clip) -> Optional[float]:
+    """
+    Font size (points) of a bitmap region from a 72 DPI thumbnail, where one pixel is one point.
+    A run of inked rows is a text line; the median run spans about 0.75 em and loses about a
+    pixel to anti-aliased edges.
+    """
+    pix = page.get_pixmap(dpi=72, colorspace=fitz.csGRAY, clip=clip, alpha=False)
+    samples = pix.samples
+    min_ink = max(2, pix.width // 100)
+    heights, run = [], 0
+    for y in range(pix.height):
+        row = samples[y * pix.stride:y * pix.stride + pix.width]
+        if row.translate(_INK).count(1) >= min_ink:
+            run += 1
+        elif run:
+            heights.append(run)
+            run = 0
+    if run:
+        heights.append(run)
+    # Shorter runs are rules and specks, taller ones pictures or lines run together.
+    heights = [h for h in heights if 3 <= h <= 72]
+    return (statistics.median(heights) + 1) / 0.75 if len(heights) >= 3 else None
+
+
+def render_dpi(clip, native_dpi: Optional[float] = None, font_size: Optional[float] = None) -> int:
+    """
+    OCR_TARGET_FONT_PIXELS per em for `font_size` (OCR_DEFAULT_DPI if unknown), never above the
+    image's own resolution (that only interpolates), within OCR_MIN/MAX_DPI and the pixel budget.
+    """
+    dpi = settings.OCR_TARGET_FONT_PIXELS * 72 / font_size if font_size else settings.OCR_DEFAULT_DPI
+    if native_dpi:
+        dpi = min(dpi, native_dpi)
+    dpi = min(max(dpi, settings.OCR_MIN_DPI), settings.OCR_MAX_DPI)
+    square_inches = max(abs(clip) / (72 * 72), 1e-6)
+    dpi = min(dpi, math.sqrt(settings.OCR_MAX_MEGAPIXELS * 1e6 / square_inches))
+    return max(1, int(dpi))
+
+
+def plan_renders(page, plan: OcrPlan) -> List[Tuple[Any, int]]:
+    """(clip, DPI) to render for each region of the plan."""
+    renders = []
+    for clip, native_dpi in plan.regions:
+        font_size = plan.font_size or _estimate_font_size(page, clip)
+        renders.append((clip, render_dpi(clip, native_dpi, font_size)))
+    return renders
+
+
+def ocr_page(page, plan: OcrPlan, languages: Optional[Sequence[str]] = None) -> Tuple[str, int]:
+    """(OCR text of the plan's regions in reading order, highest DPI used). Needs load_tesseract()."""
+    pytesseract, Image = _tesseract
+    lang = tesseract_lang(languages)
+    texts, dpis = [], []
+    for clip, dpi in plan_renders(page, plan):
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, clip=clip, alpha=False)
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        # A tesseract run that outlives the whole page's budget is hung; pytesseract kills it
+        # and raises, and the page comes back failed.
+        text = pytesseract.image_to_string(img, lang=lang, timeout=settings.PAGE_EXECUTOR_PAGE_TIMEOUT_SECONDS)
+        texts.append((text or "").strip())
+        dpis.append(dpi)
+    return "\n\n".join(t for t in texts if t), max(dpis, default=0)
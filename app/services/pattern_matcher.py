@@ -0,0 +1,109 @@
+"""
+Compiled fuzzy matcher for chat-data.json intents.
+Scores are the same as `difflib.get_close_matches(message, patterns, n=1, cutoff=0.65)`
+(SequenceMatcher ratio, best score wins, ties go to the larger pattern string), but instead of
+scoring every pattern on every message, candidates come from a character-trigram inverted
+index and must pass a trigram-overlap (Dice) floor plus the exact length and
+character-multiset bounds before the full ratio is computed. The Dice floor is a heuristic:
+pairs above the 0.65 ratio cutoff in practice share well over 0.3 of their trigrams, except
+for very short strings, so short messages skip it and scan the length-compatible patterns
+(see benchmarks/bench_pattern_matcher.py for the agreement rate with plain difflib).
+"""
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PatternMatcher:
+    def __init__(
+        self,
+        intents: List[Dict[str, Any]],
+        cutoff: float = 0.65,
+        min_trigram_dice: float = 0.3,
+        short_message_len: int = 12,
+    ):
+        self.cutoff = cutoff
+        self.min_trigram_dice = min_trigram_dice
+        self.short_message_len = short_message_len
+        self.patterns: List[str] = []
+        # Per pattern, (is_greeting, response) in intent order; the last allowed entry wins,
+        # like the dict that used to be rebuilt on every message.
+        self._responses: List[List[Tuple[bool, str]]] = []
+        positions: Dict[str, int] = {}
+        for intent in intents:
+            is_greeting = intent.get("id") == "greeting"
+            for pattern in intent.get("patterns", []):
+                pattern_lower = pattern.lower()
+                if pattern_lower not in positions:
+                    positions[pattern_lower] = len(self.patterns)
+                    self.patterns.append(pattern_lower)
+                    self._responses.append([])
+                self._responses[positions[pattern_lower]].append((is_greeting, intent["response"]))
+
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        self._trigram_counts: List[int] = []
+        self._by_length: Dict[int, List[int]] = defaultdict(list)
+        for pid, pattern in enumerate(self.patterns):
+            grams = _trigrams(pattern)
+            self._trigram_counts.append(len(grams))
+            self._by_length[len(pattern)].append(pid)
+            for gram in grams:
+                self._index[gram].append(pid)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _response_for(self, pid: int, include_greeting: bool) -> Optional[str]:
+        for is_greeting, response in reversed(self._responses[pid]):
+            if include_greeting or not is_greeting:
+                return response
+        return None
+
+    def match(self, message_lower: str, include_greeting: bool = True) -> Optional[str]:
+        if not self.patterns:
+            return None
+        n = len(message_lower)
+        # ratio = 2M / (n + m) <= 2 min(n, m) / (n + m): bounds on pattern length m.
+        min_len = n * self.cutoff / (2 - self.cutoff)
+        max_len = n * (2 - self.cutoff) / self.cutoff if self.cutoff else float("inf")
+
+        if n <= self.short_message_len:
+            candidates = [
+                pid
+                for length in range(int(min_len), int(max_len) + 1)
+                for pid in self._by_length.get(length, ())
+            ]
+        else:
+            grams = _trigrams(message_lower)
+            shared: Counter = Counter()
+            for gram in grams:
+                shared.update(self._index.get(gram, ()))
+            floor = self.min_trigram_dice
+            candidates = [
+                pid for pid, common in shared.items()
+                if 2 * common >= floor * (len(grams) + self._trigram_counts[pid])
+            ]
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(message_lower)
+        best: Optional[Tuple[float, str, int]] = None
+        for pid in candidates:
+            pattern = self.patterns[pid]
+            if not (min_len <= len(pattern) <= max_len):
+                continue
+            if self._response_for(pid, include_greeting) is None:
+                continue
+            matcher.set_seq1(pattern)
+            if matcher.quick_ratio() < self.cutoff:
+                continue
+            score = matcher.ratio()
+            if score >= self.cutoff and (best is None or (score, pattern) > best[:2]):
+                best = (score, pattern, pid)
+        if best is None:
+            return None
+        return self._response_for(best[2], include_greeting)
@@ -1,34 +1,119 @@
+import asyncio
+import contextlib
 import httpx
 import os
-import tempfile
-from typing import List, Dict, Any, Optional
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import Chroma
-try:
-    from langchain.chains import RetrievalQA
-except ImportError:
-    from langchain_classic.chains import RetrievalQA
-from langchain_core.prompts import PromptTemplate
+import re
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 from langchain_core.documents import Document
 from app.core.config import settings
+from app.services.admission import AdmissionRejected, admission
+from app.services.analysis_results import AnalysisResultStore
+from app.services.company_matcher import CompanyCheck, check_company
+from app.services.document_fetcher import DocumentDownloadError, document_fetcher
+from app.services.embedding_cache import CachedEmbeddings, EmbeddingCache
+from app.services.field_extractor import extract_fields
+from app.services.metrics import record, timed
+from app.services.single_flight import SingleFlight
 from app.services.thread_context import (
     get_thread_context,
     update_thread_context,
     build_previous_documents_prompt,
 )
+from app.services.warmup import warmup
+# Optional: local PDF + OCR (scanned/image pages); fitz is None when PyMuPDF is missing
+from app.services.page_executor import count_pages, fitz, page_executor
 
-# Optional: local PDF + OCR (scanned/image pages)
-try:
-    import fitz  # PyMuPDF
-except ImportError:
-    fitz = None
-try:
-    import pytesseract
-    from PIL import Image
-except ImportError:
-    pytesseract = None
-    Image = None
+if TYPE_CHECKING:
+    from langchain_core.prompts import PromptTemplate
+    from langchain_openai import ChatOpenAI
+
+
+def _retrieval_qa():
+    # langchain.chains moved to langchain_classic in LangChain 1.0.
+    try:
+        from langchain.chains import RetrievalQA
+    except ImportError:
+        from langchain_classic.chains import RetrievalQA
+    return RetrievalQA
+
+
+def _import_llm_stack() -> None:
+    """Import everything analysis needs beyond extraction (~2s cold, mostly openai and chromadb)."""
+    import chromadb  # noqa: F401
+    import langchain_openai  # noqa: F401
+    import langchain_text_splitters  # noqa: F401
+    from langchain_community.vectorstores import Chroma  # noqa: F401
+    from langchain_core.prompts import PromptTemplate  # noqa: F401
+    _retrieval_qa()
+
+# Part of every stored result's key: bump ANALYSIS_PROMPT_VERSION when the analysis prompt or
+# the parsing of its output changes, so results produced the old way are no longer served.
+ANALYSIS_PROMPT_VERSION = 5
+ANALYSIS_MODEL = "gpt-4o-mini"
+# _analyze_content reports these failures as text; they are not stored.
+_UNSTORED_ANALYSIS_PREFIXES = (
+    "Analysis error:",
+    "OpenAI API key not configured",
+    "Insufficient text extracted",
+)
+_COMPANY_MISMATCH_LINE = re.compile(r"COMPANY_MISMATCH:[^\n]*")
+_COMPANY_MATCH_YES = re.compile(r"COMPANY_MATCH:\s*YES", re.IGNORECASE)
+
+
+def parse_company_guard(analysis: str) -> Tuple[Optional[bool], Optional[str]]:
+    """(company_match, the COMPANY_MISMATCH line) from the verdict the analysis prompt asks for."""
+    mismatch = _COMPANY_MISMATCH_LINE.search(analysis)
+    if mismatch:
+        return False, mismatch.group(0).strip()
+    if _COMPANY_MATCH_YES.search(analysis):
+        return True, None
+    return None, None
+
+
+_token_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count for gpt-4o-mini; falls back to ~4 chars/token if tiktoken is unavailable."""
+    global _token_encoding
+    if _token_encoding is None:
+        try:
+            import tiktoken
+            _token_encoding = tiktoken.encoding_for_model(ANALYSIS_MODEL)
+        except Exception:
+            _token_encoding = False
+    if _token_encoding:
+        return len(_token_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4
+
+
+def _template_literal(text: str) -> str:
+    """`text` for use inside a PromptTemplate (f-string format): braces are escaped, not fields."""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _split_pdf(pdf_bytes: bytes, pages_per_batch: int) -> List[Tuple[int, bytes]]:
+    """Split a PDF into (page_offset, bytes) chunks of at most pages_per_batch pages."""
+    src = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        page_count = len(src)
+        if page_count <= pages_per_batch:
+            return [(0, pdf_bytes)]
+        batches = []
+        for start in range(0, page_count, pages_per_batch):
+            part = fitz.open()
+            try:
+                part.insert_pdf(src, from_page=start, to_page=min(start + pages_per_batch, page_count) - 1)
+                batches.append((start, part.tobytes(garbage=3, deflate=True)))
+            finally:
+                part.close()
+        return batches
+    finally:
+        src.close()
 
 
 class PDFAnalysisService:
@@ -36,6 +121,63 @@ class PDFAnalysisService:
         self.openai_api_key = settings.OPENAI_API_KEY
         self.unstructured_api_key = settings.UNSTRUCTURED_API_KEY
         self.unstructured_api_url = settings.UNSTRUCTURED_API_URL or "https://api.unstructured.io"
+        self._embeddings: Optional[CachedEmbeddings] = None
+        self._chroma_client = None
+        self.live_collections = 0
+        self._llm: Optional["ChatOpenAI"] = None
+        self._result_store: Optional[AnalysisResultStore] = None
+        self._analyze_flights = SingleFlight()
+
+    def warm_up(self) -> None:
+        """Warm-up loader for the "llm" subsystem: imports and, with an API key, the shared clients."""
+        _import_llm_stack()
+        self._get_chroma_client()
+        if self.openai_api_key:
+            self._get_llm()
+            self._get_embeddings()
+
+    def _get_embeddings(self) -> CachedEmbeddings:
+        if self._embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+            cache = None
+            if settings.EMBEDDING_CACHE_PATH:
+                cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_MAX_ENTRIES)
+            self._embeddings = CachedEmbeddings(
+                OpenAIEmbeddings(
+                    model=settings.OPENAI_EMBEDDING_MODEL,
+                    openai_api_key=self.openai_api_key,
+                    openai_api_base=settings.OPENAI_BASE_URL,
+                ),
+                model=settings.OPENAI_EMBEDDING_MODEL,
+                cache=cache,
+            )
+        return self._embeddings
+
+    def _get_chroma_client(self):
+        if self._chroma_client is None:
+            import chromadb
+            self._chroma_client = chromadb.EphemeralClient()
+        return self._chroma_client
+
+    def embedding_stats(self) -> Dict[str, Any]:
+        stats = self._embeddings.stats() if self._embeddings else {"enabled": bool(settings.EMBEDDING_CACHE_PATH)}
+        stats["live_collections"] = self.live_collections
+        return stats
+
+    def coalescing_stats(self) -> Dict[str, int]:
+        return self._analyze_flights.stats()
+
+    def _get_result_store(self) -> Optional[AnalysisResultStore]:
+        if self._result_store is None and settings.ANALYSIS_RESULTS_PATH:
+            self._result_store = AnalysisResultStore(
+                settings.ANALYSIS_RESULTS_PATH,
+                settings.ANALYSIS_RESULTS_MAX_BYTES,
+                settings.ANALYSIS_RESULTS_TTL_SECONDS,
+            )
+        return self._result_store
+
+    def result_store_stats(self) -> Dict[str, Any]:
+        return self._result_store.stats() if self._result_store else {"enabled": bool(settings.ANALYSIS_RESULTS_PATH)}
         
     async def analyze_document(
         self,
@@ -48,106 +190,501 @@ class PDFAnalysisService:
         languages: List[str] = None,
         application_company_name: Optional[str] = None,
         thread_id: Optional[str] = None,
+        force_refresh: bool = False,
     ) -> Dict[str, Any]:
+        # The SQLite / Redis backends do blocking I/O, so the context is read and written in a thread.
+        thread_context = await asyncio.to_thread(get_thread_context, thread_id) if thread_id else None
+        # Identical concurrent requests (double clicks, portal retries) share one run. The
+        # previous-documents prompt is part of the key since it changes what the LLM is asked;
+        # each caller still records the document in its own thread context.
+        key = (
+            document_url,
+            document_type,
+            strategy,
+            use_ocr,
+            extract_tables,
+            extract_forms,
+            tuple(languages or ()),
+            application_company_name,
+            build_previous_documents_prompt(thread_context) if thread_context else "",
+            force_refresh,
+        )
+        result, context_update = await self._analyze_flights.do(
+            key,
+            lambda: self._analyze_document(
+                document_url=document_url,
+                document_type=document_type,
+                strategy=strategy,
+                use_ocr=use_ocr,
+                extract_tables=extract_tables,
+                extract_forms=extract_forms,
+                languages=languages,
+                application_company_name=application_company_name,
+                thread_context=thread_context,
+                force_refresh=force_refresh,
+            ),
+        )
+        if thread_id and context_update:
+            await asyncio.to_thread(update_thread_context, thread_id, **context_update)
+        return result
+
+    async def analyze_batch(
+        self,
+        documents: List[Dict[str, Any]],
+        application_company_name: Optional[str] = None,
+        thread_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Analyze all documents of one application together. Downloads and extraction run
+        concurrently; the LLM analyses are capped at ANALYSIS_BATCH_CONCURRENCY. Every document
+        sees the same thread context snapshot (taken before the batch) and the context is
+        updated afterwards in input order, so the outcome does not depend on completion order.
+        A refused download fails only that document (status_code 422 in its result).
+        """
+        started = time.perf_counter()
+        thread_context = await asyncio.to_thread(get_thread_context, thread_id) if thread_id else None
+        analysis_slots = asyncio.Semaphore(max(settings.ANALYSIS_BATCH_CONCURRENCY, 1))
+
+        async def analyze_one(document: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+            try:
+                return await self._analyze_document(
+                    **document,
+                    application_company_name=application_company_name,
+                    thread_context=thread_context,
+                    analysis_slots=analysis_slots,
+                )
+            except DocumentDownloadError as e:
+                return {"success": False, "status_code": 422, "error": str(e)}, None
+
+        tasks = [asyncio.ensure_future(analyze_one(document)) for document in documents]
+        try:
+            outcomes = await asyncio.gather(*tasks)
+        except BaseException:
+            # e.g. AdmissionRejected for one document: the batch fails as a whole, stop the rest.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        results = []
+        for document, (result, context_update) in zip(documents, outcomes):
+            if thread_id and context_update:
+                await asyncio.to_thread(update_thread_context, thread_id, **context_update)
+            results.append({"document_url": document["document_url"], **result})
+        return {
+            "success": all(r.get("success") for r in results),
+            "application_company_name": application_company_name,
+            "thread_id": thread_id,
+            "results": results,
+            "timings": {"total_seconds": round(time.perf_counter() - started, 3)},
+        }
+
+    async def _analyze_document(
+        self,
+        document_url: str,
+        document_type: str,
+        strategy: str = "hi_res",
+        use_ocr: bool = True,
+        extract_tables: bool = True,
+        extract_forms: bool = False,
+        languages: List[str] = None,
+        application_company_name: Optional[str] = None,
+        thread_context: Optional[Dict[str, Any]] = None,
+        analysis_slots: Optional[asyncio.Semaphore] = None,
+        force_refresh: bool = False,
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """(result, thread context update or None). The caller records the update."""
         if languages is None:
             languages = ["eng"]
         
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
         documents: List[Document] = []
+        extraction: Dict[str, Any] = {"mode": settings.EXTRACTION_HEDGE_MODE, "winner": None, "timings": {}}
+        store_key: Optional[str] = None
+        extraction_error: Optional[str] = None
         try:
-            if self.unstructured_api_key:
-                documents = await self._load_document(
-                    document_url=document_url,
+            with timed("download"):
+                fetched = await document_fetcher.fetch(document_url)
+            pdf_bytes = fetched.content
+            store = self._get_result_store()
+            if store:
+                # The previous-documents block is deliberately not part of the key: re-analyzing
+                # the same file within an application would otherwise never hit (the context
+                # grows with every document). force_refresh re-runs against the current context.
+                store_key = store.key(
+                    sha256=fetched.sha256,
+                    document_type=document_type,
+                    application_company_name=application_company_name,
                     strategy=strategy,
                     use_ocr=use_ocr,
                     extract_tables=extract_tables,
                     extract_forms=extract_forms,
-                    languages=languages
+                    languages=languages,
+                    prompt_version=ANALYSIS_PROMPT_VERSION,
+                    model=ANALYSIS_MODEL,
                 )
-            if not documents and fitz:
-                documents = await self._load_document_local(
-                    document_url=document_url,
-                    use_ocr=use_ocr,
-                )
-        except Exception:
-            if fitz:
-                try:
-                    documents = await self._load_document_local(
-                        document_url=document_url,
-                        use_ocr=use_ocr,
-                    )
-                except Exception:
-                    pass
+                stored = None if force_refresh else await self._lookup_result(store_key)
+                if stored:
+                    result, context_update, stored_at = stored
+                    result["metadata"]["result_store"] = {
+                        "hit": True,
+                        "stored_at": datetime.fromtimestamp(stored_at, timezone.utc).isoformat(),
+                    }
+                    result["timings"] = {"total_seconds": round(time.perf_counter() - started, 3)}
+                    return result, context_update
+            load_kwargs = dict(
+                document_url=document_url,
+                pdf_bytes=pdf_bytes,
+                strategy=strategy,
+                use_ocr=use_ocr,
+                extract_tables=extract_tables,
+                extract_forms=extract_forms,
+                languages=languages,
+            )
+            if settings.EXTRACTION_HEDGE_MODE in ("parallel", "delayed") and fitz:
+                documents, extraction = await self._load_hedged(**load_kwargs)
+            else:
+                documents, extraction = await self._load_sequential(**load_kwargs)
+        except (AdmissionRejected, DocumentDownloadError):
+            # Not this document's content: the caller answers 429 / 422.
+            raise
+        except Exception as e:
+            extraction_error = f"Document could not be loaded: {e}"
+        timings["extraction_seconds"] = round(time.perf_counter() - started, 3)
         
         try:
             
             if not documents:
                 return {
                     "success": False,
-                    "error": "No content extracted from document",
+                    "error": extraction_error or "No content extracted from document",
                     "extracted_text": "",
-                    "analysis": ""
-                }
+                    "analysis": "",
+                    "timings": timings,
+                }, None
             
             extracted_text = self._combine_documents(documents)
-            thread_context = get_thread_context(thread_id) if thread_id else None
-            analysis = await self._analyze_content(
-                extracted_text=extracted_text,
-                document_type=document_type,
-                documents=documents,
-                application_company_name=application_company_name,
-                thread_context=thread_context,
+            company_check: Optional[CompanyCheck] = None
+            if application_company_name:
+                with timed("company_check"):
+                    company_check = await asyncio.to_thread(
+                        check_company,
+                        application_company_name,
+                        extracted_text,
+                        settings.COMPANY_MATCH_THRESHOLD,
+                        settings.COMPANY_MISMATCH_THRESHOLD,
+                    )
+            with timed("fields"):
+                field_extraction = await asyncio.to_thread(
+                    extract_fields,
+                    document_type,
+                    [(doc.metadata.get("page_number"), doc.page_content) for doc in documents],
+                )
+            # The LLM sees the pre-extracted fields plus the text they did not resolve, when that
+            # is actually shorter than the document (no repeated boilerplate, few fields found).
+            llm_documents, llm_text = documents, extracted_text
+            if settings.ANALYSIS_CONDENSE_WITH_FIELDS and field_extraction.values:
+                condensed = [Document(page_content=field_extraction.prompt_block(), metadata={"type": "Fields"})] + [
+                    Document(page_content=text, metadata=doc.metadata)
+                    for doc, text in zip(documents, field_extraction.unresolved)
+                    if text
+                ]
+                condensed_text = self._combine_documents(condensed)
+                if len(condensed_text) < len(extracted_text):
+                    llm_documents, llm_text = condensed, condensed_text
+            short_circuit = bool(
+                company_check and company_check.verdict == "mismatch" and settings.COMPANY_MISMATCH_SHORT_CIRCUIT
             )
+            if short_circuit:
+                # The document is about another company: reject it without the embedding/LLM round trip.
+                plan = {"strategy": "skipped", "reason": "company_mismatch"}
+                analysis = self._local_mismatch_analysis(application_company_name, company_check)
+            else:
+                with timed("plan"):
+                    plan = self._plan_analysis(llm_text)
+                queued = time.perf_counter()
+                async with analysis_slots or contextlib.nullcontext():
+                    analysis_started = time.perf_counter()
+                    timings["queued_seconds"] = round(analysis_started - queued, 3)
+                    analysis = await self._analyze_content(
+                        extracted_text=llm_text,
+                        document_type=document_type,
+                        documents=llm_documents,
+                        application_company_name=application_company_name,
+                        thread_context=thread_context,
+                        plan=plan,
+                        company_hint=company_check.hint(application_company_name) if company_check else None,
+                    )
+                    timings["analysis_seconds"] = round(time.perf_counter() - analysis_started, 3)
             tables = self._extract_tables(documents)
             forms = self._extract_forms(documents) if extract_forms else []
             
-            # Parse company match guard from analysis (LLM outputs COMPANY_MATCH: YES or COMPANY_MISMATCH: ...)
+            # The LLM's COMPANY_MATCH / COMPANY_MISMATCH verdict wins; the local check decides when it
+            # short-circuited or the LLM gave no verdict (no API key, analysis error, missing line).
             company_match: Optional[bool] = None
             company_match_detail: Optional[str] = None
+            company_match_source: Optional[str] = None
             companies_mentioned_in_doc: Optional[str] = None
             if application_company_name and isinstance(analysis, str):
-                if "COMPANY_MISMATCH:" in analysis:
-                    company_match = False
-                    idx = analysis.find("COMPANY_MISMATCH:")
-                    end = analysis.find("\n", idx)
-                    company_match_detail = (analysis[idx:end] if end != -1 else analysis[idx:]).strip()
+                company_match, company_match_detail = parse_company_guard(analysis)
+                if company_match is not None:
+                    company_match_source = "local" if short_circuit else "llm"
+                elif company_check and company_check.verdict != "uncertain":
+                    company_match = company_check.verdict == "match"
+                    company_match_source = "local"
+                    if not company_match:
+                        company_match_detail = self._local_mismatch_line(application_company_name, company_check)
+                if company_match is False and company_match_detail:
                     companies_mentioned_in_doc = company_match_detail.replace("COMPANY_MISMATCH:", "").strip()[:200]
-                elif "COMPANY_MATCH: YES" in analysis or "COMPANY_MATCH:YES" in analysis:
-                    company_match = True
+                elif company_match:
                     companies_mentioned_in_doc = application_company_name
 
-            if thread_id:
-                update_thread_context(
-                    thread_id,
-                    application_company_name,
-                    document_type,
-                    company_match=company_match,
-                    companies_mentioned=companies_mentioned_in_doc,
-                )
-
-            return {
+            context_update = {
+                "application_company_name": application_company_name,
+                "document_type": document_type,
+                "company_match": company_match,
+                "companies_mentioned": companies_mentioned_in_doc,
+            }
+            result = {
                 "success": True,
                 "extracted_text": extracted_text,
                 "analysis": analysis,
+                "fields": field_extraction.values,
                 "tables": tables,
                 "forms": forms,
                 "metadata": {
                     "document_type": document_type,
                     "strategy": strategy,
                     "pages_processed": len(documents),
-                    "total_chars": len(extracted_text)
+                    "total_chars": len(extracted_text),
+                    "extraction": extraction,
+                    "analysis_plan": plan,
+                    "field_extraction": {**field_extraction.metadata(), "llm_chars": len(llm_text)},
                 },
                 "company_match": company_match,
                 "company_match_detail": company_match_detail,
+                "company_match_source": company_match_source,
             }
+            if company_check:
+                result["metadata"]["company_check"] = company_check.as_dict()
+            if store_key and not str(analysis).startswith(_UNSTORED_ANALYSIS_PREFIXES):
+                await self._store_result(store_key, result, context_update)
+            if store_key:
+                result["metadata"]["result_store"] = {"hit": False, "force_refresh": force_refresh}
+            timings["total_seconds"] = round(time.perf_counter() - started, 3)
+            result["timings"] = timings
+            return result, context_update
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
                 "extracted_text": "",
-                "analysis": ""
-            }
+                "analysis": "",
+                "timings": timings,
+            }, None
     
+    @staticmethod
+    def _local_mismatch_line(application_company_name: str, company_check: CompanyCheck) -> str:
+        names = ", ".join(company_check.candidates[:3])
+        return (
+            f"COMPANY_MISMATCH: The document refers to {names} which does not match the application "
+            f"company ({application_company_name}). This document does not belong to this application."
+        )
+
+    def _local_mismatch_analysis(self, application_company_name: str, company_check: CompanyCheck) -> str:
+        return (
+            "The automated company-name check found no mention of the application company in this "
+            f"document (closest name: {company_check.best_candidate}, similarity {company_check.score:.2f}), "
+            "so the full compliance analysis was skipped.\n"
+            + self._local_mismatch_line(application_company_name, company_check)
+        )
+
+    async def _lookup_result(self, key: str):
+        try:
+            return await asyncio.to_thread(self._result_store.get, key)
+        except Exception:
+            # A broken/locked database or a corrupt entry must not fail the analysis: it is a miss.
+            return None
+
+    async def _store_result(self, key: str, result: Dict[str, Any], context_update: Optional[Dict[str, Any]]) -> None:
+        try:
+            await asyncio.to_thread(self._result_store.put, key, result, context_update)
+        except sqlite3.Error:
+            pass
+
+    async def _load_sequential(
+        self,
+        document_url: str,
+        pdf_bytes: bytes,
+        strategy: str,
+        use_ocr: bool,
+        extract_tables: bool,
+        extract_forms: bool,
+        languages: List[str],
+    ) -> Tuple[List[Document], Dict[str, Any]]:
+        """Unstructured first; local PyMuPDF/OCR only if it fails or returns nothing."""
+        timings: Dict[str, float] = {}
+        documents: List[Document] = []
+        winner = None
+        rejected: Optional[AdmissionRejected] = None
+        if self.unstructured_api_key:
+            started = time.perf_counter()
+            try:
+                documents = await self._load_document(
+                    document_url=document_url,
+                    pdf_bytes=pdf_bytes,
+                    strategy=strategy,
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_forms=extract_forms,
+                    languages=languages,
+                )
+                winner = "unstructured" if documents else None
+            except AdmissionRejected as e:
+                rejected = e
+            except Exception:
+                documents = []
+            timings["unstructured"] = round(time.perf_counter() - started, 3)
+        if not documents and fitz:
+            started = time.perf_counter()
+            try:
+                documents = await self._load_document_local(
+                    document_url=document_url,
+                    pdf_bytes=pdf_bytes,
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_forms=extract_forms,
+                    languages=languages,
+                )
+                winner = "local" if documents else None
+            finally:
+                timings["local"] = round(time.perf_counter() - started, 3)
+        if not documents and rejected:
+            raise rejected
+        return documents, {"mode": "off", "winner": winner, "timings": timings}
+
+    async def _load_hedged(
+        self,
+        document_url: str,
+        pdf_bytes: bytes,
+        strategy: str,
+        use_ocr: bool,
+        extract_tables: bool,
+        extract_forms: bool,
+        languages: List[str],
+    ) -> Tuple[List[Document], Dict[str, Any]]:
+        """
+        Start local extraction at once and Unstructured either in parallel ("parallel") or after
+        EXTRACTION_HEDGE_DELAY_SECONDS ("delayed"). The first result that passes the quality
+        threshold wins and the other extractor is cancelled. If neither passes, the richer
+        non-empty result is used.
+        """
+        mode = settings.EXTRACTION_HEDGE_MODE
+        page_count = await asyncio.to_thread(count_pages, pdf_bytes)
+        timings: Dict[str, float] = {}
+        hedge_started = time.perf_counter()
+
+        async def _timed_arm(name: str, coro):
+            started = time.perf_counter()
+            try:
+                return await coro
+            finally:
+                timings[name] = round(time.perf_counter() - started, 3)
+
+        def start_unstructured() -> asyncio.Task:
+            return asyncio.create_task(
+                _timed_arm("unstructured", self._load_document(
+                    document_url=document_url,
+                    pdf_bytes=pdf_bytes,
+                    strategy=strategy,
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_forms=extract_forms,
+                    languages=languages,
+                )),
+                name="unstructured",
+            )
+
+        pending = {
+            asyncio.create_task(
+                _timed_arm("local", self._load_document_local(
+                    document_url=document_url,
+                    pdf_bytes=pdf_bytes,
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_forms=extract_forms,
+                    languages=languages,
+                )),
+                name="local",
+            )
+        }
+        remote_started = False
+        if self.unstructured_api_key and mode == "parallel":
+            pending.add(start_unstructured())
+            remote_started = True
+
+        results: Dict[str, List[Document]] = {}
+        rejected: Optional[AdmissionRejected] = None
+        winner = None
+        try:
+            while pending and winner is None:
+                timeout = None
+                if self.unstructured_api_key and not remote_started:
+                    elapsed = time.perf_counter() - hedge_started
+                    timeout = max(0.0, settings.EXTRACTION_HEDGE_DELAY_SECONDS - elapsed)
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    try:
+                        results[task.get_name()] = task.result()
+                    except AdmissionRejected as e:
+                        rejected = e
+                        results[task.get_name()] = []
+                    except Exception:
+                        results[task.get_name()] = []
+                    if self._extraction_meets_quality(results[task.get_name()], page_count, extract_tables):
+                        winner = task.get_name()
+                        break
+                if winner is None and self.unstructured_api_key and not remote_started:
+                    # Delay elapsed, or local finished below the quality bar: hedge to Unstructured.
+                    pending.add(start_unstructured())
+                    remote_started = True
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        cancelled = sorted(task.get_name() for task in pending)
+        if winner is None:
+            # Nothing met the bar: prefer Unstructured's structured elements, else local text.
+            winner = next((name for name in ("unstructured", "local") if results.get(name)), None)
+        documents = results.get(winner, []) if winner else []
+        if not documents and rejected:
+            raise rejected
+        return documents, {
+            "mode": mode,
+            "winner": winner,
+            "quality_met": bool(winner) and self._extraction_meets_quality(documents, page_count, extract_tables),
+            "timings": timings,
+            "cancelled": cancelled,
+            "page_count": page_count,
+        }
+
+    def _extraction_meets_quality(self, documents: List[Document], page_count: int, extract_tables: bool) -> bool:
+        if not documents:
+            return False
+        chars = sum(len(doc.page_content) for doc in documents)
+        if chars / max(page_count, 1) < settings.EXTRACTION_MIN_CHARS_PER_PAGE:
+            return False
+        if extract_tables and settings.EXTRACTION_REQUIRE_TABLES:
+            return any(doc.metadata.get("type") == "Table" for doc in documents)
+        return True
+
     async def _load_document(
         self,
         document_url: str,
@@ -155,107 +692,141 @@ class PDFAnalysisService:
         use_ocr: bool,
         extract_tables: bool,
         extract_forms: bool,
-        languages: List[str]
+        languages: List[str],
+        pdf_bytes: Optional[bytes] = None,
     ) -> List:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(document_url)
-            response.raise_for_status()
-            
-            files = {
-                "files": (os.path.basename(document_url), response.content, "application/pdf")
-            }
-            
-            data = {
-                "strategy": strategy,
-                "infer_table_structure": "true" if extract_tables else "false",
-                "extract_forms": "true" if extract_forms else "false",
-            }
-            
-            if use_ocr and languages:
-                data["languages"] = languages
-            
-            headers = {}
-            if self.unstructured_api_key:
-                headers["unstructured-api-key"] = self.unstructured_api_key
-            
-            api_response = await client.post(
-                f"{self.unstructured_api_url}/general/v0/general",
-                files=files,
-                data=data,
-                headers=headers
-            )
-            api_response.raise_for_status()
-            
-            result = api_response.json()
-            elements = result if isinstance(result, list) else result.get("elements", [])
-            
-            documents = []
+        """
+        Send the PDF to Unstructured. Documents longer than UNSTRUCTURED_BATCH_PAGES are split
+        into page ranges that are posted concurrently (at most UNSTRUCTURED_BATCH_CONCURRENCY at a
+        time); a failed batch is retried on its own and elements are merged back in page order.
+        """
+        if pdf_bytes is None:
+            pdf_bytes = (await document_fetcher.fetch(document_url)).content
+        filename = os.path.basename(document_url)
+        data = {
+            "strategy": strategy,
+            "infer_table_structure": "true" if extract_tables else "false",
+            "extract_forms": "true" if extract_forms else "false",
+        }
+        
+        if use_ocr and languages:
+            data["languages"] = languages
+        
+        headers = {}
+        if self.unstructured_api_key:
+            headers["unstructured-api-key"] = self.unstructured_api_key
+
+        batches = [(0, pdf_bytes)]
+        if fitz and settings.UNSTRUCTURED_BATCH_PAGES > 0:
+            batches = await asyncio.to_thread(_split_pdf, pdf_bytes, settings.UNSTRUCTURED_BATCH_PAGES)
+        semaphore = asyncio.Semaphore(max(1, settings.UNSTRUCTURED_BATCH_CONCURRENCY))
+
+        async with admission.stage("unstructured").slot(), \
+                httpx.AsyncClient(timeout=settings.UNSTRUCTURED_TIMEOUT_SECONDS) as client:
+            unstructured_started = time.perf_counter()
+
+            async def post_batch(batch_bytes: bytes) -> List[Dict[str, Any]]:
+                # httpx takes bytes or a file, not the download's bytearray: convert once per
+                # batch, not per attempt. Split batches are bytes already (no copy).
+                payload = batch_bytes if isinstance(batch_bytes, bytes) else bytes(batch_bytes)
+                for attempt in range(settings.UNSTRUCTURED_BATCH_RETRIES + 1):
+                    try:
+                        async with semaphore:
+                            api_response = await client.post(
+                                f"{self.unstructured_api_url}/general/v0/general",
+                                files={"files": (filename, payload, "application/pdf")},
+                                data=data,
+                                headers=headers
+                            )
+                            api_response.raise_for_status()
+                        result = api_response.json()
+                        return result if isinstance(result, list) else result.get("elements", [])
+                    except httpx.HTTPStatusError as e:
+                        status = e.response.status_code
+                        if (status < 500 and status != 429) or attempt == settings.UNSTRUCTURED_BATCH_RETRIES:
+                            raise
+                    except httpx.TransportError:
+                        if attempt == settings.UNSTRUCTURED_BATCH_RETRIES:
+                            raise
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                return []
+
+            tasks = [asyncio.ensure_future(post_batch(batch_bytes)) for _, batch_bytes in batches]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                # One batch failed for good (or the request was cancelled): the rest are wasted
+                # uploads, and must not outlive the client they post with.
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            record("unstructured", time.perf_counter() - unstructured_started)
+
+        documents = []
+        for (page_offset, _), elements in zip(batches, results):
             for element in elements:
                 text = element.get("text") or element.get("text_content")
                 if text:
                     metadata = element.get("metadata", {})
-                    documents.append(Document(
-                        page_content=text,
-                        metadata={
-                            "type": element.get("type", "unknown"),
-                            "page_number": metadata.get("page_number", 0),
-                            "filename": metadata.get("filename", ""),
-                            "filetype": metadata.get("filetype", "pdf")
-                        }
-                    ))
-            
-            return documents
+                    page_number = metadata.get("page_number", 0)
+                    doc_metadata = {
+                        "type": element.get("type", "unknown"),
+                        "page_number": page_number + page_offset if page_number else 0,
+                        "filename": metadata.get("filename", ""),
+                        "filetype": metadata.get("filetype", "pdf")
+                    }
+                    if metadata.get("text_as_html"):
+                        doc_metadata["text_as_html"] = metadata["text_as_html"]
+                    documents.append(Document(page_content=text, metadata=doc_metadata))
+        
+        return documents
     
     async def _load_document_local(
         self,
         document_url: str,
         use_ocr: bool = True,
+        pdf_bytes: Optional[bytes] = None,
+        extract_tables: bool = False,
+        extract_forms: bool = False,
+        languages: Optional[List[str]] = None,
     ) -> List[Document]:
-        """Extract text from PDF using PyMuPDF; for pages with little/no text, run OCR (pytesseract). Handles scanned/image-only PDFs."""
+        """
+        Extract text from PDF using PyMuPDF; for pages with little/no text, run OCR (pytesseract). Handles scanned/image-only PDFs.
+        OCR uses the request's `languages` (tesseract codes such as "eng", "fra").
+        With extract_tables / extract_forms, tables and form regions found on the text layer become
+        their own "Table" / "Form" documents (with text_as_html), like Unstructured's elements.
+        """
         if not fitz:
             return []
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(document_url)
-            response.raise_for_status()
-            pdf_bytes = response.content
+        if pdf_bytes is None:
+            pdf_bytes = (await document_fetcher.fetch(document_url)).content
         if not pdf_bytes:
             return []
+        async with admission.stage("ocr").slot():
+            with timed("extract_local"):
+                pages = await page_executor.extract_pages(
+                    pdf_bytes,
+                    use_ocr=use_ocr,
+                    extract_tables=extract_tables,
+                    extract_forms=extract_forms,
+                    languages=languages,
+                )
         documents = []
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-            try:
-                tmp.write(pdf_bytes)
-                tmp.flush()
-                doc = fitz.open(tmp.name)
-                try:
-                    for page_no in range(len(doc)):
-                        page = doc[page_no]
-                        text = (page.get_text() or "").strip()
-                        if use_ocr and len(text) < 50 and pytesseract and Image:
-                            mat = fitz.Matrix(2.0, 2.0)
-                            pix = page.get_pixmap(matrix=mat, alpha=False)
-                            img = Image.frombytes(
-                                "RGB", [pix.width, pix.height], pix.samples
-                            )
-                            text = (pytesseract.image_to_string(img) or "").strip()
-                        if text:
-                            documents.append(
-                                Document(
-                                    page_content=text,
-                                    metadata={
-                                        "type": "Page",
-                                        "page_number": page_no + 1,
-                                        "filename": os.path.basename(document_url),
-                                        "filetype": "pdf",
-                                    },
-                                )
-                            )
-                finally:
-                    doc.close()
-            finally:
-                try:
-                    os.unlink(tmp.name)
-                except OSError:
-                    pass
+        filename = os.path.basename(document_url)
+        for page in pages:
+            for element in page.get("elements") or [{"type": "Page", "text": page["text"]}]:
+                if not element["text"]:
+                    continue
+                metadata = {
+                    "type": "Page" if element["type"] == "Text" else element["type"],
+                    "page_number": page["page_number"],
+                    "filename": filename,
+                    "filetype": "pdf",
+                }
+                if element.get("html"):
+                    metadata["text_as_html"] = element["html"]
+                documents.append(Document(page_content=element["text"], metadata=metadata))
         return documents
     
     def _combine_documents(self, documents: List) -> str:
@@ -282,6 +853,32 @@ class PDFAnalysisService:
                 })
         return forms
     
+    def _plan_analysis(self, extracted_text: str) -> Dict[str, Any]:
+        """
+        Pick how much of the document the LLM sees: small documents are stuffed into the prompt
+        whole (no embeddings), medium ones go through retrieval, and large ones are map-reduced
+        over every chunk so nothing past the top-k retrieved chunks is dropped.
+        """
+        tokens = count_tokens(extracted_text)
+        if tokens <= settings.ANALYSIS_STUFF_MAX_TOKENS:
+            strategy = "stuff"
+        elif tokens <= settings.ANALYSIS_RETRIEVAL_MAX_TOKENS:
+            strategy = "retrieval"
+        else:
+            strategy = "map_reduce"
+        return {"strategy": strategy, "document_tokens": tokens}
+
+    def _get_llm(self) -> "ChatOpenAI":
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(
+                model_name=ANALYSIS_MODEL,
+                temperature=0,
+                openai_api_key=self.openai_api_key,
+                openai_api_base=settings.OPENAI_BASE_URL,
+            )
+        return self._llm
+
     async def _analyze_content(
         self,
         extracted_text: str,
@@ -289,6 +886,8 @@ class PDFAnalysisService:
         documents: List,
         application_company_name: Optional[str] = None,
         thread_context: Optional[Dict[str, Any]] = None,
+        plan: Optional[Dict[str, Any]] = None,
+        company_hint: Optional[str] = None,
     ) -> str:
         if not self.openai_api_key:
             return "OpenAI API key not configured. Analysis unavailable."
@@ -296,27 +895,16 @@ class PDFAnalysisService:
         if not extracted_text or len(extracted_text.strip()) < 50:
             return "Insufficient text extracted from document for analysis."
         
+        if plan is None:
+            plan = self._plan_analysis(extracted_text)
+        
         try:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
-            )
-            
-            splits = text_splitter.split_documents(documents)
-            
-            embeddings = OpenAIEmbeddings(openai_api_key=self.openai_api_key)
-            vectorstore = Chroma.from_documents(
-                documents=splits,
-                embedding=embeddings
-            )
-            
-            retriever = vectorstore.as_retriever(k=4)
-            
-            llm = ChatOpenAI(
-                model_name="gpt-4o-mini",
-                temperature=0,
-                openai_api_key=self.openai_api_key
-            )
+            await warmup.require("llm")
+            from langchain_community.vectorstores import Chroma
+            from langchain_core.prompts import PromptTemplate
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+            llm = self._get_llm()
             
             company_guard = ""
             if application_company_name:
@@ -328,13 +916,17 @@ This document is being reviewed for an application submitted on behalf of the co
 - If the document clearly refers to the SAME company (or the same legal entity) as the application company, output at the END: COMPANY_MATCH: YES
 - Do not approve or state that the document is compliant if there is a company name mismatch; treat mismatch as a critical compliance failure.
 """
+                if company_hint:
+                    company_guard += f"- {company_hint}\n"
             previous_docs_block = ""
             if thread_context:
                 previous_docs_block = "\n\n" + build_previous_documents_prompt(thread_context) + "\n\n"
             
-            template_str = f"""Analyze this {document_type} document for completeness, accuracy, and compliance with ministry requirements.
-{previous_docs_block}
-{company_guard}
+            # Document type, company names (from the request and the document text) and previous
+            # documents are data: a "{" in them must not be read as a template field.
+            template_str = f"""Analyze this {_template_literal(document_type)} document for completeness, accuracy, and compliance with ministry requirements.
+{_template_literal(previous_docs_block)}
+{_template_literal(company_guard)}
 
 Extract and verify:
 - Company details (name, registration number, address)
@@ -354,20 +946,119 @@ Provide a comprehensive analysis focusing on compliance, completeness, and any i
                 template=template_str,
             )
             
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                chain_type="stuff",
-                retriever=retriever,
-                chain_type_kwargs={"prompt": prompt_template}
+            if plan["strategy"] == "stuff":
+                plan["chunks"] = 1
+                async with admission.stage("llm").slot():
+                    with timed("llm"):
+                        response = await llm.ainvoke(prompt_template.format(context=extracted_text))
+                return str(response.content)
+            
+            if plan["strategy"] == "map_reduce":
+                return await self._map_reduce(llm, prompt_template, documents, document_type, plan)
+            
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=1000,
+                chunk_overlap=200
             )
             
-            query = f"Analyze this {document_type} document for compliance and completeness"
-            result = qa_chain.invoke({"query": query})
+            with timed("split"):
+                splits = text_splitter.split_documents(documents)
+            plan["chunks"] = len(splits)
+            plan["retrieved_chunks"] = min(4, len(splits))
+            
+            # One collection per request on the shared client, always dropped afterwards so
+            # in-memory Chroma data does not accumulate in the worker.
+            vectorstore = Chroma(
+                collection_name=f"analysis-{uuid.uuid4().hex}",
+                embedding_function=self._get_embeddings(),
+                client=self._get_chroma_client(),
+            )
+            self.live_collections += 1
+            try:
+                async with admission.stage("embeddings").slot():
+                    # "index" is the whole Chroma build; the embedding calls inside are also timed as "embed".
+                    with timed("index"):
+                        await vectorstore.aadd_documents(splits)
+                retriever = vectorstore.as_retriever(k=4)
+                
+                qa_chain = _retrieval_qa().from_chain_type(
+                    llm=llm,
+                    chain_type="stuff",
+                    retriever=retriever,
+                    chain_type_kwargs={"prompt": prompt_template}
+                )
+                
+                query = f"Analyze this {document_type} document for compliance and completeness"
+                async with admission.stage("llm").slot():
+                    with timed("llm"):
+                        result = await qa_chain.ainvoke({"query": query})
+            finally:
+                vectorstore.delete_collection()
+                self.live_collections -= 1
             
             return result.get("result", "Analysis completed but no result returned.")
             
+        except AdmissionRejected:
+            raise
         except Exception as e:
             return f"Analysis error: {str(e)}"
 
+    async def _map_reduce(
+        self,
+        llm: "ChatOpenAI",
+        prompt_template: "PromptTemplate",
+        documents: List,
+        document_type: str,
+        plan: Dict[str, Any],
+    ) -> str:
+        """
+        Condense every chunk in parallel (map), then run the analysis prompt over the notes (reduce).
+        Every map call and the reduce call takes its own "llm" admission slot, so a large document
+        cannot run more OpenAI calls at once than ADMISSION_LLM_CONCURRENCY allows.
+        """
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=settings.ANALYSIS_MAP_CHUNK_CHARS,
+            chunk_overlap=200
+        )
+        with timed("split"):
+            splits = text_splitter.split_documents(documents)
+        plan["chunks"] = len(splits)
+        map_prompts = [
+            f"""You are reviewing part {i} of {len(splits)} of a {document_type} document submitted to the ministry.
+List every fact in this part that matters for a compliance review: company names, registration and certificate numbers, dates (issue, registration, expiry), directors, certifications and clearances, and anything missing, inconsistent or suspicious. Quote names and numbers exactly. Be concise.
+
+Part {i} (page {split.metadata.get("page_number", "?")}):
+{split.page_content}"""
+            for i, split in enumerate(splits, 1)
+        ]
+        # At most ANALYSIS_MAP_CONCURRENCY calls of this document wait on or hold an llm slot.
+        map_slots = asyncio.Semaphore(max(1, settings.ANALYSIS_MAP_CONCURRENCY))
+
+        async def map_part(prompt: str):
+            async with map_slots, admission.stage("llm").slot():
+                return await llm.ainvoke(prompt)
+
+        tasks = [asyncio.ensure_future(map_part(prompt)) for prompt in map_prompts]
+        with timed("llm_map"):
+            try:
+                responses = await asyncio.gather(*tasks)
+            except BaseException:
+                # e.g. AdmissionRejected for one part: the others are no use any more.
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        notes = "\n\n".join(
+            f"Notes on part {i}:\n{response.content}" for i, response in enumerate(responses, 1)
+        )
+        plan["reduce_tokens"] = count_tokens(notes)
+        async with admission.stage("llm").slot():
+            with timed("llm"):
+                response = await llm.ainvoke(prompt_template.format(context=notes))
+        return str(response.content)
+
 
 pdf_analysis_service = PDFAnalysisService()
+warmup.register("llm", pdf_analysis_service.warm_up)
@@ -2,57 +2,40 @@
 Lightweight PDF text extraction with optional OCR for scanned/image pages.
 Uses only PyMuPDF (fitz) + pytesseract so it can run when the full analysis service is not available.
 """
-import os
-import tempfile
-import httpx
+from typing import List, Optional
 
-try:
-    import fitz
-except ImportError:
-    fitz = None
-try:
-    import pytesseract
-    from PIL import Image
-except ImportError:
-    pytesseract = None
-    Image = None
+from app.services.admission import admission
+from app.services.document_fetcher import document_fetcher
+from app.services.metrics import timed
+from app.services.page_executor import fitz, page_executor
+from app.services.single_flight import SingleFlight
 
+# Concurrent /extract calls for the same URL and OCR settings share one download + extraction.
+extract_flights = SingleFlight()
 
-async def extract_text_from_pdf_url(document_url: str, use_ocr: bool = True) -> str:
+
+async def extract_text_from_pdf_url(
+    document_url: str,
+    use_ocr: bool = True,
+    languages: Optional[List[str]] = None,
+) -> str:
     """
-    Download PDF from URL and extract text. For each page with little/no text, run OCR.
-    Returns combined text or empty string on failure.
+    Download PDF from URL and extract text. For each page with little/no (or garbled) text, run
+    OCR in `languages`. Returns combined text or empty string on failure.
     """
     if not fitz:
         return ""
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.get(document_url)
-        response.raise_for_status()
-        pdf_bytes = response.content
+    key = (document_url, use_ocr, tuple(languages or ()))
+    return await extract_flights.do(key, lambda: _extract_text(document_url, use_ocr, languages))
+
+
+async def _extract_text(document_url: str, use_ocr: bool, languages: Optional[List[str]]) -> str:
+    with timed("download"):
+        pdf_bytes = (await document_fetcher.fetch(document_url)).content
     if not pdf_bytes:
         return ""
-    parts: list[str] = []
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        try:
-            tmp.write(pdf_bytes)
-            tmp.flush()
-            doc = fitz.open(tmp.name)
-            try:
-                for page_no in range(len(doc)):
-                    page = doc[page_no]
-                    text = (page.get_text() or "").strip()
-                    if use_ocr and len(text) < 50 and pytesseract and Image:
-                        mat = fitz.Matrix(2.0, 2.0)
-                        pix = page.get_pixmap(matrix=mat, alpha=False)
-                        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                        text = (pytesseract.image_to_string(img) or "").strip()
-                    if text:
-                        parts.append(text)
-            finally:
-                doc.close()
-        finally:
-            try:
-                os.unlink(tmp.name)
-            except OSError:
-                pass
+    async with admission.stage("ocr").slot():
+        with timed("extract_local"):
+            pages = await page_executor.extract_pages(pdf_bytes, use_ocr=use_ocr, languages=languages)
+    parts = [p["text"] for p in pages if p["text"]]
     return "\n\n".join(parts) if parts else ""
@@ -0,0 +1,36 @@
+"""
+In-flight request coalescing: concurrent calls with the same key share one execution.
+The work runs in its own task, so a caller that goes away (client disconnect) does not cancel
+it for the others; it is cancelled only when every caller waiting on it has gone.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Hashable, List[Any]] = {}  # key -> [task, waiters]
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.create_task(fn())
+            entry = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        except asyncio.CancelledError:
+            if not entry[0].done():
+                entry[1] -= 1
+                if entry[1] == 0:
+                    entry[0].cancel()
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "executions": self.executions, "coalesced": self.coalesced}
@@ -1,36 +1,195 @@
 """
 Per-application (thread) context for document analysis so the agent keeps track
 of which company and which documents belong to the same application.
-Uses thread_id (e.g. application_id) as key. In-memory store with optional TTL.
+Uses thread_id (e.g. application_id) as key. In-memory store with TTL, an optional cap on
+live threads (least recently used dropped first) and a cap on documents kept per thread.
+With several uvicorn workers or hosts, set THREAD_CONTEXT_BACKEND to "sqlite" or "redis"
+(see thread_context_backends.py) so every worker sees the same application history.
 """
+from abc import ABC, abstractmethod
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timezone, timedelta
+from collections import OrderedDict
+from datetime import datetime, timezone
 import threading
+import time
 
-# thread_id -> { "application_company_name": str, "documents": [ {"document_type": str, "company_match": bool|None, "companies_mentioned": str} ], "updated_at": datetime }
-_store: Dict[str, Dict[str, Any]] = {}
-_lock = threading.Lock()
-# Keep context for 2 hours after last update
-_TTL_HOURS = 2
+from app.core.config import settings
 
 
-def _ttl_cleanup():
-    with _lock:
-        now = datetime.now(timezone.utc)
-        to_del = [
-            tid for tid, data in _store.items()
-            if (now - data.get("updated_at", now)).total_seconds() > _TTL_HOURS * 3600
-        ]
-        for tid in to_del:
-            del _store[tid]
+class DocumentRecord:
+    __slots__ = ("document_type", "company_match", "companies_mentioned")
+
+    def __init__(self, document_type: str, company_match: Optional[bool], companies_mentioned: str):
+        self.document_type = document_type
+        self.company_match = company_match
+        self.companies_mentioned = companies_mentioned
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "document_type": self.document_type,
+            "company_match": self.company_match,
+            "companies_mentioned": self.companies_mentioned,
+        }
+
+
+class ThreadRecord:
+    __slots__ = ("application_company_name", "documents", "documents_total", "updated_at", "expires_at")
+
+    def __init__(self, application_company_name: Optional[str]):
+        self.application_company_name = application_company_name
+        # A plain list: a deque preallocates a 64-slot block, too much for a handful of documents.
+        self.documents: List[DocumentRecord] = []
+        self.documents_total = 0
+        self.updated_at = 0.0  # wall clock, for callers
+        self.expires_at = 0.0  # monotonic
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "application_company_name": self.application_company_name,
+            "documents": [d.as_dict() for d in self.documents],
+            "documents_total": self.documents_total,
+            "updated_at": datetime.fromtimestamp(self.updated_at, timezone.utc),
+        }
+
+
+class ThreadContextBackend(ABC):
+    """
+    Storage for application context. `update` appends one document record atomically and
+    restarts the TTL; `get` returns a snapshot dict (application_company_name, documents,
+    documents_total, updated_at) or None when the thread is unknown or expired.
+    """
+
+    @abstractmethod
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(
+        self,
+        thread_id: str,
+        application_company_name: Optional[str],
+        document_type: str,
+        company_match: Optional[bool] = None,
+        companies_mentioned: Optional[str] = None,
+    ) -> None:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class ThreadContextStore(ThreadContextBackend):
+    """
+    Expiry is measured from the last update and the TTL is the same for every thread, so
+    update order is expiry order: `_expiry` is kept in update order and expired threads are
+    popped from its front, O(1) per expired thread instead of a scan of the whole store.
+    `_records` is kept in access order for the LRU cap.
+    """
+
+    def __init__(self, ttl_seconds: float, max_threads: int = 0, max_documents: int = 0):
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.max_documents = max_documents
+        self._records: "OrderedDict[str, ThreadRecord]" = OrderedDict()
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire(self, now: float) -> None:
+        while self._expiry:
+            thread_id, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            del self._expiry[thread_id]
+            del self._records[thread_id]
+            self.expired += 1
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._expire(time.monotonic())
+            record = self._records.get(thread_id)
+            if record is None:
+                return None
+            self._records.move_to_end(thread_id)
+            return record.snapshot()
+
+    def update(
+        self,
+        thread_id: str,
+        application_company_name: Optional[str],
+        document_type: str,
+        company_match: Optional[bool] = None,
+        companies_mentioned: Optional[str] = None,
+    ) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            record = self._records.get(thread_id)
+            if record is None:
+                record = ThreadRecord(application_company_name)
+                self._records[thread_id] = record
+            else:
+                self._records.move_to_end(thread_id)
+            record.documents.append(DocumentRecord(document_type, company_match, companies_mentioned or ""))
+            if self.max_documents and len(record.documents) > self.max_documents:
+                del record.documents[0]
+            record.documents_total += 1
+            record.updated_at = time.time()
+            record.expires_at = now + self.ttl_seconds
+            if application_company_name:
+                record.application_company_name = application_company_name
+            self._expiry[thread_id] = record.expires_at
+            self._expiry.move_to_end(thread_id)
+            while self.max_threads and len(self._records) > self.max_threads:
+                evicted_id, _ = self._records.popitem(last=False)
+                del self._expiry[evicted_id]
+                self.evicted += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._expiry.clear()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "threads": len(self._records), "expired": self.expired, "evicted": self.evicted}
+
+
+def create_thread_context_backend(backend: str) -> ThreadContextBackend:
+    ttl = settings.THREAD_CONTEXT_TTL_SECONDS
+    max_threads = settings.THREAD_CONTEXT_MAX_THREADS
+    max_documents = settings.THREAD_CONTEXT_MAX_DOCUMENTS
+    if backend == "memory":
+        return ThreadContextStore(ttl, max_threads=max_threads, max_documents=max_documents)
+    # Imported here so the default in-memory store does not pull in sqlite3 / redis.
+    from app.services import thread_context_backends
+    if backend == "sqlite":
+        return thread_context_backends.SQLiteThreadContextStore(
+            settings.THREAD_CONTEXT_SQLITE_PATH, ttl, max_threads=max_threads, max_documents=max_documents
+        )
+    if backend == "redis":
+        return thread_context_backends.RedisThreadContextStore(
+            settings.THREAD_CONTEXT_REDIS_URL,
+            ttl,
+            max_documents=max_documents,
+            prefix=settings.THREAD_CONTEXT_REDIS_PREFIX,
+        )
+    raise ValueError(f"Unknown THREAD_CONTEXT_BACKEND: {backend!r} (expected memory, sqlite or redis)")
+
+
+thread_context_store = create_thread_context_backend(settings.THREAD_CONTEXT_BACKEND)
 
 
 def get_thread_context(thread_id: Optional[str]) -> Optional[Dict[str, Any]]:
     if not thread_id:
         return None
-    _ttl_cleanup()
-    with _lock:
-        return _store.get(thread_id)
+    return thread_context_store.get(thread_id)
 
 
 def update_thread_context(
@@ -40,21 +199,13 @@ def update_thread_context(
     company_match: Optional[bool] = None,
     companies_mentioned: Optional[str] = None,
 ) -> None:
-    with _lock:
-        if thread_id not in _store:
-            _store[thread_id] = {
-                "application_company_name": application_company_name,
-                "documents": [],
-                "updated_at": datetime.now(timezone.utc),
-            }
-        _store[thread_id]["documents"].append({
-            "document_type": document_type,
-            "company_match": company_match,
-            "companies_mentioned": companies_mentioned or "",
-        })
-        _store[thread_id]["updated_at"] = datetime.now(timezone.utc)
-        if application_company_name:
-            _store[thread_id]["application_company_name"] = application_company_name
+    thread_context_store.update(
+        thread_id,
+        application_company_name,
+        document_type,
+        company_match=company_match,
+        companies_mentioned=companies_mentioned,
+    )
 
 
 def build_previous_documents_prompt(thread_context: Dict[str, Any]) -> str:
@@ -66,7 +217,11 @@ def build_previous_documents_prompt(thread_context: Dict[str, Any]) -> str:
         f"This application is for the company: \"{app_company}\".",
         "You have already analyzed the following documents in this application:",
     ]
-    for i, d in enumerate(docs, 1):
+    # Only the most recent documents are kept; number them by their position in the application.
+    first = max(thread_context.get("documents_total", len(docs)) - len(docs), 0)
+    if first:
+        lines.append(f"- ({first} earlier documents not shown)")
+    for i, d in enumerate(docs, first + 1):
         match_str = "COMPANY_MATCH" if d.get("company_match") else ("COMPANY_MISMATCH" if d.get("company_match") is False else "unknown")
         companies = d.get("companies_mentioned") or "—"
         lines.append(f"- Document {i}: {d.get('document_type', 'unknown')} — {match_str}; companies mentioned: {companies}")
@@ -0,0 +1,254 @@
+"""
+Shared backends for application thread context, for deployments with several uvicorn workers
+or containers where consecutive documents of one application land on different processes.
+
+- SQLiteThreadContextStore: one WAL database shared by the workers on a host.
+- RedisThreadContextStore: any Redis-protocol server (Redis, Valkey, a fakeredis stand-in).
+
+Both append document records atomically (one transaction / MULTI block per update) and
+expire a thread THREAD_CONTEXT_TTL_SECONDS after its last update.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.services.thread_context import ThreadContextBackend
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def _snapshot(company: Optional[str], documents: list, documents_total: int, updated_at: float) -> Dict[str, Any]:
+    return {
+        "application_company_name": company,
+        "documents": documents,
+        "documents_total": documents_total,
+        "updated_at": datetime.fromtimestamp(updated_at, timezone.utc),
+    }
+
+
+class SQLiteThreadContextStore(ThreadContextBackend):
+    """
+    Threads and their documents in two tables; documents are deleted with their thread
+    (ON DELETE CASCADE). The max-threads cap drops the least recently *updated* threads,
+    since reads do not write here. The database is opened on first use, so a server that imports
+    the app before forking its workers gives each worker its own connection, and again after
+    close() (the next app startup in the same process).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_threads: int = 0, max_documents: int = 0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._updates_since_prune = 0
+
+    def _db(self) -> sqlite3.Connection:
+        """The open connection of this process; call with the lock held."""
+        if self._conn is not None and self._conn_pid == os.getpid():
+            return self._conn
+        # A connection inherited through fork is the parent's; never use it here.
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                application_company_name TEXT,
+                documents_total INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS threads_expires_at ON threads (expires_at)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS documents (
+                thread_id TEXT NOT NULL REFERENCES threads (thread_id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                document_type TEXT NOT NULL,
+                company_match INTEGER,
+                companies_mentioned TEXT NOT NULL,
+                PRIMARY KEY (thread_id, seq)
+            ) WITHOUT ROWID"""
+        )
+        self._conn, self._conn_pid = conn, os.getpid()
+        return conn
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN")
+            try:
+                row = conn.execute(
+                    "SELECT application_company_name, documents_total, updated_at FROM threads "
+                    "WHERE thread_id = ? AND expires_at > ?",
+                    (thread_id, time.time()),
+                ).fetchone()
+                if row is None:
+                    return None
+                docs = conn.execute(
+                    "SELECT document_type, company_match, companies_mentioned FROM documents "
+                    "WHERE thread_id = ? ORDER BY seq",
+                    (thread_id,),
+                ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        documents = [
+            {
+                "document_type": document_type,
+                "company_match": None if company_match is None else bool(company_match),
+                "companies_mentioned": companies_mentioned,
+            }
+            for document_type, company_match, companies_mentioned in docs
+        ]
+        return _snapshot(row[0], documents, row[1], row[2])
+
+    def update(
+        self,
+        thread_id: str,
+        application_company_name: Optional[str],
+        document_type: str,
+        company_match: Optional[bool] = None,
+        companies_mentioned: Optional[str] = None,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            # IMMEDIATE takes the write lock up front so concurrent workers serialize here.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM threads WHERE expires_at <= ?", (now,))
+                (total,) = conn.execute(
+                    """INSERT INTO threads (thread_id, application_company_name, documents_total, updated_at, expires_at)
+                    VALUES (?, ?, 1, ?, ?)
+                    ON CONFLICT (thread_id) DO UPDATE SET
+                        application_company_name = COALESCE(excluded.application_company_name, application_company_name),
+                        documents_total = documents_total + 1,
+                        updated_at = excluded.updated_at,
+                        expires_at = excluded.expires_at
+                    RETURNING documents_total""",
+                    (thread_id, application_company_name or None, now, now + self.ttl_seconds),
+                ).fetchone()
+                conn.execute(
+                    "INSERT INTO documents (thread_id, seq, document_type, company_match, companies_mentioned) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (thread_id, total, document_type, company_match, companies_mentioned or ""),
+                )
+                if self.max_documents and total > self.max_documents:
+                    conn.execute(
+                        "DELETE FROM documents WHERE thread_id = ? AND seq <= ?",
+                        (thread_id, total - self.max_documents),
+                    )
+                self._updates_since_prune += 1
+                if self.max_threads and self._updates_since_prune >= 100:
+                    self._updates_since_prune = 0
+                    conn.execute(
+                        """DELETE FROM threads WHERE thread_id IN (
+                            SELECT thread_id FROM threads ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                        )""",
+                        (self.max_threads,),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (threads,) = self._db().execute(
+                "SELECT COUNT(*) FROM threads WHERE expires_at > ?", (time.time(),)
+            ).fetchone()
+        return {"backend": "sqlite", "threads": threads}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+class RedisThreadContextStore(ThreadContextBackend):
+    """
+    Per thread, a hash `<prefix><id>:meta` (company, documents_total, updated_at) and a list
+    `<prefix><id>:docs` of JSON records. An update is one MULTI/EXEC block: RPUSH + LTRIM to
+    the document cap, HINCRBY, and EXPIRE on both keys. There is no max-threads cap; bound
+    memory with the server's maxmemory policy instead.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl_seconds: float,
+        max_documents: int = 0,
+        prefix: str = "mwhr:thread:",
+        client: Any = None,
+    ):
+        if client is None:
+            if redis is None:
+                raise RuntimeError("THREAD_CONTEXT_BACKEND=redis requires the redis package")
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_documents = max_documents
+        self.prefix = prefix
+
+    def _keys(self, thread_id: str):
+        base = f"{self.prefix}{thread_id}"
+        return f"{base}:meta", f"{base}:docs"
+
+    def get(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        meta_key, docs_key = self._keys(thread_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(meta_key)
+        pipe.lrange(docs_key, 0, -1)
+        meta, docs = pipe.execute()
+        if not meta:
+            return None
+        return _snapshot(
+            meta.get("application_company_name") or None,
+            [json.loads(d) for d in docs],
+            int(meta.get("documents_total", len(docs))),
+            float(meta.get("updated_at", 0)),
+        )
+
+    def update(
+        self,
+        thread_id: str,
+        application_company_name: Optional[str],
+        document_type: str,
+        company_match: Optional[bool] = None,
+        companies_mentioned: Optional[str] = None,
+    ) -> None:
+        meta_key, docs_key = self._keys(thread_id)
+        record = json.dumps({
+            "document_type": document_type,
+            "company_match": company_match,
+            "companies_mentioned": companies_mentioned or "",
+        })
+        ttl_ms = max(int(self.ttl_seconds * 1000), 1)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(docs_key, record)
+        if self.max_documents:
+            pipe.ltrim(docs_key, -self.max_documents, -1)
+        if application_company_name:
+            pipe.hset(meta_key, "application_company_name", application_company_name)
+        pipe.hset(meta_key, "updated_at", repr(time.time()))
+        pipe.hincrby(meta_key, "documents_total", 1)
+        pipe.pexpire(meta_key, ttl_ms)
+        pipe.pexpire(docs_key, ttl_ms)
+        pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,89 @@
+"""
+Warm-up of heavy dependencies. langchain_openai, chromadb, the RetrievalQA chain and the page
+worker processes are loaded on first use instead of at import time, so the app starts (and
+/health answers) in a fraction of a second. Each subsystem registers loaders here; on startup
+they run in the background, and request paths `await warmup.require(...)` before using them so
+a cold import happens once, off the event loop, and is shared by everyone who needs it.
+/ready reports 200 once every subsystem is warm.
+"""
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Warmup:
+    def __init__(self):
+        self._loaders: Dict[str, List[Callable[[], Any]]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def register(self, subsystem: str, loader: Callable[[], Any]) -> None:
+        """Add a loader (plain function, run in a thread, or coroutine function) to a subsystem."""
+        self._loaders.setdefault(subsystem, []).append(loader)
+
+    async def _load(self, subsystem: str) -> None:
+        started = time.perf_counter()
+        try:
+            for loader in self._loaders.get(subsystem, []):
+                if inspect.iscoroutinefunction(loader):
+                    await loader()
+                else:
+                    await asyncio.to_thread(loader)
+        except Exception as e:
+            self._errors[subsystem] = str(e)
+            raise
+        finally:
+            self._seconds[subsystem] = time.perf_counter() - started
+
+    def _task(self, subsystem: str) -> asyncio.Task:
+        task = self._tasks.get(subsystem)
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            # A failed warm-up is retried by the next caller instead of failing forever.
+            self._errors.pop(subsystem, None)
+            task = self._tasks[subsystem] = asyncio.get_running_loop().create_task(self._load(subsystem))
+            # Warm-up failures surface through require() and /ready, not as "never retrieved".
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def start(self) -> None:
+        """Start loading every subsystem in the background (call from a running event loop)."""
+        for subsystem in self._loaders:
+            self._task(subsystem)
+
+    async def require(self, subsystem: str) -> None:
+        """Wait until `subsystem` is loaded, starting it if nobody has yet."""
+        task = self._task(subsystem)
+        if not task.done():
+            # Shielded: a cancelled request must not cancel the warm-up other callers share.
+            await asyncio.shield(task)
+        else:
+            task.result()
+
+    def is_ready(self, subsystem: Optional[str] = None) -> bool:
+        names = [subsystem] if subsystem else list(self._loaders)
+        for name in names:
+            task = self._tasks.get(name)
+            if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+                return False
+        return True
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        status: Dict[str, Dict[str, Any]] = {}
+        for subsystem in self._loaders:
+            task = self._tasks.get(subsystem)
+            entry: Dict[str, Any] = {
+                "ready": self.is_ready(subsystem),
+                "state": "idle" if task is None else ("loading" if not task.done() else "done"),
+            }
+            if subsystem in self._seconds:
+                entry["seconds"] = round(self._seconds[subsystem], 3)
+            if subsystem in self._errors:
+                entry["state"] = "failed"
+                entry["error"] = self._errors[subsystem]
+            status[subsystem] = entry
+        return status
+
+
+warmup = Warmup()
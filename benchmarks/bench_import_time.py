@@ -0,0 +1,139 @@
+"""
+Cold-start benchmark: how long `import app.main` takes in a fresh interpreter, which modules
+dominate it (python -X importtime), and, with --serve, how long a uvicorn process takes to
+answer /health and to report /ready.
+
+    python -m benchmarks.bench_import_time --runs 5 --serve --max-import-seconds 1.5
+
+With --max-import-seconds the exit status is 1 when the median import time exceeds the
+budget, so CI can catch a heavy dependency creeping back into the import path.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+_ENV = {"OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "stub")}
+_TIMER = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _run_python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        env={**os.environ, **_ENV},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_seconds() -> float:
+    # The timing is the last stdout line; PyMuPDF may print a deprecation notice before it.
+    return float(_run_python(["-c", _TIMER]).stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> List[Dict]:
+    """Third-party/stdlib packages imported directly by app modules, by cumulative import time."""
+    stderr = _run_python(["-X", "importtime", "-c", "import app.main"]).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        # Two spaces of indentation per nesting level.
+        entries.append(((len(name) - len(name.lstrip()) - 1) // 2, name.strip(), int(cumulative)))
+    # The output is post-order (children before their parent), so walk it backwards to know
+    # each module's importer.
+    totals: Dict[str, int] = {}
+    ancestors: Dict[int, str] = {}
+    for depth, module, cumulative in reversed(entries):
+        ancestors[depth] = module
+        if depth and ancestors.get(depth - 1, "").startswith("app.") and not module.startswith("app."):
+            top_level = module.split(".")[0]
+            totals[top_level] = totals.get(top_level, 0) + cumulative
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"module": module, "seconds": round(us / 1e6, 3)} for module, us in ranked]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _poll(url: str, deadline: float, want_status: int) -> Optional[float]:
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == want_status:
+                return time.monotonic()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def serve_seconds(timeout: float) -> Dict[str, Optional[float]]:
+    """Seconds from spawning uvicorn until /health answers and until /ready returns 200."""
+    port = _free_port()
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **_ENV},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + timeout
+        health = _poll(f"http://127.0.0.1:{port}/health", deadline, 200)
+        ready = _poll(f"http://127.0.0.1:{port}/ready", deadline, 200) if health else None
+        subsystems = httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1.0).json()["subsystems"] if health else None
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "health_seconds": round(health - started, 3) if health else None,
+        "ready_seconds": round(ready - started, 3) if ready else None,
+        "subsystems": subsystems,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--serve", action="store_true", help="also time a uvicorn start to /health and /ready")
+    parser.add_argument("--serve-timeout", type=float, default=60.0)
+    parser.add_argument("--max-import-seconds", type=float, help="exit 1 if the median import time is above this")
+    args = parser.parse_args()
+
+    import_seconds()  # first run fills the OS page cache and __pycache__; not counted
+    samples = sorted(import_seconds() for _ in range(args.runs))
+    report = {
+        "runs": args.runs,
+        "import_median_seconds": round(statistics.median(samples), 3),
+        "import_min_seconds": round(samples[0], 3),
+        "import_max_seconds": round(samples[-1], 3),
+        "slowest_imports": slowest_imports(args.top),
+    }
+    if args.serve:
+        report["serve"] = serve_seconds(args.serve_timeout)
+    print(json.dumps(report, indent=2))
+    if args.max_import_seconds is not None and report["import_median_seconds"] > args.max_import_seconds:
+        print(
+            f"import app.main took {report['import_median_seconds']}s (budget {args.max_import_seconds}s)",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+OCR benchmark: pages per second, render size and word accuracy of the adaptive local OCR
+(page_ocr: page classes, per-region DPI, grayscale, request languages) against the previous
+settings (OCR every page with under 50 characters at a fixed 2x RGB render).
+
+    python -m benchmarks.bench_ocr --pages 5 --kinds scanned partial garbled --scan-dpi 150 300
+
+Synthetic scans are made from the text-layer documents of benchmarks.synthetic_pdfs, so the
+ground truth is the text layer they were rasterized from:
+
+- scanned: the whole page as a bitmap
+- partial: the letterhead block as a bitmap on the top third of an otherwise empty page
+- garbled: a full-page bitmap under an invisible text layer of junk characters
+
+Without a tesseract binary only classification and rendering are timed (accuracy is null).
+"""
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fitz
+
+# app.config requires an OpenAI key at import; the OCR paths never call OpenAI.
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+from app.services.page_executor import extract_page
+from app.services.page_ocr import classify_page, load_tesseract, plan_renders
+from benchmarks.synthetic_pdfs import make_pdf
+
+_PARTIAL_HEIGHT = 280  # points from the top of an A4 page
+
+
+def make_scans(kind: str, pages: int, scan_dpi: int) -> Tuple[fitz.Document, List[str]]:
+    """(document with `pages` synthetic scans of `kind`, ground-truth text per page)."""
+    source = fitz.open(stream=make_pdf("text", pages), filetype="pdf")
+    doc = fitz.open()
+    truths = []
+    try:
+        for text_page in source:
+            clip = fitz.Rect(0, 0, text_page.rect.width, _PARTIAL_HEIGHT) if kind == "partial" else text_page.rect
+            pix = text_page.get_pixmap(dpi=scan_dpi, colorspace=fitz.csGRAY, clip=clip)
+            truths.append(text_page.get_text(clip=clip))
+            page = doc.new_page(width=text_page.rect.width, height=text_page.rect.height)
+            page.insert_image(clip, stream=pix.tobytes("png"))
+            if kind == "partial":
+                page.insert_text((50, text_page.rect.height - 40), f"Page {text_page.number + 1}", fontsize=9)
+            elif kind == "garbled":
+                # Same words, sizes and positions, every character unmappable: what a broken
+                # font encoding yields.
+                for block in text_page.get_text("dict")["blocks"]:
+                    for line in block.get("lines", []):
+                        for span in line["spans"]:
+                            junk = re.sub(r"\S", "\ue000", span["text"])
+                            page.insert_text(span["origin"], junk, fontsize=span["size"], render_mode=3)
+    finally:
+        source.close()
+    return doc, truths
+
+
+def word_accuracy(truth: str, text: str) -> float:
+    """Share of the ground-truth words (as a multiset, case-insensitive) found in the OCR text."""
+    want = Counter(re.findall(r"\w+", truth.lower()))
+    got = Counter(re.findall(r"\w+", text.lower()))
+    total = sum(want.values())
+    return sum((want & got).values()) / total if total else 1.0
+
+
+def baseline_page(page, ocr: bool) -> Tuple[str, float]:
+    """The previous extract_page: OCR under 50 characters, 2x RGB render, default language."""
+    text = (page.get_text() or "").strip()
+    if len(text) >= 50:
+        return text, 0.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(2.0, 2.0), alpha=False)
+    megapixels = pix.width * pix.height / 1e6
+    if not ocr:
+        return text, megapixels
+    pytesseract, Image = load_tesseract()
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return (pytesseract.image_to_string(img) or "").strip(), megapixels
+
+
+def adaptive_page(page, ocr: bool, languages: List[str]) -> Tuple[str, float]:
+    text = (page.get_text() or "").strip()
+    plan = classify_page(page, text)
+    megapixels = 0.0
+    for clip, dpi in plan_renders(page, plan):
+        megapixels += (clip.width * dpi / 72) * (clip.height * dpi / 72) / 1e6
+        if not ocr:
+            page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, clip=clip, alpha=False)
+    if not ocr:
+        return text, megapixels
+    return extract_page(page.parent, page.number, True, languages=languages)["text"], megapixels
+
+
+def run(
+    doc: fitz.Document,
+    truths: List[str],
+    extract: Callable[[object], Tuple[str, float]],
+    ocr: bool,
+) -> Dict[str, Optional[float]]:
+    started = time.perf_counter()
+    results = [extract(page) for page in doc]
+    seconds = time.perf_counter() - started
+    return {
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(len(results) / seconds, 2) if seconds else None,
+        "megapixels_per_page": round(sum(mp for _, mp in results) / len(results), 2),
+        "word_accuracy": round(
+            sum(word_accuracy(truth, text) for truth, (text, _) in zip(truths, results)) / len(results), 4
+        ) if ocr else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=5, help="pages per synthetic document")
+    parser.add_argument("--kinds", nargs="+", default=["scanned", "partial", "garbled"])
+    parser.add_argument("--scan-dpi", type=int, nargs="+", default=[150, 300], help="resolution of the synthetic scans")
+    parser.add_argument("--languages", nargs="+", default=["eng"])
+    args = parser.parse_args()
+
+    ocr = bool(load_tesseract())
+    report = {"tesseract": ocr, "pages": args.pages, "results": []}
+    for kind in args.kinds:
+        for scan_dpi in args.scan_dpi:
+            doc, truths = make_scans(kind, args.pages, scan_dpi)
+            try:
+                page_classes = Counter(
+                    classify_page(page, (page.get_text() or "").strip()).kind for page in doc
+                )
+                report["results"].append({
+                    "kind": kind,
+                    "scan_dpi": scan_dpi,
+                    "page_classes": dict(page_classes),
+                    "baseline": run(doc, truths, lambda page: baseline_page(page, ocr), ocr),
+                    "adaptive": run(doc, truths, lambda page: adaptive_page(page, ocr, args.languages), ocr),
+                })
+            finally:
+                doc.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
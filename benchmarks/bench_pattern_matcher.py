@@ -0,0 +1,110 @@
+"""
+Micro-benchmark: per-message cost of chat pattern matching as the intent list grows.
+Compares the old per-message difflib scan with the compiled PatternMatcher and reports how
+often both pick the same response.
+
+    python -m benchmarks.bench_pattern_matcher [--sizes 50 500 2000 5000] [--messages 300]
+"""
+import argparse
+import json
+import os
+import random
+import time
+from difflib import get_close_matches
+
+from app.services.pattern_matcher import PatternMatcher
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "data", "chat-data.json")
+VOCAB = (
+    "fee cost price renewal class category electrical plumbing building civil certificate "
+    "tax clearance ssnit document upload apply process steps office contact email phone "
+    "how much long when where what which do i need to for the my of a renew upgrade "
+    "downgrade revocation appeal sanction committee vetting evaluation inspection audit "
+    "registration incorporation commence business vat bank statement account director "
+    "personnel engineer equipment vehicle contract award payment receipt portal password "
+    "login account status approval rejection deadline expiry validity region district "
+    "assembly procurement tender bid grade roads bridges water sanitation wiring solar"
+).split()
+
+
+def difflib_match(intents, message_lower, include_greeting):
+    """The matcher as it was before: rebuild the pattern list and scan it with difflib."""
+    all_patterns = []
+    pattern_map = {}
+    for intent in intents:
+        if intent["id"] == "greeting" and not include_greeting:
+            continue
+        for pattern in intent["patterns"]:
+            pattern_lower = pattern.lower()
+            all_patterns.append(pattern_lower)
+            pattern_map[pattern_lower] = intent["response"]
+    matches = get_close_matches(message_lower, all_patterns, n=1, cutoff=0.65)
+    return pattern_map[matches[0]] if matches else None
+
+
+def synthetic_intents(base_intents, size, rng):
+    intents = [dict(i) for i in base_intents]
+    count = sum(len(i["patterns"]) for i in intents)
+    n = 0
+    while count < size:
+        patterns = [" ".join(rng.choices(VOCAB, k=rng.randint(2, 6))) for _ in range(5)]
+        intents.append({"id": f"synthetic_{n}", "patterns": patterns, "response": f"response {n}"})
+        count += len(patterns)
+        n += 1
+    return intents
+
+
+def perturb(text, rng):
+    chars = list(text)
+    for _ in range(rng.randint(0, 2)):
+        if chars:
+            chars[rng.randrange(len(chars))] = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+    return "".join(chars)
+
+
+def run(sizes, message_count, seed):
+    rng = random.Random(seed)
+    with open(DATA_PATH, encoding="utf-8") as f:
+        base = json.load(f)["intents"]
+    results = []
+    for size in sizes:
+        intents = synthetic_intents(base, size, rng)
+        all_patterns = [p.lower() for i in intents for p in i["patterns"]]
+        messages = [perturb(rng.choice(all_patterns), rng) for _ in range(message_count // 2)]
+        messages += [" ".join(rng.choices(VOCAB, k=rng.randint(1, 8))) for _ in range(message_count - len(messages))]
+
+        started = time.perf_counter()
+        matcher = PatternMatcher(intents)
+        compile_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        expected = [difflib_match(intents, m, True) for m in messages]
+        difflib_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+        started = time.perf_counter()
+        actual = [matcher.match(m, include_greeting=True) for m in messages]
+        matcher_us = (time.perf_counter() - started) / len(messages) * 1e6
+
+        agree = sum(a == e for a, e in zip(actual, expected)) / len(messages)
+        results.append({
+            "patterns": len(all_patterns),
+            "compile_ms": round(compile_ms, 2),
+            "difflib_us_per_message": round(difflib_us, 1),
+            "matcher_us_per_message": round(matcher_us, 1),
+            "speedup": round(difflib_us / matcher_us, 1) if matcher_us else None,
+            "agreement": round(agree, 4),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000, 5000])
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.messages, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
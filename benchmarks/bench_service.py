@@ -0,0 +1,266 @@
+"""
+End-to-end throughput benchmark, fully offline: synthetic PDFs are served from a local HTTP
+server and OpenAI (chat + embeddings) and Unstructured are replaced by the stubs in this
+directory, each running as its own process with configurable latency. /extract, /analyze and
+/chat are driven in-process through the FastAPI app (httpx ASGITransport) at each concurrency
+level, and p50/p95/p99 latency, requests/sec and peak RSS are printed as JSON.
+
+    python -m benchmarks.bench_service --scenarios extract analyze chat --concurrency 1 4 16 \
+        --kinds text mixed --pages 1 10 --requests 40 --chat-latency 0.5 --out run.json
+
+Caches (downloads, embeddings, analysis results, chat answers) are disabled unless
+--warm-caches is given, so runs measure the full pipeline. Note that scanned pages need the
+tesseract binary for OCR.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.synthetic_pdfs import write_set
+
+CHAT_QUESTIONS = [
+    "What documents do I need to upgrade my building contractor class?",
+    "How long does the vetting committee take to evaluate an application?",
+    "Can a foreign company apply for civil works certification?",
+    "What happens if my tax clearance expires during the evaluation?",
+    "Which equipment must a roads contractor show for the higher category?",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"stub on port {port} did not start")
+
+
+def _start(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class RSSSampler:
+    """Peak RSS of this process plus its page-executor workers (stub processes excluded)."""
+
+    def __init__(self, exclude: List[int], interval: float = 0.1):
+        self.exclude = set(exclude)
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _children(self) -> List[int]:
+        try:
+            with open(f"/proc/{os.getpid()}/task/{os.getpid()}/children") as f:
+                return [int(pid) for pid in f.read().split() if int(pid) not in self.exclude]
+        except OSError:
+            return []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            total = _rss_kb(os.getpid()) + sum(_rss_kb(pid) for pid in self._children())
+            self.peak_kb = max(self.peak_kb, total)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 4)
+
+
+async def _drive(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    failures = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal failures
+        for i in counter:
+            method, path, body = make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                key = str(response.status_code)
+                if response.status_code == 200 and path != "/chat" and not response.json().get("success", True):
+                    failures += 1
+            except Exception as e:
+                key = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "wall_seconds": round(wall, 3),
+        "rps": round(total / wall, 3) if wall else None,
+        "p50_seconds": _percentile(latencies, 0.50),
+        "p95_seconds": _percentile(latencies, 0.95),
+        "p99_seconds": _percentile(latencies, 0.99),
+        "statuses": statuses,
+        "unsuccessful_results": failures,
+    }
+
+
+async def run(args, file_base: str, stub_pids: List[int]) -> List[Dict]:
+    # Imported only now: settings are read from the environment prepared by main().
+    from app.main import app, settings, shutdown_services
+
+    documents = [f"{file_base}/{name}" for name in write_set(args.pdf_dir, args.kinds, args.pages)]
+
+    def request_for(scenario: str):
+        def make(i: int):
+            if scenario == "extract":
+                return "POST", "/extract", {"document_url": documents[i % len(documents)], "use_ocr": True}
+            if scenario == "analyze":
+                return "POST", "/analyze", {
+                    "document_url": documents[i % len(documents)],
+                    "document_type": "certificate_of_incorporation",
+                    "application_company_name": "Acme Construction Limited",
+                }
+            return "POST", "/chat", {"message": f"{CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)]} (ref {i})"}
+        return make
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        headers={"x-api-key": settings.SERVICE_API_KEY},
+        timeout=None,
+    ) as client:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                with RSSSampler(exclude=stub_pids) as sampler:
+                    result = await _drive(client, request_for(scenario), args.requests, concurrency)
+                results.append({
+                    "scenario": scenario,
+                    "concurrency": concurrency,
+                    "documents": [d.rsplit("/", 1)[1] for d in documents] if scenario != "chat" else None,
+                    **result,
+                    "peak_rss_mb": round(sampler.peak_kb / 1024, 1),
+                })
+                print(f"{scenario} c={concurrency}: {result['rps']} rps, p95 {result['p95_seconds']}s", file=sys.stderr)
+    await shutdown_services()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", default=["extract", "analyze", "chat"], choices=["extract", "analyze", "chat"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario and concurrency level")
+    parser.add_argument("--kinds", nargs="+", default=["text", "mixed"], choices=["text", "scanned", "mixed"])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--pdf-dir", default=os.path.join(tempfile.gettempdir(), "mwhr-bench-pdfs"))
+    parser.add_argument("--chat-latency", type=float, default=0.5)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--unstructured", action="store_true", help="extract through the Unstructured stub")
+    parser.add_argument("--unstructured-latency-per-page", type=float, default=0.05)
+    parser.add_argument("--warm-caches", action="store_true")
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    write_set(args.pdf_dir, args.kinds, args.pages)
+    workdir = tempfile.mkdtemp(prefix="mwhr-bench-")
+    file_port, openai_port, unstructured_port = _free_port(), _free_port(), _free_port()
+    stubs = [
+        _start(["-m", "http.server", str(file_port), "--bind", "127.0.0.1", "--directory", args.pdf_dir], {}),
+        _start(
+            ["-m", "uvicorn", "benchmarks.stub_openai:app", "--port", str(openai_port), "--log-level", "warning"],
+            {"STUB_CHAT_LATENCY": str(args.chat_latency), "STUB_EMBEDDING_LATENCY": str(args.embedding_latency)},
+        ),
+    ]
+    env = {
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "UNSTRUCTURED_API_KEY": "",
+        "THREAD_CONTEXT_SQLITE_PATH": os.path.join(workdir, "threads.sqlite3"),
+        "ANALYSIS_JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+    }
+    if args.unstructured:
+        stubs.append(_start(
+            ["-m", "uvicorn", "benchmarks.stub_unstructured:app", "--port", str(unstructured_port), "--log-level", "warning"],
+            {"STUB_LATENCY_PER_PAGE": str(args.unstructured_latency_per_page)},
+        ))
+        env.update(UNSTRUCTURED_API_KEY="stub", UNSTRUCTURED_API_URL=f"http://127.0.0.1:{unstructured_port}")
+    if args.warm_caches:
+        env.update(
+            DOWNLOAD_CACHE_DIR=os.path.join(workdir, "downloads"),
+            EMBEDDING_CACHE_PATH=os.path.join(workdir, "embeddings.sqlite3"),
+            ANALYSIS_RESULTS_PATH=os.path.join(workdir, "analysis-results.sqlite3"),
+        )
+    else:
+        env.update(
+            DOWNLOAD_CACHE_DIR="", EMBEDDING_CACHE_PATH="", ANALYSIS_RESULTS_PATH="", CHAT_CACHE_MAX_ENTRIES="0"
+        )
+    os.environ.update(env)
+    try:
+        for port in (file_port, openai_port) + ((unstructured_port,) if args.unstructured else ()):
+            _wait_for_port(port)
+        results = asyncio.run(run(args, f"http://127.0.0.1:{file_port}", [p.pid for p in stubs]))
+    finally:
+        for stub in stubs:
+            stub.terminate()
+            stub.wait()
+    report = json.dumps({
+        "config": {k: v for k, v in vars(args).items() if k not in ("pdf_dir", "out")},
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }, indent=2)
+    print(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
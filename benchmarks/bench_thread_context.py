@@ -0,0 +1,118 @@
+"""
+Micro-benchmark: cost of get/update on the application thread context store with many live
+threads. Compares the old dict store (full TTL scan under the lock on every get) with
+ThreadContextStore.
+
+    python -m benchmarks.bench_thread_context [--threads 1000 10000 100000] [--ops 2000]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from app.services.thread_context import ThreadContextStore
+
+
+class DictStore:
+    """The store as it was before: nested dicts, datetime TTL scan on every get."""
+
+    def __init__(self, ttl_hours=2):
+        self.ttl_hours = ttl_hours
+        self._store = {}
+        self._lock = threading.Lock()
+
+    def _ttl_cleanup(self):
+        with self._lock:
+            now = datetime.now(timezone.utc)
+            to_del = [
+                tid for tid, data in self._store.items()
+                if (now - data.get("updated_at", now)).total_seconds() > self.ttl_hours * 3600
+            ]
+            for tid in to_del:
+                del self._store[tid]
+
+    def get(self, thread_id):
+        self._ttl_cleanup()
+        with self._lock:
+            return self._store.get(thread_id)
+
+    def update(self, thread_id, application_company_name, document_type, company_match=None, companies_mentioned=None):
+        with self._lock:
+            if thread_id not in self._store:
+                self._store[thread_id] = {
+                    "application_company_name": application_company_name,
+                    "documents": [],
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            self._store[thread_id]["documents"].append({
+                "document_type": document_type,
+                "company_match": company_match,
+                "companies_mentioned": companies_mentioned or "",
+            })
+            self._store[thread_id]["updated_at"] = datetime.now(timezone.utc)
+
+
+def fill(store, threads, docs_per_thread):
+    for n in range(threads):
+        for d in range(docs_per_thread):
+            store.update(f"app-{n}", f"Company {n} Ltd", f"doc_{d}", True, f"Company {n} Ltd")
+
+
+def measure(make_store, threads, ops, docs_per_thread, rng):
+    tracemalloc.start()
+    store = make_store()
+    started = time.perf_counter()
+    fill(store, threads, docs_per_thread)
+    fill_s = time.perf_counter() - started
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+
+    ids = [f"app-{rng.randrange(threads)}" for _ in range(ops)]
+    started = time.perf_counter()
+    for thread_id in ids:
+        store.get(thread_id)
+    get_us = (time.perf_counter() - started) / ops * 1e6
+    started = time.perf_counter()
+    for thread_id in ids:
+        store.update(thread_id, None, "extra", False, "Other Ltd")
+    update_us = (time.perf_counter() - started) / ops * 1e6
+    return {
+        "fill_seconds": round(fill_s, 2),
+        "memory_mb": round(memory_mb, 1),
+        "get_us": round(get_us, 2),
+        "update_us": round(update_us, 2),
+    }
+
+
+def run(sizes, ops, docs_per_thread, seed):
+    rng = random.Random(seed)
+    results = []
+    for threads in sizes:
+        # The old store scans every thread per get; keep its op count bounded at large sizes.
+        old_ops = max(20, min(ops, 2_000_000 // threads))
+        results.append({
+            "threads": threads,
+            "docs_per_thread": docs_per_thread,
+            "dict_store": measure(DictStore, threads, old_ops, docs_per_thread, rng),
+            "thread_context_store": measure(
+                lambda: ThreadContextStore(7200, max_documents=50), threads, ops, docs_per_thread, rng
+            ),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--docs-per-thread", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.threads, args.ops, args.docs_per_thread, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Local stand-in for the OpenAI chat completions and embeddings endpoints.
+Chat answers are canned (they include "COMPANY_MATCH: YES" so the company guard parses) and are
+streamed word by word when `stream` is set; embeddings are deterministic pseudo-random vectors
+derived from the input, so the embedding cache behaves as it would against the real API.
+
+    STUB_CHAT_LATENCY=0.8 STUB_EMBEDDING_LATENCY=0.05 uvicorn benchmarks.stub_openai:app --port 8002
+    OPENAI_BASE_URL=http://127.0.0.1:8002/v1 uvicorn app.main:app
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+CHAT_LATENCY = float(os.environ.get("STUB_CHAT_LATENCY", "0.5"))
+# Seconds per streamed token after the first (time to first token is CHAT_LATENCY)
+TOKEN_LATENCY = float(os.environ.get("STUB_TOKEN_LATENCY", "0.01"))
+EMBEDDING_LATENCY = float(os.environ.get("STUB_EMBEDDING_LATENCY", "0.05"))
+EMBEDDING_DIM = int(os.environ.get("STUB_EMBEDDING_DIM", "1536"))
+
+ANSWER = (
+    "COMPANY_MATCH: YES\n"
+    "1. Document type verification: the document matches the declared type.\n"
+    "2. Key information: company name, registration number and dates are present.\n"
+    "3. Compliance check: no missing signatures or stamps were found.\n"
+    "4. Red flags: none.\n"
+    "5. Recommendations: accept the document."
+)
+
+app = FastAPI(title="OpenAI stub")
+app.state.chat_requests = 0
+app.state.embedding_requests = 0
+
+
+def _vector(item) -> list:
+    seed = hashlib.sha256(json.dumps(item).encode("utf-8")).digest()
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    app.state.chat_requests += 1
+    body = await request.json()
+    model = body.get("model", "stub")
+    created = int(time.time())
+    await asyncio.sleep(CHAT_LATENCY)
+    if not body.get("stream"):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": ANSWER}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    async def events():
+        for i, word in enumerate(ANSWER.split(" ")):
+            if i:
+                await asyncio.sleep(TOKEN_LATENCY)
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if not i else " " + word}, "finish_reason": None}],
+            }
+            if not i:
+                chunk["choices"][0]["delta"] = {"role": "assistant", "content": word}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        done = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        yield f"data: {json.dumps(done)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    app.state.embedding_requests += 1
+    body = await request.json()
+    inputs = body["input"]
+    # A single string / token list is one input; a list of them is a batch.
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    await asyncio.sleep(EMBEDDING_LATENCY)
+    return {
+        "object": "list",
+        "model": body.get("model", "stub"),
+        "data": [{"object": "embedding", "index": i, "embedding": _vector(item)} for i, item in enumerate(inputs)],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
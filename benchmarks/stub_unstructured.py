@@ -0,0 +1,49 @@
+"""
+Local stand-in for the Unstructured `/general/v0/general` endpoint.
+Returns one NarrativeText element per page (text from PyMuPDF) with batch-relative page numbers,
+after an artificial per-page latency. A fraction of requests can be made to fail with 503 to
+exercise batch retries.
+
+    STUB_LATENCY_PER_PAGE=0.2 STUB_FAIL_RATE=0.1 uvicorn benchmarks.stub_unstructured:app --port 8001
+    UNSTRUCTURED_API_KEY=stub UNSTRUCTURED_API_URL=http://127.0.0.1:8001 uvicorn app.main:app
+"""
+import asyncio
+import os
+import random
+from typing import List, Optional
+
+import fitz
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+
+LATENCY_PER_PAGE = float(os.environ.get("STUB_LATENCY_PER_PAGE", "0.05"))
+FAIL_RATE = float(os.environ.get("STUB_FAIL_RATE", "0"))
+
+app = FastAPI(title="Unstructured stub")
+app.state.requests = 0
+
+
+@app.post("/general/v0/general")
+async def general(
+    files: UploadFile = File(...),
+    strategy: str = Form("hi_res"),
+    languages: Optional[List[str]] = Form(None),
+):
+    app.state.requests += 1
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        raise HTTPException(status_code=503, detail="stub failure")
+    pdf_bytes = await files.read()
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        pages = [(page.get_text() or "").strip() for page in doc]
+    finally:
+        doc.close()
+    await asyncio.sleep(LATENCY_PER_PAGE * len(pages))
+    return [
+        {
+            "type": "NarrativeText",
+            "text": text,
+            "metadata": {"page_number": page_no, "filename": files.filename, "filetype": "application/pdf"},
+        }
+        for page_no, text in enumerate(pages, 1)
+        if text
+    ]
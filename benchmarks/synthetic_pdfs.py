@@ -0,0 +1,100 @@
+"""
+Synthetic contractor documents for benchmarks, generated with PyMuPDF:
+
+- text:    pages with a text layer (what PyMuPDF reads directly)
+- scanned: image-only pages (the same text rendered to a bitmap, so extraction has to OCR)
+- mixed:   text and scanned pages alternating
+
+    python -m benchmarks.synthetic_pdfs --out /tmp/pdfs --kinds text scanned mixed --pages 1 10 200
+"""
+import argparse
+import os
+import random
+from typing import Iterable, List
+
+import fitz
+
+_WORDS = (
+    "certificate registration company limited contractor ministry works housing water resources "
+    "director shareholder incorporation tax clearance ssnit social security commencement business "
+    "class category civil building electrical plumbing roads bridges valid expiry issued authority "
+    "accra kumasi tamale takoradi stamp signature registrar general board resolution capital "
+    "equipment personnel engineer qualification vetting evaluation audit financial statement bank"
+).split()
+
+
+def _paragraphs(rng: random.Random, page_no: int) -> str:
+    lines = [
+        "REPUBLIC OF GHANA - OFFICE OF THE REGISTRAR OF COMPANIES",
+        f"Certificate No. CS{rng.randint(100000, 999999)}  Page {page_no}",
+        "Company: Acme Construction Limited",
+        f"Date of issue: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2015, 2024)}",
+        "",
+    ]
+    for _ in range(6):
+        lines.append(" ".join(rng.choices(_WORDS, k=rng.randint(40, 70))).capitalize() + ".")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _text_page(doc: fitz.Document, text: str) -> None:
+    page = doc.new_page(width=595, height=842)
+    page.insert_textbox(fitz.Rect(50, 50, 545, 792), text, fontsize=10)
+
+
+def _scanned_page(doc: fitz.Document, text: str, dpi: int = 150) -> None:
+    # Lay the text out on a scratch page, rasterize it, and place only the bitmap.
+    scratch = fitz.open()
+    try:
+        _text_page(scratch, text)
+        pix = scratch[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    finally:
+        scratch.close()
+    page = doc.new_page(width=595, height=842)
+    page.insert_image(page.rect, stream=pix.tobytes("png"))
+
+
+def make_pdf(kind: str, pages: int, seed: int = 0) -> bytes:
+    if kind not in ("text", "scanned", "mixed"):
+        raise ValueError(f"unknown kind {kind!r}")
+    rng = random.Random(f"{kind}-{pages}-{seed}")
+    doc = fitz.open()
+    try:
+        for page_no in range(1, pages + 1):
+            text = _paragraphs(rng, page_no)
+            if kind == "text" or (kind == "mixed" and page_no % 2):
+                _text_page(doc, text)
+            else:
+                _scanned_page(doc, text)
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def write_set(out_dir: str, kinds: Iterable[str], page_counts: Iterable[int]) -> List[str]:
+    """Write one PDF per (kind, page count); returns the file names."""
+    os.makedirs(out_dir, exist_ok=True)
+    names = []
+    for kind in kinds:
+        for pages in page_counts:
+            name = f"{kind}-{pages}p.pdf"
+            path = os.path.join(out_dir, name)
+            if not os.path.exists(path):
+                with open(path, "wb") as f:
+                    f.write(make_pdf(kind, pages))
+            names.append(name)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--kinds", nargs="+", default=["text", "scanned", "mixed"])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+    for name in write_set(args.out, args.kinds, args.pages):
+        print(os.path.join(args.out, name))
+
+
+if __name__ == "__main__":
+    main()
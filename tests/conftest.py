@@ -0,0 +1,21 @@
+"""
+Settings are read once, when app.core.config is first imported, so the test environment is set
+here before any test module imports the app: no OpenAI key or on-disk caches, a throwaway job
+store, pages extracted in a thread, and a small enough stuff limit that a few pages go through
+retrieval.
+"""
+import os
+import tempfile
+
+os.environ.update({
+    "OPENAI_API_KEY": "test",
+    "SERVICE_API_KEY": "test",
+    "ANALYSIS_RESULTS_PATH": "",
+    "EMBEDDING_CACHE_PATH": "",
+    "DOWNLOAD_CACHE_DIR": "",
+    "ANALYSIS_JOBS_DB_PATH": os.path.join(tempfile.mkdtemp(prefix="mwhr-tests-"), "jobs.sqlite3"),
+    "PAGE_EXECUTOR_WORKERS": "0",
+    "ANALYSIS_CONDENSE_WITH_FIELDS": "false",
+    # Anything over ~200 characters goes through embeddings + retrieval.
+    "ANALYSIS_STUFF_MAX_TOKENS": "50",
+})
@@ -0,0 +1,77 @@
+"""
+Admission control: callers beyond a stage's concurrency wait, beyond ADMISSION_MAX_WAITING they
+are rejected, and the API turns the rejection into 429 with Retry-After.
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.admission import AdmissionRejected, StageLimiter, admission
+
+
+async def _hold(limiter: StageLimiter, release: asyncio.Event, entered: list):
+    async with limiter.slot():
+        entered.append(True)
+        await release.wait()
+
+
+def test_callers_wait_then_are_rejected():
+    async def run():
+        limiter = StageLimiter("ocr", concurrency=1, max_waiting=1)
+        release, entered = asyncio.Event(), []
+        holder = asyncio.create_task(_hold(limiter, release, entered))
+        waiter = asyncio.create_task(_hold(limiter, release, entered))
+        await asyncio.sleep(0)
+        stats = limiter.stats()
+        try:
+            async with limiter.slot():
+                rejected = None
+        except AdmissionRejected as e:
+            rejected = e
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return limiter, stats, rejected, entered
+
+    limiter, stats, rejected, entered = asyncio.run(run())
+    assert (stats["active"], stats["waiting"]) == (1, 1)
+    assert rejected is not None and rejected.stage == "ocr"
+    # No slot time measured before the first release: the configured default.
+    assert rejected.retry_after == settings.ADMISSION_RETRY_AFTER_SECONDS
+    assert len(entered) == 2
+    assert limiter.stats() == {
+        "active": 0, "waiting": 0, "concurrency": 1, "max_waiting": 1, "admitted": 2, "rejected": 1,
+    }
+
+
+def test_retry_after_follows_the_measured_hold_time():
+    limiter = StageLimiter("llm", concurrency=2, max_waiting=0)
+    limiter._avg_hold_seconds = 3.0
+    limiter.waiting = 3
+    # (3 waiting + this caller) over 2 slots, 3 s each.
+    assert limiter.retry_after() == 6
+
+
+def test_unlimited_stage_never_rejects():
+    async def run():
+        limiter = StageLimiter("download", concurrency=0, max_waiting=0)
+        async with limiter.slot(), limiter.slot():
+            return limiter.stats()
+
+    assert asyncio.run(run())["rejected"] == 0
+
+
+def test_saturated_stage_is_429_with_retry_after(monkeypatch):
+    limiter = StageLimiter("llm", concurrency=1, max_waiting=0)
+    limiter.active = 1  # the only slot is taken
+    monkeypatch.setitem(admission.stages, "llm", limiter)
+    question = (
+        "What supporting documents does a road contractor need to upload when applying to move "
+        "from grade D2K2 up to grade D1K1 this year?"
+    )
+    with TestClient(app) as client:
+        response = client.post("/chat", headers={"X-API-Key": "test"}, json={"message": question, "history": []})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+    assert response.json()["stage"] == "llm"
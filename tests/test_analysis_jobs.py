@@ -0,0 +1,62 @@
+"""
+/analyze/jobs across app restarts in one process: a job submitted after a shutdown and a new
+startup (new event loop) still runs to completion.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.analysis_jobs import analysis_jobs
+
+_HEADERS = {"X-API-Key": "test"}
+_JOB = {
+    "document_url": "http://documents.test/certificate.pdf",
+    "document_type": "Contractor Classification Certificate",
+}
+
+
+@pytest.fixture(autouse=True)
+def fake_runner(monkeypatch):
+    async def runner(**request):
+        return {"success": True, "analysis": f"analysed {request['document_url']}"}
+
+    monkeypatch.setattr(analysis_jobs, "runner", runner)
+
+
+def _wait_for(client: TestClient, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/analyze/jobs/{job_id}", headers=_HEADERS).json()
+        if job["status"] in ("completed", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def _submit(client: TestClient) -> str:
+    response = client.post("/analyze/jobs", headers=_HEADERS, json=_JOB)
+    assert response.status_code == 202
+    return response.json()["job_id"]
+
+
+def test_job_completes_after_restart():
+    with TestClient(app) as client:
+        first = _wait_for(client, _submit(client))
+    assert first["status"] == "completed"
+
+    with TestClient(app) as client:
+        job = _wait_for(client, _submit(client))
+    assert job["status"] == "completed", job
+    assert job["result"]["analysis"] == "analysed http://documents.test/certificate.pdf"
+
+
+def test_unsuccessful_analysis_is_a_failed_job(monkeypatch):
+    async def runner(**request):
+        return {"success": False, "error": "No content extracted from document"}
+
+    monkeypatch.setattr(analysis_jobs, "runner", runner)
+    with TestClient(app) as client:
+        job = _wait_for(client, _submit(client))
+    assert job["status"] == "failed"
+    assert job["error"] == "No content extracted from document"
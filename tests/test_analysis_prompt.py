@@ -0,0 +1,39 @@
+"""
+The analysis prompt is a PromptTemplate; request and document text interpolated into it (company
+names, hints, document type) is sent literally, braces included.
+"""
+import asyncio
+
+from langchain_core.language_models import FakeListChatModel
+
+from app.services.pdf_analysis_service import pdf_analysis_service
+
+
+class _RecordingChatModel(FakeListChatModel):
+    prompts: list = []
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        self.prompts.append(prompt)
+        return await super().ainvoke(prompt, *args, **kwargs)
+
+
+def test_braces_in_company_names_are_literal(monkeypatch):
+    llm = _RecordingChatModel(responses=["COMPANY_MATCH: YES"], prompts=[])
+    monkeypatch.setattr(pdf_analysis_service, "_llm", llm)
+    text = "Company: Acme {Construction} Ltd\nRegistration No.: CS123456\n" * 3
+
+    analysis = asyncio.run(pdf_analysis_service._analyze_content(
+        extracted_text=text,
+        document_type="Certificate {of Incorporation}",
+        documents=[],
+        application_company_name="Acme {Construction} Limited",
+        plan={"strategy": "stuff"},
+        company_hint='The document names "Acme {Construction} Ltd".',
+    ))
+
+    assert analysis == "COMPANY_MATCH: YES"
+    prompt = llm.prompts[0]
+    assert "Analyze this Certificate {of Incorporation} document" in prompt
+    assert '"Acme {Construction} Limited"' in prompt
+    assert '- The document names "Acme {Construction} Ltd".' in prompt
+    assert text in prompt
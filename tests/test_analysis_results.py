@@ -0,0 +1,150 @@
+"""
+The analysis result store: a repeated /analyze of the same document is answered from the store
+without the LLM, force_refresh re-runs it, entries expire after the TTL and the least recently
+used ones are evicted beyond the byte budget.
+"""
+import hashlib
+
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+
+from app.core.config import settings
+from app.main import app
+from app.services import analysis_results
+from app.services.analysis_results import AnalysisResultStore
+from app.services.document_fetcher import FetchedDocument, document_fetcher
+from app.services.pdf_analysis_service import pdf_analysis_service
+
+_REQUEST = {
+    "document_url": "http://documents.test/certificate.pdf",
+    "document_type": "Certificate of Incorporation",
+    "strategy": "fast",
+    "application_company_name": "Acme Construction Limited",
+}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(analysis_results.time, "time", clock)
+    return clock
+
+
+def test_put_and_get(tmp_path, clock):
+    store = AnalysisResultStore(str(tmp_path / "results.sqlite3"), max_bytes=1 << 20, ttl_seconds=60)
+    key = store.key(sha256="abc", document_type="Certificate", prompt_version=1)
+    assert store.get(key) is None
+    store.put(key, {"success": True, "analysis": "fine"}, {"document_type": "Certificate"})
+    result, context_update, stored_at = store.get(key)
+    assert result == {"success": True, "analysis": "fine"}
+    assert context_update == {"document_type": "Certificate"}
+    assert stored_at == clock.now
+    assert store.get(store.key(sha256="abc", document_type="Certificate", prompt_version=2)) is None
+    assert (store.stats()["hits"], store.stats()["misses"]) == (1, 2)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    store = AnalysisResultStore(str(tmp_path / "results.sqlite3"), max_bytes=1 << 20, ttl_seconds=60)
+    store.put("key", {"analysis": "fine"}, None)
+    clock.now += 61
+    assert store.get("key") is None
+    store._prune()
+    assert store.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path, clock):
+    store = AnalysisResultStore(str(tmp_path / "results.sqlite3"), max_bytes=1 << 20, ttl_seconds=3600)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        store.put(key, {"analysis": key * 200}, None)
+    clock.now += 1
+    assert store.get("a") is not None  # "b" is now the least recently used
+    entry_size = store.stats()["bytes"] // 3
+    store.max_bytes = entry_size * 2 + entry_size // 2
+    store._prune()
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+
+def _pdf() -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_textbox(
+        fitz.Rect(50, 50, 545, 792),
+        "Certificate of Incorporation\nAcme Construction Limited\nRegistration No.: CS123456789\n"
+        "Incorporated on the 12th day of March, 2015 under the Companies Act.",
+        fontsize=10,
+    )
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+class _CountingChatModel(FakeListChatModel):
+    calls: int = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        self.calls += 1
+        return await super().ainvoke(*args, **kwargs)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    content = _pdf()
+
+    async def fetch(url):
+        return FetchedDocument(url, content, hashlib.sha256(content).hexdigest(), "application/pdf")
+
+    monkeypatch.setattr(document_fetcher, "fetch", fetch)
+    monkeypatch.setattr(settings, "ANALYSIS_STUFF_MAX_TOKENS", 6000)
+    monkeypatch.setattr(pdf_analysis_service, "unstructured_api_key", None)
+    monkeypatch.setattr(
+        pdf_analysis_service, "_llm", _CountingChatModel(responses=["COMPANY_MATCH: YES\nAll in order."] * 3)
+    )
+    monkeypatch.setattr(
+        pdf_analysis_service,
+        "_result_store",
+        AnalysisResultStore(str(tmp_path / "results.sqlite3"), max_bytes=1 << 20, ttl_seconds=3600),
+    )
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _analyze(client, **extra):
+    response = client.post("/analyze", headers={"X-API-Key": "test"}, json={**_REQUEST, **extra})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"], body
+    return body
+
+
+def test_repeated_analysis_is_served_from_the_store(client):
+    first = _analyze(client)
+    second = _analyze(client)
+    assert first["metadata"]["result_store"] == {"hit": False, "force_refresh": False}
+    assert second["metadata"]["result_store"]["hit"] is True
+    assert second["analysis"] == first["analysis"]
+    assert pdf_analysis_service._llm.calls == 1
+
+
+def test_force_refresh_runs_the_analysis_again(client):
+    _analyze(client)
+    refreshed = _analyze(client, force_refresh=True)
+    assert refreshed["metadata"]["result_store"] == {"hit": False, "force_refresh": True}
+    assert pdf_analysis_service._llm.calls == 2
+    # A different company is a different key.
+    other = client.post(
+        "/analyze", headers={"X-API-Key": "test"}, json={**_REQUEST, "application_company_name": "Other Company Limited"}
+    ).json()
+    assert other["metadata"]["result_store"]["hit"] is False
@@ -0,0 +1,104 @@
+"""
+The /chat answer cache: normalized keys, TTL, LRU bound, and invalidation when chat-data.json
+or guidelines.md change (knowledge-base version).
+"""
+import asyncio
+import os
+import shutil
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from app.services import answer_cache
+from app.services.answer_cache import TTLCache, normalize_question
+from app.services.chat_service import ChatService
+
+# Over 100 characters, so it skips the pattern matcher and goes to the LLM.
+QUESTION = (
+    "What supporting documents does a road contractor need to upload when applying to move "
+    "from grade D2K2 up to grade D1K1 this year?"
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalized_questions_share_a_key():
+    assert normalize_question("How much is the renewal fee?") == normalize_question("the renewal fee, how much")
+    assert normalize_question("How much is the renewal fee?") != normalize_question("How much is the upgrade fee?")
+    # Negations change the question.
+    assert normalize_question("Is a VAT certificate required?") != normalize_question("Is a VAT certificate not required?")
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(answer_cache.time, "monotonic", clock)
+    cache = TTLCache(max_entries=10, ttl_seconds=60)
+    cache.set("q", "answer")
+    clock.now += 59
+    assert cache.get("q") == "answer"
+    clock.now += 2
+    assert cache.get("q") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entry_is_dropped():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+
+
+def test_disabled_cache_stores_nothing():
+    cache = TTLCache(max_entries=0, ttl_seconds=60)
+    cache.set("a", "A")
+    assert cache.get("a") is None
+
+
+class _CountingChatModel(FakeListChatModel):
+    calls: int = 0
+
+    async def ainvoke(self, *args, **kwargs):
+        self.calls += 1
+        return await super().ainvoke(*args, **kwargs)
+
+
+@pytest.fixture
+def chat(tmp_path):
+    service = ChatService()
+    for name in ("chat-data.json", "guidelines.md"):
+        shutil.copy(os.path.join(service.data_dir, name), tmp_path / name)
+    service.chat_data_path = str(tmp_path / "chat-data.json")
+    service.knowledge_base_path = str(tmp_path / "guidelines.md")
+    service._load_data()
+    service._chat_model = _CountingChatModel(responses=["first answer", "second answer"])
+    return service
+
+
+def test_repeated_question_is_answered_from_the_cache(chat):
+    assert asyncio.run(chat.generate_response(QUESTION, [])) == "first answer"
+    assert asyncio.run(chat.generate_response(QUESTION.upper() + "??", [])) == "first answer"
+    assert chat._chat_model.calls == 1
+
+
+def test_knowledge_base_change_invalidates_answers(chat):
+    assert asyncio.run(chat.generate_response(QUESTION, [])) == "first answer"
+    version = chat.knowledge_version
+    with open(chat.knowledge_base_path, "a", encoding="utf-8") as f:
+        f.write("\n\n## New fees\nThe upgrade fee changed.\n")
+    stat = os.stat(chat.knowledge_base_path)
+    os.utime(chat.knowledge_base_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    chat._next_reload_check = 0.0
+
+    assert asyncio.run(chat.generate_response(QUESTION, [])) == "second answer"
+    assert chat.knowledge_version != version
+    assert chat._chat_model.calls == 2
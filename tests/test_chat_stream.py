@@ -0,0 +1,54 @@
+"""
+/chat/stream sends the model's tokens as Server-Sent Events and records the time to the first
+token in the mwhr_chat_time_to_first_token_seconds histogram on /metrics.
+"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+
+from app.main import app
+from app.services.chat_service import chat_service
+
+QUESTION = (
+    "What supporting documents does a road contractor need to upload when applying to move "
+    "from grade D2K2 up to grade D1K1 this year, and how long does the review take?"
+)
+
+
+def _ttft_count(client: TestClient) -> float:
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith("mwhr_chat_time_to_first_token_seconds_count"):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def _events(body: str):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        yield event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(chat_service, "_chat_model", FakeListChatModel(responses=["Upload the audited accounts."]))
+    chat_service.answer_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+    chat_service.answer_cache.clear()
+
+
+def test_stream_records_time_to_first_token(client):
+    before = _ttft_count(client)
+    response = client.post("/chat/stream", headers={"X-API-Key": "test"}, json={"message": QUESTION, "history": []})
+    assert response.status_code == 200
+    events = list(_events(response.text))
+    assert "".join(data["content"] for event, data in events if event == "token") == "Upload the audited accounts."
+    assert events[-1] == ("done", {"source": "llm"})
+    assert _ttft_count(client) == before + 1
+
+    # A cached answer makes no model call and records nothing.
+    cached = client.post("/chat/stream", headers={"X-API-Key": "test"}, json={"message": QUESTION, "history": []})
+    assert list(_events(cached.text))[-1] == ("done", {"source": "cache"})
+    assert _ttft_count(client) == before + 1
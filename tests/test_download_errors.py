@@ -0,0 +1,71 @@
+"""
+A document the fetcher refuses (not a PDF, too large) is the client's error: /analyze answers 422
+with the reason instead of a 200 "No content extracted"; in /analyze/batch only that document's
+result fails, with status_code 422, and the other documents are still analysed.
+"""
+import hashlib
+
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+
+from app.main import app
+from app.services.document_fetcher import DocumentDownloadError, FetchedDocument, document_fetcher
+from app.services.pdf_analysis_service import pdf_analysis_service
+
+def _pdf() -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 72), "Acme Construction Limited, Certificate No: MWH/D2K2/0193", fontsize=9)
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+_PDF = _pdf()
+_DOCUMENT = {
+    "document_url": "http://documents.test/certificate.html",
+    "document_type": "Contractor Classification Certificate",
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fetch(url):
+        if url.endswith(".html"):
+            raise DocumentDownloadError("Downloaded file is not a PDF")
+        return FetchedDocument(url, _PDF, hashlib.sha256(_PDF).hexdigest(), "application/pdf")
+
+    monkeypatch.setattr(document_fetcher, "fetch", fetch)
+    monkeypatch.setattr(pdf_analysis_service, "unstructured_api_key", None)
+    monkeypatch.setattr(pdf_analysis_service, "_llm", FakeListChatModel(responses=["COMPANY_MATCH: YES\nLooks fine."]))
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_analyze_refused_download_is_422(client):
+    response = client.post("/analyze", headers={"X-API-Key": "test"}, json=_DOCUMENT)
+    assert response.status_code == 422
+    assert response.json()["detail"] == "Downloaded file is not a PDF"
+
+
+def test_analyze_batch_refused_download_fails_only_that_document(client):
+    pdf_document = {**_DOCUMENT, "document_url": "http://documents.test/certificate.pdf"}
+    response = client.post(
+        "/analyze/batch",
+        headers={"X-API-Key": "test"},
+        json={"documents": [_DOCUMENT, pdf_document], "application_company_name": "Acme Construction Limited"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert not body["success"]
+    refused, analysed = body["results"]
+    assert refused == {
+        "document_url": _DOCUMENT["document_url"],
+        "success": False,
+        "status_code": 422,
+        "error": "Downloaded file is not a PDF",
+    }
+    assert analysed["document_url"] == pdf_document["document_url"]
+    assert analysed["success"], analysed
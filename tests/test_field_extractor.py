@@ -0,0 +1,135 @@
+"""Rule-based field extraction per document profile, and labels that must not match."""
+import pytest
+
+from app.services.field_extractor import extract_fields, parse_date, profile_for
+
+
+def _fields(document_type: str, text: str, page: int = 1):
+    return extract_fields(document_type, [(page, text)])
+
+
+@pytest.mark.parametrize("document_type, profile", [
+    ("Certificate of Incorporation", "certificate_of_incorporation"),
+    ("Certificate to Commence Business", "certificate_to_commence_business"),
+    ("SSNIT Clearance Certificate", "ssnit_clearance"),
+    ("Tax Clearance Certificate", "tax_clearance"),
+    ("VAT Registration Certificate", "vat_registration"),
+    ("Contractor Classification Certificate", "classification_certificate"),
+    ("Bank statement", "generic"),
+])
+def test_profile_for(document_type, profile):
+    assert profile_for(document_type) == profile
+
+
+@pytest.mark.parametrize("raw, iso", [
+    ("05/01/2019", "2019-01-05"),
+    ("2019-01-05", "2019-01-05"),
+    ("5th day of January, 2019", "2019-01-05"),
+    ("January 5, 2019", "2019-01-05"),
+    ("31/02/2019", None),
+])
+def test_parse_date(raw, iso):
+    assert parse_date(raw) == iso
+
+
+def test_certificate_of_incorporation():
+    result = _fields("Certificate of Incorporation", (
+        "Registration No.: CS123456789\n"
+        "Acme Construction Limited is incorporated on the 12th day of March, 2015\n"
+        "Date of Issue: 14/03/2015\n"
+        "Directors: Kofi Mensah, Ama Owusu and Yaw Boateng\n"
+    ))
+    assert result.values["registration_number"] == "CS123456789"
+    assert result.values["incorporation_date"] == "2015-03-12"
+    assert result.values["issue_date"] == "2015-03-14"
+    assert result.values["directors"] == ["Kofi Mensah", "Ama Owusu", "Yaw Boateng"]
+    assert result.missing == []
+    assert "Registration No." not in result.unresolved[0]
+
+
+def test_certificate_to_commence_business():
+    result = _fields("Certificate to Commence Business", (
+        "Company No. CS-2015/0042\n"
+        "is entitled to commence business on 1st April 2015\n"
+        "Dated 02.04.2015\n"
+    ))
+    assert result.values["registration_number"] == "CS-2015/0042"
+    assert result.values["commencement_date"] == "2015-04-01"
+    assert result.values["issue_date"] == "2015-04-02"
+
+
+def test_tax_clearance():
+    result = _fields("Tax Clearance Certificate", (
+        "Certificate No: TCC-2023-00871\n"
+        "TIN: C0012345678\n"
+        "Date Issued: 10/01/2023\n"
+        "Valid until 31st December 2023\n"
+    ))
+    assert result.values == {
+        "certificate_number": "TCC-2023-00871",
+        "tin": "C0012345678",
+        "issue_date": "2023-01-10",
+        "expiry_date": "2023-12-31",
+    }
+
+
+def test_ssnit_clearance():
+    result = _fields("SSNIT Clearance", (
+        "Clearance No. SS/CL/55501\nEmployer's Number: E1234567\n"
+        "Issue Date: 03-02-2023\nExpiry Date: 30-06-2023\n"
+    ))
+    assert result.values["certificate_number"] == "SS/CL/55501"
+    assert result.values["employer_number"] == "E1234567"
+    assert result.values["issue_date"] == "2023-02-03"
+    assert result.values["expiry_date"] == "2023-06-30"
+
+
+def test_vat_registration():
+    result = _fields("VAT Registration", (
+        "VAT Registration No: V0001234567\nTIN: P0098765432\nDate of Registration: 7 July 2020\n"
+    ))
+    assert result.values == {
+        "vat_number": "V0001234567",
+        "tin": "P0098765432",
+        "registration_date": "2020-07-07",
+    }
+
+
+def test_classification_certificate():
+    result = _fields("Contractor Classification Certificate", (
+        "Certificate No: MWH/D2K2/0193\n"
+        "Category: Roads and Bridges\n"
+        "Class: D2K2\n"
+        "Date of Issue: 15/05/2022\n"
+        "Valid up to 14/05/2024\n"
+    ))
+    assert result.values["certificate_number"] == "MWH/D2K2/0193"
+    assert result.values["category"] == "Roads and Bridges"
+    assert result.values["contractor_class"] == "D2K2"
+    assert result.values["issue_date"] == "2022-05-15"
+    assert result.values["expiry_date"] == "2024-05-14"
+
+
+def test_dated_label_does_not_match_inside_updated():
+    result = _fields("Certificate of Incorporation", "Record last updated: 05/01/2019\n")
+    assert "issue_date" not in result.values
+    assert "issue_date" in result.missing
+    # Not resolved, so the LLM still sees the line.
+    assert "Record last updated: 05/01/2019" in result.unresolved[0]
+
+
+def test_number_labels_do_not_take_lowercase_words():
+    result = _fields("Certificate of Incorporation", "Registration No. is 123456\n")
+    assert "registration_number" not in result.values
+    result = _fields("Tax Clearance Certificate", "Certificate No. issued by the authority\n")
+    assert "certificate_number" not in result.values
+
+
+def test_first_page_with_a_match_wins():
+    result = extract_fields("Tax Clearance", [
+        (1, "Summary of the clearance\n"),
+        (2, "Certificate No: TCC-1111\n"),
+        (3, "Certificate No: TCC-2222\n"),
+    ])
+    assert result.values["certificate_number"] == "TCC-1111"
+    assert result.sources["certificate_number"]["page"] == 2
@@ -0,0 +1,45 @@
+"""
+PageExecutor with real worker processes: a page stuck in its worker times out, and the pool is
+replaced so later documents are still extracted.
+"""
+import asyncio
+import time
+
+import fitz
+
+from app.services import page_executor as page_executor_module
+from app.services.page_executor import PageExecutor
+
+
+def _hang(*args, **kwargs):
+    # Runs in the worker process in place of the page extraction: a hung tesseract call.
+    time.sleep(120)
+
+
+def _pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for page_no in range(pages):
+        doc.new_page().insert_text((50, 72), f"Page {page_no + 1} of the certificate", fontsize=11)
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+def test_hung_page_times_out_and_frees_the_pool(monkeypatch):
+    executor = PageExecutor(workers=1, max_queued_pages=0, page_timeout=1.0)
+
+    async def run():
+        with monkeypatch.context() as patch:
+            patch.setattr(page_executor_module, "_extract_page_task", _hang)
+            hung = await executor.extract_pages(_pdf(1), use_ocr=False)
+        # With the single worker and slot still held by the hung page this would wait forever.
+        pages = await asyncio.wait_for(executor.extract_pages(_pdf(2), use_ocr=False), timeout=30)
+        return hung, pages
+
+    try:
+        hung, pages = asyncio.run(run())
+    finally:
+        executor.shutdown()
+    assert hung == [{"page_number": 1, "text": "", "ocr": False, "timed_out": True}]
+    assert [page["text"] for page in pages] == ["Page 1 of the certificate", "Page 2 of the certificate"]
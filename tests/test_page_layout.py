@@ -0,0 +1,109 @@
+"""Local table and form detection on a page's text layer (page_layout.page_elements)."""
+import fitz
+import pytest
+
+from app.services.page_layout import page_elements
+
+_ROWS = [
+    ["Name", "Position", "Nationality"],
+    ["Kofi Mensah", "Director", "Ghanaian"],
+    ["Ama Owusu", "Secretary", "Ghanaian"],
+]
+
+
+def _ruled_table(page, top: float) -> fitz.Rect:
+    left, cell_w, cell_h = 50, 150, 22
+    rect = fitz.Rect(left, top, left + cell_w * len(_ROWS[0]), top + cell_h * len(_ROWS))
+    for r, row in enumerate(_ROWS):
+        for c, value in enumerate(row):
+            cell = fitz.Rect(left + c * cell_w, top + r * cell_h, left + (c + 1) * cell_w, top + (r + 1) * cell_h)
+            page.draw_rect(cell, color=(0, 0, 0), width=0.8)
+            page.insert_text((cell.x0 + 4, cell.y1 - 7), value, fontsize=10)
+    return rect
+
+
+@pytest.fixture
+def doc():
+    doc = fitz.open()
+    yield doc
+    doc.close()
+
+
+def test_plain_text_page_is_one_text_element(doc):
+    page = doc.new_page()
+    page.insert_text((50, 72), "Acme Construction Limited", fontsize=11)
+    page.insert_text((50, 90), "was incorporated under the Companies Act.", fontsize=11)
+    elements = page_elements(page, extract_tables=True, extract_forms=True)
+    assert [e["type"] for e in elements] == ["Text"]
+    assert "Acme Construction Limited" in elements[0]["text"]
+
+
+def test_ruled_table_replaces_its_text_in_reading_order(doc):
+    page = doc.new_page()
+    page.insert_text((50, 72), "Particulars of directors", fontsize=12)
+    _ruled_table(page, 100)
+    page.insert_text((50, 220), "Signed by the Registrar of Companies", fontsize=11)
+
+    elements = page_elements(page, extract_tables=True)
+
+    assert [e["type"] for e in elements] == ["Text", "Table", "Text"]
+    table = elements[1]
+    assert table["html"].startswith("<table><thead><tr><th>Name</th><th>Position</th><th>Nationality</th>")
+    assert "<td>Kofi Mensah</td><td>Director</td><td>Ghanaian</td>" in table["html"]
+    assert table["text"].splitlines()[1] == "Kofi Mensah\tDirector\tGhanaian"
+    # Table text is not repeated in the surrounding text.
+    assert all("Kofi Mensah" not in e["text"] for e in elements if e["type"] == "Text")
+
+
+def test_tables_are_skipped_when_not_asked_for(doc):
+    page = doc.new_page()
+    _ruled_table(page, 100)
+    assert [e["type"] for e in page_elements(page, extract_tables=False)] == ["Text"]
+
+
+def test_key_value_run_becomes_a_form(doc):
+    page = doc.new_page()
+    lines = [
+        "Tax Clearance Certificate",
+        "Taxpayer Name: Acme Construction Limited",
+        "TIN: C0012345678",
+        "Date of Issue: 10/01/2023",
+        "This certificate is valid for the period stated.",
+    ]
+    for n, line in enumerate(lines):
+        page.insert_text((50, 72 + 18 * n), line, fontsize=11)
+
+    elements = page_elements(page, extract_tables=False, extract_forms=True)
+
+    assert [e["type"] for e in elements] == ["Text", "Form", "Text"]
+    form = elements[1]
+    assert form["text"].splitlines() == [
+        "Taxpayer Name: Acme Construction Limited",
+        "TIN: C0012345678",
+        "Date of Issue: 10/01/2023",
+    ]
+    assert "<tr><th>TIN</th><td>C0012345678</td></tr>" in form["html"]
+
+
+def test_single_key_value_line_stays_text(doc):
+    page = doc.new_page()
+    page.insert_text((50, 72), "Note: the fee is payable on submission.", fontsize=11)
+    page.insert_text((50, 90), "Further details are on the portal.", fontsize=11)
+    assert [e["type"] for e in page_elements(page, extract_forms=True)] == ["Text"]
+
+
+def test_acroform_widgets_are_reported_as_a_form(doc):
+    page = doc.new_page()
+    page.insert_text((50, 60), "Application for renewal", fontsize=11)
+    widget = fitz.Widget()
+    widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+    widget.field_name = "Company Name"
+    widget.field_value = "Acme Construction Limited"
+    widget.rect = fitz.Rect(50, 100, 350, 120)
+    page.add_widget(widget)
+
+    elements = page_elements(page, extract_tables=False, extract_forms=True)
+
+    assert elements[-1]["type"] == "Form"
+    assert elements[-1]["text"] == "Company Name: Acme Construction Limited"
+    assert all("Acme Construction Limited" not in e["text"] for e in elements[:-1])
@@ -0,0 +1,77 @@
+"""Page classification before OCR and the per-region render DPI (page_ocr)."""
+import math
+
+import fitz
+import pytest
+
+from app.core.config import settings
+from app.services.page_ocr import classify_page, plan_renders, render_dpi, text_quality
+from benchmarks.bench_ocr import make_scans
+
+
+def _classify(page):
+    return classify_page(page, (page.get_text() or "").strip())
+
+
+def test_text_quality():
+    assert text_quality("Acme Construction Limited, Registration No. CS123456") == 1.0
+    assert text_quality("\ufffd\ufffd\ufffd \ue000\ue000") == 0.0
+    assert text_quality("") == 0.0
+
+
+def test_text_and_blank_pages():
+    doc = fitz.open()
+    try:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 400), "Acme Construction Limited is registered. " * 5, fontsize=11)
+        text_plan = _classify(page)
+        blank_plan = _classify(doc.new_page())
+    finally:
+        doc.close()
+    assert text_plan.kind == "text" and not text_plan.needs_ocr
+    assert blank_plan.kind == "blank" and not blank_plan.needs_ocr
+
+
+@pytest.mark.parametrize("kind, page_class", [("scanned", "scanned"), ("partial", "mixed"), ("garbled", "garbled")])
+def test_synthetic_scans(kind, page_class):
+    doc, _ = make_scans(kind, pages=1, scan_dpi=150)
+    try:
+        page = doc[0]
+        page_rect = page.rect
+        plan = _classify(page)
+        renders = plan_renders(page, plan)
+    finally:
+        doc.close()
+    assert plan.kind == page_class
+    assert len(renders) == 1
+    clip, dpi = renders[0]
+    if page_class == "mixed":
+        # Only the image region (the top of the page) is OCR'd.
+        assert clip.y1 <= 300 and plan.image_coverage < settings.OCR_REGION_MAX_COVERAGE
+    else:
+        assert clip == page_rect
+    # Never above the 150 DPI the page was scanned at.
+    assert settings.OCR_MIN_DPI <= dpi <= 150
+
+
+def test_render_dpi_targets_font_pixels():
+    clip = fitz.Rect(0, 0, 300, 100)
+    # 10 pt text at OCR_TARGET_FONT_PIXELS per em.
+    assert render_dpi(clip, font_size=10) == int(settings.OCR_TARGET_FONT_PIXELS * 72 / 10)
+    assert render_dpi(clip) == settings.OCR_DEFAULT_DPI
+
+
+def test_render_dpi_bounds():
+    clip = fitz.Rect(0, 0, 300, 100)
+    assert render_dpi(clip, native_dpi=150) == 150  # no upsampling past the image's own DPI
+    assert render_dpi(clip, font_size=2) == settings.OCR_MAX_DPI
+    assert render_dpi(clip, font_size=60) == settings.OCR_MIN_DPI
+    assert render_dpi(clip, native_dpi=72, font_size=10) == settings.OCR_MIN_DPI
+
+
+def test_render_dpi_megapixel_budget():
+    poster = fitz.Rect(0, 0, 2384, 3370)  # A0 in points
+    dpi = render_dpi(poster, font_size=10)
+    square_inches = abs(poster) / (72 * 72)
+    assert dpi == int(math.sqrt(settings.OCR_MAX_MEGAPIXELS * 1e6 / square_inches))
+    assert square_inches * dpi * dpi <= settings.OCR_MAX_MEGAPIXELS * 1e6
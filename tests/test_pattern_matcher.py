@@ -0,0 +1,55 @@
+"""PatternMatcher picks the same response as the difflib scan it replaced."""
+import json
+import random
+
+import pytest
+
+from app.services.pattern_matcher import PatternMatcher
+from benchmarks.bench_pattern_matcher import DATA_PATH, VOCAB, difflib_match, perturb, synthetic_intents
+
+
+@pytest.fixture(scope="module")
+def base_intents():
+    with open(DATA_PATH, encoding="utf-8") as f:
+        return json.load(f)["intents"]
+
+
+def test_exact_and_near_patterns(base_intents):
+    matcher = PatternMatcher(base_intents)
+    intent = next(i for i in base_intents if i["id"] != "greeting")
+    pattern = intent["patterns"][0].lower()
+    assert matcher.match(pattern) == intent["response"]
+    assert matcher.match(pattern[:-1] + "x") == difflib_match(base_intents, pattern[:-1] + "x", True)
+    assert matcher.match("zzzz qqqq vvvv") is None
+
+
+def test_greetings_only_when_asked_for():
+    intents = [
+        {"id": "greeting", "patterns": ["hello there"], "response": "Hi!"},
+        {"id": "fees", "patterns": ["hello fees"], "response": "The fees are ..."},
+    ]
+    matcher = PatternMatcher(intents)
+    assert matcher.match("hello there") == "Hi!"
+    assert matcher.match("hello there", include_greeting=False) == difflib_match(intents, "hello there", False)
+
+
+def test_ties_go_to_the_larger_pattern():
+    intents = [
+        {"id": "a", "patterns": ["abcx"], "response": "A"},
+        {"id": "b", "patterns": ["abcy"], "response": "B"},
+    ]
+    assert PatternMatcher(intents).match("abcz") == difflib_match(intents, "abcz", True) == "B"
+
+
+@pytest.mark.parametrize("size", [50, 500])
+def test_agrees_with_difflib(base_intents, size):
+    rng = random.Random(size)
+    intents = synthetic_intents(base_intents, size, rng)
+    matcher = PatternMatcher(intents)
+    patterns = [p.lower() for i in intents for p in i["patterns"]]
+    messages = [perturb(rng.choice(patterns), rng) for _ in range(60)]
+    messages += [" ".join(rng.choices(VOCAB, k=rng.randint(1, 8))) for _ in range(60)]
+    messages += ["hi", "fee", "helo", "thanks!"]
+    for message in messages:
+        for include_greeting in (True, False):
+            assert matcher.match(message, include_greeting) == difflib_match(intents, message, include_greeting), message
@@ -0,0 +1,69 @@
+"""
+/analyze on a document big enough for the retrieval strategy reports the embedding calls made
+while Chroma indexes the chunks as "embed" in Server-Timing. OpenAI is replaced by langchain's
+fake chat model and deterministic embeddings, and the download by an in-memory PDF.
+"""
+import hashlib
+
+import fitz
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from app.main import app
+from app.services.document_fetcher import FetchedDocument, document_fetcher
+from app.services.embedding_cache import CachedEmbeddings
+from app.services.pdf_analysis_service import pdf_analysis_service
+
+
+def _pdf() -> bytes:
+    doc = fitz.open()
+    for page_no in range(3):
+        page = doc.new_page()
+        text = "\n".join(
+            f"Clause {page_no}.{i}: Acme Construction Limited holds valid class D2 works certificates."
+            for i in range(12)
+        )
+        page.insert_textbox(fitz.Rect(50, 50, 545, 792), text, fontsize=9)
+    try:
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    content = _pdf()
+
+    async def fetch(url):
+        return FetchedDocument(url, content, hashlib.sha256(content).hexdigest(), "application/pdf")
+
+    monkeypatch.setattr(document_fetcher, "fetch", fetch)
+    monkeypatch.setattr(pdf_analysis_service, "unstructured_api_key", None)
+    monkeypatch.setattr(pdf_analysis_service, "_llm", FakeListChatModel(responses=["COMPANY_MATCH: YES\nLooks fine."] * 4))
+    monkeypatch.setattr(
+        pdf_analysis_service, "_embeddings", CachedEmbeddings(DeterministicFakeEmbedding(size=16), "fake", None)
+    )
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_retrieval_analysis_times_embeddings(client):
+    response = client.post(
+        "/analyze",
+        headers={"X-API-Key": "test"},
+        json={
+            "document_url": "http://documents.test/certificate.pdf",
+            "document_type": "Contractor Classification Certificate",
+            "strategy": "fast",
+            "application_company_name": "Acme Construction Limited",
+        },
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"], body
+    assert body["metadata"]["analysis_plan"]["strategy"] == "retrieval"
+    stages = [entry.split(";")[0].strip() for entry in response.headers["server-timing"].split(",")]
+    assert "index" in stages
+    assert "embed" in stages
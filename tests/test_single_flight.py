@@ -0,0 +1,104 @@
+"""
+SingleFlight: concurrent calls with one key share an execution; a caller that is cancelled
+(leader or follower) does not cancel it for the others, the last one to go does.
+"""
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class _Work:
+    def __init__(self):
+        self.started = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "result"
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flight, work = SingleFlight(), _Work()
+        callers = [asyncio.create_task(flight.do("key", work)) for _ in range(3)]
+        await _settle()
+        work.release.set()
+        return flight, work, await asyncio.gather(*callers)
+
+    flight, work, results = asyncio.run(run())
+    assert results == ["result"] * 3
+    assert work.started == 1
+    assert flight.stats() == {"in_flight": 0, "executions": 1, "coalesced": 2}
+
+
+@pytest.mark.parametrize("cancelled", ["leader", "follower"])
+def test_cancelled_caller_does_not_cancel_the_others(cancelled):
+    async def run():
+        flight, work = SingleFlight(), _Work()
+        leader = asyncio.create_task(flight.do("key", work))
+        await _settle()
+        follower = asyncio.create_task(flight.do("key", work))
+        await _settle()
+        gone, staying = (leader, follower) if cancelled == "leader" else (follower, leader)
+        gone.cancel()
+        await _settle()
+        work.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await gone
+        return work, await staying
+
+    work, result = asyncio.run(run())
+    assert result == "result"
+    assert not work.cancelled
+
+
+def test_work_is_cancelled_when_every_caller_has_gone():
+    async def run():
+        flight, work = SingleFlight(), _Work()
+        callers = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+        await _settle()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await _settle()
+        return flight, work
+
+    flight, work = asyncio.run(run())
+    assert work.cancelled
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_caller_and_the_key_is_released():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *[flight.do("key", failing) for _ in range(2)], return_exceptions=True
+        )
+        # A later call with the same key runs again instead of reusing the failure.
+        again = await asyncio.gather(flight.do("key", failing), return_exceptions=True)
+        return calls, results + again
+
+    calls, results = asyncio.run(run())
+    assert calls == 2
+    assert all(isinstance(r, ValueError) for r in results)
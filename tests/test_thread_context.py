@@ -0,0 +1,83 @@
+"""
+The in-memory thread context store: expiry measured from the last update, the per-thread
+document cap and the least-recently-used thread cap.
+"""
+import pytest
+
+from app.services import thread_context
+from app.services.thread_context import ThreadContextStore, build_previous_documents_prompt
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(thread_context.time, "monotonic", clock)
+    return clock
+
+
+def test_thread_expires_ttl_after_its_last_update(clock):
+    store = ThreadContextStore(ttl_seconds=60)
+    store.update("app-1", "Acme", "Certificate of Incorporation", True, "Acme Ltd")
+    clock.now += 50
+    store.update("app-1", None, "Tax Clearance Certificate")
+    clock.now += 50
+    assert store.get("app-1")["documents_total"] == 2
+    clock.now += 11
+    assert store.get("app-1") is None
+    assert len(store) == 0
+    assert store.stats()["expired"] == 1
+
+
+def test_expiry_follows_update_order(clock):
+    store = ThreadContextStore(ttl_seconds=60)
+    store.update("app-1", "Acme", "Document")
+    clock.now += 30
+    store.update("app-2", "Beta", "Document")
+    clock.now += 30
+    store.update("app-1", None, "Document")
+    clock.now += 31
+    # app-2 was updated 61 s ago, app-1 31 s ago.
+    assert store.get("app-2") is None
+    assert store.get("app-1") is not None
+
+
+def test_documents_are_capped_oldest_first(clock):
+    store = ThreadContextStore(ttl_seconds=60, max_documents=2)
+    for n in range(1, 5):
+        store.update("app-1", "Acme", f"Document {n}")
+    context = store.get("app-1")
+    assert [d["document_type"] for d in context["documents"]] == ["Document 3", "Document 4"]
+    assert context["documents_total"] == 4
+    prompt = build_previous_documents_prompt(context)
+    assert "- (2 earlier documents not shown)" in prompt
+    assert "- Document 3: Document 3" in prompt
+
+
+def test_least_recently_used_thread_is_evicted(clock):
+    store = ThreadContextStore(ttl_seconds=60, max_threads=2)
+    store.update("app-1", "Acme", "Document")
+    store.update("app-2", "Beta", "Document")
+    assert store.get("app-1") is not None  # app-1 is now the most recently used
+    store.update("app-3", "Gamma", "Document")
+    assert store.get("app-2") is None
+    assert store.get("app-1") is not None and store.get("app-3") is not None
+    assert store.stats()["evicted"] == 1
+    # The evicted thread is gone from the expiry order as well.
+    clock.now += 61
+    assert store.get("app-1") is None and store.get("app-3") is None
+    assert store.stats()["expired"] == 2
+
+
+def test_company_name_is_kept_when_later_updates_omit_it(clock):
+    store = ThreadContextStore(ttl_seconds=60)
+    store.update("app-1", "Acme Construction Limited", "Certificate of Incorporation")
+    store.update("app-1", None, "Tax Clearance Certificate")
+    assert store.get("app-1")["application_company_name"] == "Acme Construction Limited"
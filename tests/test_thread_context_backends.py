@@ -0,0 +1,77 @@
+"""
+The shared thread-context backends: SQLite on a temporary file and Redis on fakeredis. Both
+keep a thread's documents in order up to the cap, expire the thread after the TTL and keep
+working after close() (the next app startup in the same process).
+"""
+import time
+
+import pytest
+
+from app.services.thread_context_backends import RedisThreadContextStore, SQLiteThreadContextStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_store(request, tmp_path):
+    stores = []
+    server = fakeredis.FakeServer()
+
+    def make(ttl_seconds: float = 3600, max_documents: int = 0):
+        if request.param == "sqlite":
+            store = SQLiteThreadContextStore(
+                str(tmp_path / "threads.sqlite3"), ttl_seconds, max_documents=max_documents
+            )
+        else:
+            store = RedisThreadContextStore(
+                "redis://unused",
+                ttl_seconds,
+                max_documents=max_documents,
+                client=fakeredis.FakeRedis(server=server, decode_responses=True),
+            )
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_update_and_get(make_store):
+    store = make_store()
+    assert store.get("app-1") is None
+    store.update("app-1", "Acme Construction Limited", "Certificate of Incorporation", True, "Acme Construction Ltd")
+    store.update("app-1", None, "Tax Clearance Certificate", False, "Other Company Ltd")
+    context = store.get("app-1")
+    assert context["application_company_name"] == "Acme Construction Limited"
+    assert context["documents_total"] == 2
+    assert context["documents"] == [
+        {"document_type": "Certificate of Incorporation", "company_match": True, "companies_mentioned": "Acme Construction Ltd"},
+        {"document_type": "Tax Clearance Certificate", "company_match": False, "companies_mentioned": "Other Company Ltd"},
+    ]
+    assert store.get("app-2") is None
+
+
+def test_documents_are_capped_oldest_first(make_store):
+    store = make_store(max_documents=2)
+    for n in range(1, 5):
+        store.update("app-1", "Acme", f"Document {n}")
+    context = store.get("app-1")
+    assert [d["document_type"] for d in context["documents"]] == ["Document 3", "Document 4"]
+    assert context["documents_total"] == 4
+
+
+def test_thread_expires_after_ttl(make_store):
+    store = make_store(ttl_seconds=0.2)
+    store.update("app-1", "Acme", "Certificate of Incorporation")
+    assert store.get("app-1") is not None
+    time.sleep(0.3)
+    assert store.get("app-1") is None
+
+
+def test_store_reopens_after_close(make_store):
+    store = make_store()
+    store.update("app-1", "Acme", "Certificate of Incorporation")
+    store.close()
+    store.update("app-1", None, "Tax Clearance Certificate")
+    assert store.get("app-1")["documents_total"] == 2